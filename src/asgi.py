@@ -0,0 +1,107 @@
+import sys
+import os
+
+# 👉 Ajusta o PYTHONPATH antes de tudo
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import json
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from controllers.main_controller import Main, rag_service, get_metrics, get_chat_stats
+from services.document_metadata import normalize_filters
+from config import Config
+from services.cloudwatch_logger_service import CloudWatchLoggerService
+
+# Configurar o logger global e o pipeline de logs do processo (console e CloudWatch), usado por todos os serviços
+logger = CloudWatchLoggerService.setup_logger(
+    logger_name="chatbot_api",
+    log_level=logging.INFO if not Config.DEBUG_MODE else logging.DEBUG,
+    enable_cloudwatch=Config.ENABLE_CLOUDWATCH_LOGS,
+    log_group=Config.CLOUDWATCH_LOG_GROUP
+)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Busca no ChromaDB e embeddings continuam bloqueantes e rodam em threads (asyncio.to_thread);
+    # o pool padrão do asyncio é pequeno demais para muitas requisições simultâneas
+    executor = ThreadPoolExecutor(max_workers=Config.ASGI_MAX_BLOCKING_THREADS, thread_name_prefix="asgi")
+    asyncio.get_running_loop().set_default_executor(executor)
+    logger.info(f"✅ App ASGI inicializado ({Config.ASGI_MAX_BLOCKING_THREADS} threads para chamadas bloqueantes)")
+    yield
+    executor.shutdown(wait=False)
+
+app = FastAPI(lifespan=lifespan)
+
+async def _read_query(request):
+    """
+    Lê e valida o corpo da requisição (mesmo contrato do app Flask)
+    
+    Returns:
+        tuple: (query, chat_id, filtros, resposta de erro ou None)
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return None, None, None, JSONResponse({"error": "invalid JSON body"}, status_code=400)
+
+    query = data.get("query", None)
+    chat_id = data.get("chat_id", None)
+
+    if query is None:
+        return None, None, None, JSONResponse({"error": "query is required"}, status_code=400)
+    elif chat_id is None:
+        return None, None, None, JSONResponse({"error": "chat_id is required"}, status_code=400)
+
+    try:
+        filters = normalize_filters(data.get("filters", None))
+    except ValueError as e:
+        return None, None, None, JSONResponse({"error": str(e)}, status_code=400)
+    return query, chat_id, filters, None
+
+# Rota de saúde
+@app.get("/")
+async def main():
+    logger.info("Endpoint de saúde acessado")
+    return PlainTextResponse(Main())
+
+# Rota de métricas internas (caches, carregamento do ChromaDB)
+@app.get("/metrics")
+async def metrics():
+    return JSONResponse(get_metrics())
+
+# Rota de estatísticas do estado dos chats (número de chats e bytes em memória)
+@app.get("/chats/stats")
+async def chat_stats():
+    return JSONResponse(get_chat_stats())
+
+# Rota de consulta RAG
+@app.post("/query")
+async def process_query(request: Request):
+    logger.info("Requisição de consulta recebida")
+    query, chat_id, filters, error = await _read_query(request)
+    if error is not None:
+        return error
+
+    result = await rag_service.aprocess_query(query, chat_id, filters)
+    return JSONResponse(result)
+
+# Rota de consulta RAG com resposta em streaming (NDJSON)
+@app.post("/query/stream")
+async def process_query_stream(request: Request):
+    logger.info("Requisição de consulta (streaming) recebida")
+    query, chat_id, filters, error = await _read_query(request)
+    if error is not None:
+        return error
+
+    # NDJSON: um evento JSON por linha ("start", "token"..., "end" ou "error")
+    async def generate():
+        async for event in rag_service.astream_query(query, chat_id, filters):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
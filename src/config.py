@@ -18,21 +18,93 @@ class Config:
     # Configurações S3
     S3_BUCKET_NAME = os.environ.get('S3_BUCKET_NAME')
     
+    # Origem local dos documentos (.zip ou diretório); vazio usa o bucket S3
+    DOCUMENT_SOURCE = os.environ.get('DOCUMENT_SOURCE', '')
+    
     # Configurações Bedrock
     BEDROCK_REGION = os.environ.get('BEDROCK_REGION', 'us-east-1')
     EMBEDDING_MODEL_ID = os.environ.get('BEDROCK_EMBEDDING_MODEL', 'amazon.titan-embed-text-v2:0')
     
+    # Cache de embeddings de queries
+    EMBEDDING_CACHE_ENABLED = os.environ.get('EMBEDDING_CACHE_ENABLED', 'true').lower() == 'true'
+    EMBEDDING_CACHE_MAX_ENTRIES = int(os.environ.get('EMBEDDING_CACHE_MAX_ENTRIES', '2048'))
+    EMBEDDING_CACHE_MAX_BYTES = int(os.environ.get('EMBEDDING_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+    EMBEDDING_CACHE_TTL = int(os.environ.get('EMBEDDING_CACHE_TTL', '86400'))
+    EMBEDDING_CACHE_PATH = os.environ.get('EMBEDDING_CACHE_PATH', '')  # ex.: bd/embedding_cache.sqlite3
+    EMBEDDING_CACHE_PERSIST_MAX_ENTRIES = int(os.environ.get('EMBEDDING_CACHE_PERSIST_MAX_ENTRIES', '100000'))
+    
     # Configurações ChromaDB
     CHROMA_COLLECTION = os.environ.get('CHROMA_COLLECTION', 'documentos_processados')
     CHROMA_BASE_DIR = os.environ.get('CHROMA_BASE_DIR', 'bd')
     CHROMA_DB_NAME = os.environ.get('CHROMA_DB_NAME', 'chroma_db')
     CHROMA_LOCAL_PATH = os.path.join(CHROMA_BASE_DIR, CHROMA_DB_NAME)
+    INDEX_MANIFEST_PATH = os.environ.get('INDEX_MANIFEST_PATH', os.path.join(CHROMA_BASE_DIR, 'index_manifest.json'))
+    
+    # Busca híbrida: índice léxico (BM25) consultado em paralelo à busca vetorial, com fusão por RRF
+    HYBRID_SEARCH_ENABLED = os.environ.get('HYBRID_SEARCH_ENABLED', 'true').lower() == 'true'
+    LEXICAL_INDEX_PATH = os.environ.get('LEXICAL_INDEX_PATH', os.path.join(CHROMA_BASE_DIR, 'lexical_index.sqlite3'))
+    HYBRID_CANDIDATES_MULTIPLIER = int(os.environ.get('HYBRID_CANDIDATES_MULTIPLIER', '2'))
+    HYBRID_RRF_K = int(os.environ.get('HYBRID_RRF_K', '60'))
+    
+    # Histórico de conversas (checkpointer do LangGraph): "sqlite" (persistente, compartilhado
+    # entre os workers) ou "memory" (em memória, por processo)
+    CHECKPOINTER_BACKEND = os.environ.get('CHECKPOINTER_BACKEND', 'sqlite').lower()
+    CHECKPOINTER_PATH = os.environ.get('CHECKPOINTER_PATH', os.path.join(CHROMA_BASE_DIR, 'checkpoints.sqlite3'))
+    CHECKPOINTER_TTL = int(os.environ.get('CHECKPOINTER_TTL', str(7 * 86400)))
+    CHECKPOINTER_MAX_MESSAGES = int(os.environ.get('CHECKPOINTER_MAX_MESSAGES', '40'))
+    # Limites do backend "memory" (chats menos usados são removidos primeiro)
+    CHAT_STATE_MAX_THREADS = int(os.environ.get('CHAT_STATE_MAX_THREADS', '1000'))
+    CHAT_STATE_MAX_BYTES = int(os.environ.get('CHAT_STATE_MAX_BYTES', str(64 * 1024 * 1024)))
     
     # Configurações de processamento
     CHUNK_SIZE = int(os.environ.get('CHUNK_SIZE', '1000'))
     CHUNK_OVERLAP = int(os.environ.get('CHUNK_OVERLAP', '100'))
     MAX_CONTEXT_DOCS = int(os.environ.get('MAX_CONTEXT_DOCS', '5'))
     
+    # Busca especulativa com a query original em paralelo ao GEQS
+    SPECULATIVE_SEARCH_ENABLED = os.environ.get('SPECULATIVE_SEARCH_ENABLED', 'true').lower() == 'true'
+    SPECULATIVE_SIMILARITY_THRESHOLD = float(os.environ.get('SPECULATIVE_SIMILARITY_THRESHOLD', '0.85'))
+    
+    # Classificador local que evita chamadas ao GEQS
+    QUERY_CLASSIFIER_ENABLED = os.environ.get('QUERY_CLASSIFIER_ENABLED', 'true').lower() == 'true'
+    QUERY_CLASSIFIER_THRESHOLD = float(os.environ.get('QUERY_CLASSIFIER_THRESHOLD', '0.75'))
+    
+    # Filtros de metadados pedidos explicitamente na pergunta quando não informados em /query
+    # (processo, "documentos do tipo ..."); um tipo de peça apenas mencionado prioriza as peças do tipo
+    METADATA_FILTERS_AUTO_DETECT = os.environ.get('METADATA_FILTERS_AUTO_DETECT', 'true').lower() == 'true'
+    
+    # Reordenação local dos candidatos (busca traz MAX_CONTEXT_DOCS * RERANK_OVERFETCH documentos)
+    RERANK_ENABLED = os.environ.get('RERANK_ENABLED', 'false').lower() == 'true'
+    RERANK_OVERFETCH = int(os.environ.get('RERANK_OVERFETCH', '4'))
+    RERANK_LEXICAL_WEIGHT = float(os.environ.get('RERANK_LEXICAL_WEIGHT', '0.5'))
+    RERANK_TIME_BUDGET_MS = float(os.environ.get('RERANK_TIME_BUDGET_MS', '50'))
+    
+    # Cache de resultados da busca vetorial (query normalizada, k, filtros, versão do índice)
+    RETRIEVAL_CACHE_ENABLED = os.environ.get('RETRIEVAL_CACHE_ENABLED', 'true').lower() == 'true'
+    RETRIEVAL_CACHE_MAX_ENTRIES = int(os.environ.get('RETRIEVAL_CACHE_MAX_ENTRIES', '2048'))
+    RETRIEVAL_CACHE_TTL = int(os.environ.get('RETRIEVAL_CACHE_TTL', '3600'))
+    
+    # Cache semântico de respostas (queries parecidas com os mesmos trechos recuperados)
+    ANSWER_CACHE_ENABLED = os.environ.get('ANSWER_CACHE_ENABLED', 'true').lower() == 'true'
+    ANSWER_CACHE_MAX_DISTANCE = float(os.environ.get('ANSWER_CACHE_MAX_DISTANCE', '0.05'))
+    ANSWER_CACHE_MAX_ENTRIES = int(os.environ.get('ANSWER_CACHE_MAX_ENTRIES', '1000'))
+    ANSWER_CACHE_TTL = int(os.environ.get('ANSWER_CACHE_TTL', '3600'))
+    
+    # Pipeline de embeddings da indexação
+    EMBEDDING_BATCH_SIZE = int(os.environ.get('EMBEDDING_BATCH_SIZE', '16'))
+    EMBEDDING_MAX_WORKERS = int(os.environ.get('EMBEDDING_MAX_WORKERS', '8'))
+    EMBEDDING_MAX_RPS = float(os.environ.get('EMBEDDING_MAX_RPS', '20'))
+    EMBEDDING_MAX_RETRIES = int(os.environ.get('EMBEDDING_MAX_RETRIES', '5'))
+    
+    # Paralelismo da ingestão de documentos
+    INGEST_DOWNLOAD_WORKERS = int(os.environ.get('INGEST_DOWNLOAD_WORKERS', '8'))
+    INGEST_PARSE_WORKERS = int(os.environ.get('INGEST_PARSE_WORKERS', str(os.cpu_count() or 1)))
+    INGEST_MAX_IN_FLIGHT = int(os.environ.get('INGEST_MAX_IN_FLIGHT', '16'))
+    INGEST_SPOOL_MAX_MEMORY = int(os.environ.get('INGEST_SPOOL_MAX_MEMORY', str(32 * 1024 * 1024)))
+    
+    # App ASGI (SERVER_MODE=asgi no entrypoint): threads para as chamadas bloqueantes (ChromaDB, embeddings)
+    ASGI_MAX_BLOCKING_THREADS = int(os.environ.get('ASGI_MAX_BLOCKING_THREADS', '32'))
+    
     # AWS
     AWS_PROFILE = os.environ.get('AWS_PROFILE', None)
     DEBUG_MODE = os.environ.get('DEBUG_MODE', 'True').lower() == 'true'
@@ -41,13 +113,26 @@ class Config:
     CLOUDWATCH_LOG_GROUP = os.environ.get('CLOUDWATCH_LOG_GROUP', 'juridico-rag-app')
     CLOUDWATCH_REGION = os.environ.get('CLOUDWATCH_REGION', BEDROCK_REGION)
     ENABLE_CLOUDWATCH_LOGS = os.environ.get('ENABLE_CLOUDWATCH_LOGS', 'true').lower() == 'true'
+    # Endpoint alternativo do CloudWatch Logs (ex.: um substituto local para testes)
+    CLOUDWATCH_ENDPOINT_URL = os.environ.get('CLOUDWATCH_ENDPOINT_URL', '')
+    
+    # Pipeline de logs: fila não bloqueante e envio em lotes por uma única thread
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+    LOG_BATCH_SIZE = int(os.environ.get('LOG_BATCH_SIZE', '500'))
+    LOG_FLUSH_INTERVAL = float(os.environ.get('LOG_FLUSH_INTERVAL', '2.0'))
+    LOG_CONSOLE = os.environ.get('LOG_CONSOLE', 'true').lower() == 'true'
+    # Arquivo que recebe os lotes quando o CloudWatch falha (vazio: stderr, se o console estiver desabilitado)
+    LOG_FALLBACK_FILE = os.environ.get('LOG_FALLBACK_FILE', '')
     
     @classmethod
-    def validate(cls):
+    def validate(cls, require_s3=True):
         """
         Valida as configurações obrigatórias
+        
+        Args:
+            require_s3: Se False, dispensa o bucket S3 (indexação a partir de origem local)
         """
-        if not cls.S3_BUCKET_NAME:
+        if require_s3 and not cls.S3_BUCKET_NAME:
             raise ValueError("A variável de ambiente S3_BUCKET_NAME é obrigatória")
         
         # Garante que os diretórios para o ChromaDB existam
@@ -88,12 +173,25 @@ class Config:
         
         cloudwatch_client = None
         if cls.ENABLE_CLOUDWATCH_LOGS:
-            cloudwatch_client = session.client(
-                service_name='logs',
-                region_name=cls.CLOUDWATCH_REGION
-            )
-            logger.info(f"Cliente CloudWatch Logs criado (região: {cls.CLOUDWATCH_REGION})")
+            cloudwatch_client = cls.get_cloudwatch_client(session)
         
         logger.info(f"Clientes AWS criados (região Bedrock: {cls.BEDROCK_REGION})")
         
-        return s3_client, bedrock_client, cloudwatch_client 
\ No newline at end of file
+        return s3_client, bedrock_client, cloudwatch_client
+    
+    @classmethod
+    def get_cloudwatch_client(cls, session=None):
+        """
+        Cria o cliente do CloudWatch Logs (no endpoint alternativo, se configurado)
+        
+        Args:
+            session: Sessão AWS (opcional; criada se não informada)
+        """
+        session = session or cls.get_aws_session()
+        cloudwatch_client = session.client(
+            service_name='logs',
+            region_name=cls.CLOUDWATCH_REGION,
+            endpoint_url=cls.CLOUDWATCH_ENDPOINT_URL or None
+        )
+        logger.info(f"Cliente CloudWatch Logs criado (região: {cls.CLOUDWATCH_REGION})")
+        return cloudwatch_client
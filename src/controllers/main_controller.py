@@ -1,5 +1,5 @@
-from flask import request, jsonify
-import os, sys
+from flask import request, jsonify, Response, stream_with_context
+import os, sys, json
 
 # ⬇️ Adiciona o caminho src para os imports funcionarem
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -10,6 +10,8 @@ from services.llm_service import LLMService
 from services.retrieval_and_generation.vector_search_service import VectorSearchService
 
 from repository.chromaDB_repo import ChromaRepository
+# Mesmo módulo importado por main.py/asgi.py, que instalam o pipeline de logs
+from services.cloudwatch_logger_service import CloudWatchLoggerService
 
 
 from config import Config
@@ -19,7 +21,14 @@ from src.services.llm_service import LLMService
 from src.services.indexing.embedding_service import EmbeddingService
 from src.services.retrieval_and_generation.vector_search_service import VectorSearchService
 from src.services.retrieval_and_generation.rag_service import RAGService
+from src.services.query_classifier_service import QueryClassifierService
+from src.services.document_metadata import normalize_filters
+from src.services.retrieval_and_generation.semantic_answer_cache import SemanticAnswerCache
+from src.services.retrieval_and_generation.retrieval_cache import RetrievalCache
+from src.services.retrieval_and_generation.reranker_service import RerankerService
 from src.repository.chromaDB_repo import ChromaRepository
+from src.repository.lexical_index_repo import LexicalIndex
+from src.repository.checkpoint_repo import create_checkpointer
 
 from langchain.chains.conversation.memory import ConversationSummaryBufferMemory
 from langgraph.graph import StateGraph, START, END
@@ -33,7 +42,8 @@ _, bedrock_client, _ = Config.get_aws_clients()
 
 embedding_service = EmbeddingService(
     bedrock_client=bedrock_client,
-    model_id=Config.EMBEDDING_MODEL_ID
+    model_id=Config.EMBEDDING_MODEL_ID,
+    cache=EmbeddingService.build_query_cache(Config.EMBEDDING_MODEL_ID)
 )
     
 chroma_repository = ChromaRepository(
@@ -42,24 +52,97 @@ chroma_repository = ChromaRepository(
     chroma_path="../"+Config.CHROMA_LOCAL_PATH
 )
 
+retrieval_cache = None
+if Config.RETRIEVAL_CACHE_ENABLED:
+    retrieval_cache = RetrievalCache(
+        max_entries=Config.RETRIEVAL_CACHE_MAX_ENTRIES,
+        ttl=Config.RETRIEVAL_CACHE_TTL
+    )
+
+lexical_index = None
+if Config.HYBRID_SEARCH_ENABLED:
+    lexical_index = LexicalIndex("../"+Config.LEXICAL_INDEX_PATH)
+
 vector_search_service = VectorSearchService(
     chroma_repository=chroma_repository,
-    embedding_service=embedding_service
+    embedding_service=embedding_service,
+    retrieval_cache=retrieval_cache,
+    lexical_index=lexical_index,
+    candidates_multiplier=Config.HYBRID_CANDIDATES_MULTIPLIER,
+    rrf_k=Config.HYBRID_RRF_K
+)
+
+checkpointer = create_checkpointer(
+    backend=Config.CHECKPOINTER_BACKEND,
+    path="../"+Config.CHECKPOINTER_PATH,
+    ttl=Config.CHECKPOINTER_TTL,
+    max_messages=Config.CHECKPOINTER_MAX_MESSAGES,
+    max_threads=Config.CHAT_STATE_MAX_THREADS,
+    max_bytes=Config.CHAT_STATE_MAX_BYTES
 )
 
 llm_service = LLMService(
-    bedrock_client=bedrock_client
+    bedrock_client=bedrock_client,
+    checkpointer=checkpointer
 )
 
+query_classifier = None
+if Config.QUERY_CLASSIFIER_ENABLED:
+    query_classifier = QueryClassifierService(
+        confidence_threshold=Config.QUERY_CLASSIFIER_THRESHOLD
+    )
+
+answer_cache = None
+if Config.ANSWER_CACHE_ENABLED:
+    answer_cache = SemanticAnswerCache(
+        max_entries=Config.ANSWER_CACHE_MAX_ENTRIES,
+        max_distance=Config.ANSWER_CACHE_MAX_DISTANCE,
+        ttl=Config.ANSWER_CACHE_TTL
+    )
+
+reranker = None
+if Config.RERANK_ENABLED:
+    reranker = RerankerService(
+        lexical_weight=Config.RERANK_LEXICAL_WEIGHT,
+        time_budget=Config.RERANK_TIME_BUDGET_MS / 1000
+    )
+
 rag_service = RAGService(
     vector_search_service=vector_search_service,
     llm_service=llm_service,
-    max_context_docs=Config.MAX_CONTEXT_DOCS
+    max_context_docs=Config.MAX_CONTEXT_DOCS,
+    speculative_search=Config.SPECULATIVE_SEARCH_ENABLED,
+    speculative_similarity_threshold=Config.SPECULATIVE_SIMILARITY_THRESHOLD,
+    query_classifier=query_classifier,
+    answer_cache=answer_cache,
+    auto_filters=Config.METADATA_FILTERS_AUTO_DETECT,
+    reranker=reranker,
+    rerank_overfetch=Config.RERANK_OVERFETCH
 )
 
 def Main():
     return "🧠 API RAG rodando"
 
+def get_metrics():
+    return {
+        "chroma": chroma_repository.get_metrics(),
+        "embedding_cache": embedding_service.get_cache_metrics(),
+        "search": vector_search_service.get_metrics(),
+        "rag": rag_service.get_metrics(),
+        "checkpointer": checkpointer.get_metrics(),
+        "token_counter": llm_service.graph_service.token_counter.get_metrics(),
+        "logging": CloudWatchLoggerService.get_metrics()
+    }
+
+def get_chat_stats():
+    return checkpointer.get_metrics()
+
+def Metrics():
+    return jsonify(get_metrics())
+
+def ChatStats():
+    return jsonify(get_chat_stats())
+
 def ProcessQuery():
     data = request.get_json()
     query = data.get("query", None)
@@ -70,7 +153,34 @@ def ProcessQuery():
     elif chat_id is None:
         return jsonify({"error": "chat_id is required"}), 400
 
-    result = rag_service.process_query(query, chat_id)
+    # Filtros opcionais de metadados, ex.: {"case_id": "RE1463299", "doc_type": "agravo"}
+    try:
+        filters = normalize_filters(data.get("filters", None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = rag_service.process_query(query, chat_id, filters)
     return jsonify(result)
 
+def ProcessQueryStream():
+    data = request.get_json()
+    query = data.get("query", None)
+    chat_id = data.get("chat_id", None)
+
+    if query is None:
+        return jsonify({"error": "query is required"}), 400
+    elif chat_id is None:
+        return jsonify({"error": "chat_id is required"}), 400
+
+    # Filtros opcionais de metadados, ex.: {"case_id": "RE1463299", "doc_type": "agravo"}
+    try:
+        filters = normalize_filters(data.get("filters", None))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # NDJSON: um evento JSON por linha ("start", "token"..., "end" ou "error")
+    def generate():
+        for event in rag_service.stream_query(query, chat_id, filters):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
 
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
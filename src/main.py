@@ -6,11 +6,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
 import logging
 from flask import Flask
-from controllers.main_controller import Main, ProcessQuery
+from controllers.main_controller import Main, ProcessQuery, ProcessQueryStream, Metrics, ChatStats
 from config import Config
 from services.cloudwatch_logger_service import CloudWatchLoggerService
 
-# Configurar o logger global com suporte a CloudWatch
+# Configurar o logger global e o pipeline de logs do processo (console e CloudWatch), usado por todos os serviços
 logger = CloudWatchLoggerService.setup_logger(
     logger_name="chatbot_api",
     log_level=logging.INFO if not Config.DEBUG_MODE else logging.DEBUG,
@@ -18,29 +18,6 @@ logger = CloudWatchLoggerService.setup_logger(
     log_group=Config.CLOUDWATCH_LOG_GROUP
 )
 
-# Configurar loggers para todos os serviços
-if Config.ENABLE_CLOUDWATCH_LOGS:
-    logger.info("Configurando loggers de serviços para CloudWatch...")
-    service_loggers = [
-        'llm_service', 's3_service', 'config', 
-        'retrieval_service', 'indexing_service',
-        'bedrock_service', 'chroma_service', 'rag_service',
-        'vector_search_service', 'embedding_service'
-    ]
-    
-    # Obter cliente CloudWatch
-    _, _, cloudwatch_client = Config.get_aws_clients()
-    
-    # Configurar cada logger de serviço
-    for service_name in service_loggers:
-        service_logger = logging.getLogger(service_name)
-        CloudWatchLoggerService.add_cloudwatch_handler(
-            existing_logger=service_logger,
-            cloudwatch_client=cloudwatch_client,
-            log_group_name=Config.CLOUDWATCH_LOG_GROUP
-        )
-    logger.info(f"✅ {len(service_loggers)} loggers de serviços configurados para CloudWatch")
-
 app = Flask(__name__)
 
 # Rota de saúde
@@ -49,12 +26,28 @@ def main():
     logger.info("Endpoint de saúde acessado")
     return Main()
 
+# Rota de métricas internas (caches, carregamento do ChromaDB)
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    return Metrics()
+
+# Rota de estatísticas do estado dos chats (número de chats e bytes em memória)
+@app.route("/chats/stats", methods=["GET"])
+def chat_stats():
+    return ChatStats()
+
 # Rota de consulta RAG
 @app.route("/query", methods=["POST"])
 def process_query():
     logger.info("Requisição de consulta recebida")
     return ProcessQuery()
 
+# Rota de consulta RAG com resposta em streaming (NDJSON)
+@app.route("/query/stream", methods=["POST"])
+def process_query_stream():
+    logger.info("Requisição de consulta (streaming) recebida")
+    return ProcessQueryStream()
+
 #teste local
 #if __name__ == "__main__":
     #app.run(host="0.0.0.0", port=5000, debug=True)
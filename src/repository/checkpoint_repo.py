@@ -0,0 +1,535 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from langgraph.checkpoint.base import BaseCheckpointSaver, get_checkpoint_id
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+logger = logging.getLogger("checkpoint_repository")
+
+class SqliteCheckpointSaver(SqliteSaver):
+    """
+    Checkpointer do LangGraph persistido em SQLite (modo WAL)
+
+    Camada fina sobre o SqliteSaver do langgraph-checkpoint-sqlite, que cuida
+    da serialização e das leituras. O arquivo é compartilhado entre os workers
+    do gunicorn/uvicorn, então o histórico de um chat não depende do worker
+    que recebe a mensagem e sobrevive a reinicializações. Esta classe acrescenta:
+    - apenas os últimos `keep_checkpoints` checkpoints de cada thread são mantidos;
+    - o histórico de mensagens de cada thread é compactado para as últimas `max_messages`;
+    - threads sem atividade há mais de `ttl` segundos são removidas;
+    - put_if_latest, a escrita condicionada usada pelo SnapshotCheckpointer;
+    - versões assíncronas das operações (em uma thread, como o restante do acesso ao SQLite).
+    """
+
+    def __init__(self, path, ttl=7 * 86400, max_messages=40, keep_checkpoints=2,
+                 eviction_interval=300, serde=None):
+        """
+        Inicializa o checkpointer
+
+        Args:
+            path: Caminho do arquivo SQLite
+            ttl: Tempo (s) sem atividade após o qual um chat é removido (0 desabilita)
+            max_messages: Número máximo de mensagens mantidas por chat (0 desabilita a compactação)
+            keep_checkpoints: Número de checkpoints mantidos por chat
+            eviction_interval: Intervalo mínimo (s) entre duas varreduras de chats expirados
+            serde: Serializador do LangGraph (padrão: JsonPlusSerializer)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # O busy timeout cobre a concorrência entre processos
+        conn = sqlite3.connect(path, timeout=10, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        super().__init__(conn, serde=serde)
+        # Reentrante: put_if_latest mantém o lock (e a transação) durante o put do SqliteSaver
+        self.lock = threading.RLock()
+
+        self.path = path
+        self.ttl = ttl
+        self.max_messages = max_messages
+        self.keep_checkpoints = max(1, keep_checkpoints)
+        self.eviction_interval = eviction_interval
+
+        self._last_eviction = 0.0
+        self._metrics = {"puts": 0, "compactions": 0, "evicted_threads": 0}
+
+        self._drop_legacy_schema()
+        self.setup()
+        conn.executescript(
+            "CREATE TABLE IF NOT EXISTS threads ("
+            "thread_id TEXT PRIMARY KEY, updated_at REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS threads_updated_at ON threads (updated_at);"
+        )
+        logger.info(f"✅ Checkpointer SQLite inicializado: {path}")
+
+    def _drop_legacy_schema(self):
+        """
+        Remove as tabelas do checkpointer anterior (formato próprio, incompatível com o SqliteSaver)
+        """
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(checkpoints)")}
+        if "metadata_type" not in columns:
+            return
+        logger.warning("⚠️ Histórico de conversas em formato antigo removido (incompatível com o SqliteSaver)")
+        self.conn.executescript(
+            "DROP TABLE IF EXISTS checkpoints; DROP TABLE IF EXISTS writes; DROP TABLE IF EXISTS threads;"
+        )
+
+    # ------------------------------------------------------------------ escrita
+
+    def _compact_messages(self, checkpoint):
+        """
+        Mantém apenas as últimas `max_messages` mensagens do estado, começando
+        por uma mensagem do usuário (para não deixar uma resposta sem a pergunta)
+        """
+        messages = checkpoint.get("channel_values", {}).get("messages")
+        if not self.max_messages or not isinstance(messages, list) or len(messages) <= self.max_messages:
+            return checkpoint
+
+        kept = messages[-self.max_messages:]
+        while kept and getattr(kept[0], "type", None) != "human":
+            kept = kept[1:]
+
+        self._metrics["compactions"] += 1
+        return {**checkpoint, "channel_values": {**checkpoint["channel_values"], "messages": kept}}
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        return self._put(config, checkpoint, metadata, new_versions)
+
+    def put_if_latest(self, config, checkpoint, metadata, new_versions, expected_id):
+        """
+        Grava o checkpoint apenas se o último checkpoint da thread ainda for `expected_id`
+
+        A verificação e a escrita acontecem na mesma transação, então a
+        garantia vale também entre os workers que compartilham o arquivo.
+
+        Args:
+            expected_id: Id do checkpoint lido pela requisição (None para um chat sem histórico)
+
+        Returns:
+            dict: Config do checkpoint gravado, ou None se outro checkpoint foi gravado antes
+        """
+        return self._put(config, checkpoint, metadata, new_versions, expected_id=expected_id, check_latest=True)
+
+    def _put(self, config, checkpoint, metadata, new_versions, expected_id=None, check_latest=False):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        config = {**config, "configurable": {**config["configurable"], "checkpoint_ns": checkpoint_ns}}
+
+        with self.lock:
+            # Verificação, atividade da thread e checkpoint na mesma transação (confirmada pelo SqliteSaver)
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                if check_latest:
+                    latest = self.conn.execute(
+                        "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                        "ORDER BY checkpoint_id DESC LIMIT 1",
+                        (str(thread_id), checkpoint_ns)
+                    ).fetchone()
+                    if (latest[0] if latest else None) != expected_id:
+                        self.conn.rollback()
+                        return None
+                self.conn.execute("INSERT OR REPLACE INTO threads VALUES (?, ?)", (str(thread_id), time.time()))
+                next_config = super().put(config, self._compact_messages(checkpoint), metadata, new_versions)
+            except Exception:
+                self.conn.rollback()
+                raise
+
+            with self.cursor() as cur:
+                self._prune_checkpoints(cur, str(thread_id), checkpoint_ns)
+            self._metrics["puts"] += 1
+
+        self._maybe_evict()
+        return next_config
+
+    def _prune_checkpoints(self, cur, thread_id, checkpoint_ns):
+        """
+        Remove os checkpoints antigos (e suas escritas pendentes) de uma thread
+        """
+        stale = cur.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT -1 OFFSET ?",
+            (thread_id, checkpoint_ns, self.keep_checkpoints)
+        ).fetchall()
+        for (checkpoint_id,) in stale:
+            params = (thread_id, checkpoint_ns, checkpoint_id)
+            cur.execute(
+                "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+            )
+            cur.execute(
+                "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?", params
+            )
+
+    def delete_thread(self, thread_id):
+        with self.lock:
+            super().delete_thread(thread_id)
+            with self.cursor() as cur:
+                cur.execute("DELETE FROM threads WHERE thread_id = ?", (str(thread_id),))
+
+    # ------------------------------------------------------------------ expiração
+
+    def _maybe_evict(self):
+        if not self.ttl or time.time() - self._last_eviction < self.eviction_interval:
+            return
+        try:
+            self.evict_idle()
+        except sqlite3.Error as e:
+            logger.warning(f"Falha ao remover chats expirados: {str(e)}")
+
+    def evict_idle(self):
+        """
+        Remove os chats sem atividade há mais de `ttl` segundos
+
+        Returns:
+            int: Número de chats removidos
+        """
+        with self.lock:
+            self._last_eviction = time.time()
+            cutoff = self._last_eviction - self.ttl
+            with self.cursor(transaction=False) as cur:
+                thread_ids = [row[0] for row in cur.execute(
+                    "SELECT thread_id FROM threads WHERE updated_at < ?", (cutoff,)
+                ).fetchall()]
+            for thread_id in thread_ids:
+                self.delete_thread(thread_id)
+            self._metrics["evicted_threads"] += len(thread_ids)
+
+        if thread_ids:
+            logger.info(f"🗑️ {len(thread_ids)} chats sem atividade removidos do checkpointer")
+        return len(thread_ids)
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do checkpointer
+
+        Returns:
+            dict: Contadores, número de chats e tamanho do arquivo
+        """
+        with self.cursor(transaction=False) as cur:
+            metrics = dict(self._metrics)
+            metrics["threads"] = cur.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+        metrics["backend"] = "sqlite"
+        metrics["file_bytes"] = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return metrics
+
+    # ------------------------------------------------------------------ versões assíncronas
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+class BoundedMemorySaver(MemorySaver):
+    """
+    Checkpointer em memória (por processo) com limite de chats e de bytes
+
+    Cada chat mantém apenas os últimos `keep_checkpoints` checkpoints; quando o
+    número de chats ou o total de bytes serializados ultrapassa o limite, os
+    chats usados há mais tempo (LRU) são removidos.
+    """
+
+    def __init__(self, max_threads=1000, max_bytes=64 * 1024 * 1024, keep_checkpoints=2, serde=None):
+        """
+        Inicializa o checkpointer
+
+        Args:
+            max_threads: Número máximo de chats mantidos em memória
+            max_bytes: Tamanho máximo (bytes serializados) do estado de todos os chats
+            keep_checkpoints: Número de checkpoints mantidos por chat
+            serde: Serializador do LangGraph (padrão: JsonPlusSerializer)
+        """
+        super().__init__(serde=serde)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.keep_checkpoints = max(1, keep_checkpoints)
+
+        self._lock = threading.RLock()
+        self._threads = OrderedDict()  # thread_id -> bytes (ordem de uso, do mais antigo ao mais recente)
+        self._bytes = 0
+        self._versions = {}  # (thread_id, checkpoint_ns, checkpoint_id) -> channel_versions
+        self._metrics = {"evicted_threads": 0}
+
+    def _touch(self, thread_id):
+        if thread_id in self._threads:
+            self._threads.move_to_end(thread_id)
+
+    def get_tuple(self, config):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id not in self._threads:
+                # Evita que o defaultdict crie entradas vazias para chats desconhecidos
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._lock:
+            if config and config["configurable"]["thread_id"] not in self._threads:
+                return iter(())
+            return iter(list(super().list(config, filter=filter, before=before, limit=limit)))
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self._versions[(thread_id, checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+
+            self._prune_checkpoints(thread_id, checkpoint_ns)
+            self._account(thread_id)
+            self._evict()
+            return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._threads:
+                self._account(thread_id)
+
+    def delete_thread(self, thread_id):
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._bytes -= self._threads.pop(thread_id, 0)
+            for key in [key for key in self._versions if key[0] == thread_id]:
+                del self._versions[key]
+
+    def _prune_checkpoints(self, thread_id, checkpoint_ns):
+        """
+        Remove os checkpoints antigos de um chat, suas escritas e os valores
+        de canais que não são mais referenciados
+        """
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        stale = sorted(checkpoints.keys())[:-self.keep_checkpoints]
+        if not stale:
+            return
+
+        for checkpoint_id in stale:
+            del checkpoints[checkpoint_id]
+            self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+            stale_versions = self._versions.pop((thread_id, checkpoint_ns, checkpoint_id), {})
+
+            referenced = set()
+            for checkpoint_key in checkpoints:
+                referenced.update(self._versions.get((thread_id, checkpoint_ns, checkpoint_key), {}).items())
+            for channel_version in stale_versions.items():
+                if channel_version not in referenced:
+                    self.blobs.pop((thread_id, checkpoint_ns, *channel_version), None)
+
+    def _thread_size(self, thread_id):
+        """
+        Calcula o tamanho (bytes serializados) do estado de um chat
+        """
+        size = 0
+        for checkpoint_ns, checkpoints in self.storage.get(thread_id, {}).items():
+            for checkpoint_id, (checkpoint, metadata, _) in checkpoints.items():
+                size += len(checkpoint[1]) + len(metadata[1])
+                for write in self.writes.get((thread_id, checkpoint_ns, checkpoint_id), {}).values():
+                    size += len(write[2][1])
+                for channel_version in self._versions.get((thread_id, checkpoint_ns, checkpoint_id), {}).items():
+                    blob = self.blobs.get((thread_id, checkpoint_ns, *channel_version))
+                    if blob is not None:
+                        size += len(blob[1])
+        return size
+
+    def _account(self, thread_id):
+        size = self._thread_size(thread_id)
+        self._bytes += size - self._threads.get(thread_id, 0)
+        self._threads[thread_id] = size
+        self._threads.move_to_end(thread_id)
+
+    def _evict(self):
+        """
+        Remove os chats menos usados recentemente até respeitar os limites
+        (o chat mais recente nunca é removido)
+        """
+        evicted = 0
+        while len(self._threads) > 1 and (
+            len(self._threads) > self.max_threads or self._bytes > self.max_bytes
+        ):
+            thread_id = next(iter(self._threads))
+            self.delete_thread(thread_id)
+            evicted += 1
+
+        if evicted:
+            self._metrics["evicted_threads"] += evicted
+            logger.info(f"🗑️ {evicted} chats removidos da memória (LRU)")
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do checkpointer
+
+        Returns:
+            dict: Número de chats, bytes residentes, limites e remoções
+        """
+        with self._lock:
+            return {
+                "backend": "memory",
+                "threads": len(self._threads),
+                "resident_bytes": self._bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "evicted_threads": self._metrics["evicted_threads"]
+            }
+
+
+class TurnWrite:
+    """
+    Escrita de um turno condicionada ao checkpoint lido pela requisição
+
+    Guarda o id do checkpoint entregue ao grafo; se outra requisição do mesmo
+    chat gravar um checkpoint antes, a escrita é descartada e `conflict` indica
+    que o turno deve ser reaplicado sobre o estado mais recente.
+    """
+
+    def __init__(self):
+        self.base_id = None
+        self.conflict = False
+
+
+class SnapshotCheckpointer(BaseCheckpointSaver):
+    """
+    Envolve um checkpointer para reaproveitar o estado já carregado na requisição
+
+    Quando o config traz o checkpoint carregado previamente (SNAPSHOT_KEY), o
+    grafo o recebe sem uma nova leitura. Quando traz um TurnWrite (WRITE_KEY),
+    o checkpoint só é gravado se o checkpoint lido ainda for o último do chat
+    (compare-and-swap), para que duas requisições simultâneas do mesmo chat
+    não gravem filhos do mesmo pai e uma descarte o turno da outra. As demais
+    operações são delegadas.
+    """
+
+    SNAPSHOT_KEY = "__chat_snapshot"
+    WRITE_KEY = "__chat_write"
+
+    def __init__(self, checkpointer):
+        """
+        Args:
+            checkpointer: Checkpointer real (SQLite ou em memória)
+        """
+        super().__init__(serde=checkpointer.serde)
+        self.checkpointer = checkpointer
+        # Checkpointers sem put_if_latest (em memória) são locais ao processo: o lock basta
+        self._write_lock = threading.Lock()
+
+    def _from_snapshot(self, config):
+        configurable = config["configurable"]
+        if self.SNAPSHOT_KEY not in configurable or get_checkpoint_id(config):
+            return False, None
+        return True, configurable[self.SNAPSHOT_KEY]
+
+    def _record_base(self, config, checkpoint_tuple):
+        write = config["configurable"].get(self.WRITE_KEY)
+        if write is not None and not get_checkpoint_id(config):
+            write.base_id = checkpoint_tuple.config["configurable"]["checkpoint_id"] if checkpoint_tuple else None
+        return checkpoint_tuple
+
+    def get_tuple(self, config):
+        found, snapshot = self._from_snapshot(config)
+        return self._record_base(config, snapshot if found else self.checkpointer.get_tuple(config))
+
+    async def aget_tuple(self, config):
+        found, snapshot = self._from_snapshot(config)
+        return self._record_base(config, snapshot if found else await self.checkpointer.aget_tuple(config))
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.checkpointer.list(config, filter=filter, before=before, limit=limit)
+
+    def alist(self, config, *, filter=None, before=None, limit=None):
+        return self.checkpointer.alist(config, filter=filter, before=before, limit=limit)
+
+    def _put_if_latest(self, config, checkpoint, metadata, new_versions, expected_id):
+        if hasattr(self.checkpointer, "put_if_latest"):
+            return self.checkpointer.put_if_latest(config, checkpoint, metadata, new_versions, expected_id)
+
+        configurable = config["configurable"]
+        latest = self.checkpointer.get_tuple({
+            "configurable": {"thread_id": configurable["thread_id"], "checkpoint_ns": configurable.get("checkpoint_ns", "")}
+        })
+        if (latest.config["configurable"]["checkpoint_id"] if latest else None) != expected_id:
+            return None
+        return self.checkpointer.put(config, checkpoint, metadata, new_versions)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        write = config["configurable"].get(self.WRITE_KEY)
+        if write is None:
+            return self.checkpointer.put(config, checkpoint, metadata, new_versions)
+
+        with self._write_lock:
+            next_config = self._put_if_latest(config, checkpoint, metadata, new_versions, write.base_id)
+        if next_config is not None:
+            return next_config
+
+        write.conflict = True
+        logger.warning(f"⚠️ Chat {config['configurable']['thread_id']} alterado por outra requisição, o turno será reaplicado")
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        if self.WRITE_KEY not in config["configurable"]:
+            return await self.checkpointer.aput(config, checkpoint, metadata, new_versions)
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        return self.checkpointer.put_writes(config, writes, task_id, task_path)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await self.checkpointer.aput_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id):
+        return self.checkpointer.delete_thread(thread_id)
+
+    async def adelete_thread(self, thread_id):
+        return await self.checkpointer.adelete_thread(thread_id)
+
+    def get_next_version(self, current, channel):
+        return self.checkpointer.get_next_version(current, channel)
+
+
+def create_checkpointer(backend, path=None, ttl=7 * 86400, max_messages=40,
+                        max_threads=1000, max_bytes=64 * 1024 * 1024):
+    """
+    Cria o checkpointer do histórico de conversas a partir da configuração
+
+    Args:
+        backend: "sqlite" (persistente e compartilhado entre workers) ou "memory"
+        path: Caminho do arquivo SQLite (backend "sqlite")
+        ttl: Tempo (s) sem atividade após o qual um chat é removido (backend "sqlite")
+        max_messages: Número máximo de mensagens mantidas por chat (backend "sqlite")
+        max_threads: Número máximo de chats em memória (backend "memory")
+        max_bytes: Tamanho máximo do estado em memória (backend "memory")
+
+    Returns:
+        BaseCheckpointSaver: Checkpointer para o GraphService
+    """
+    if backend == "sqlite":
+        return SqliteCheckpointSaver(path, ttl=ttl, max_messages=max_messages)
+    if backend == "memory":
+        return BoundedMemorySaver(max_threads=max_threads, max_bytes=max_bytes)
+    raise ValueError(f"Backend de checkpointer inválido: {backend}")
@@ -1,15 +1,23 @@
 import os
+import time
+import tempfile
 import logging
+import threading
 import chromadb
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 
 logger = logging.getLogger("chroma_repository")
 
 class ChromaRepository:
+    # Clientes compartilhados pelo processo (um por caminho), evitando reabrir o SQLite/HNSW
+    _clients = {}
+    _clients_lock = threading.Lock()
+
     def __init__(self, embedding_function, collection_name, chroma_path):
         """
         Inicializa o repositório ChromaDB
-        
+
         Args:
             embedding_function: Função de embedding a ser usada
             collection_name: Nome da coleção no ChromaDB
@@ -18,37 +26,249 @@ class ChromaRepository:
         self.embedding_function = embedding_function
         self.collection_name = collection_name
         self.chroma_path = chroma_path
-        
+
+        # Estado do vectorstore em cache (aberto sob demanda)
+        self._lock = threading.RLock()
+        self._vectorstore = None
+        self._loaded_key = None
+        # Versão do índice gravada no diretório do ChromaDB a cada alteração da coleção (por qualquer processo);
+        # caches de busca/respostas dependem dela
+        self._version_path = os.path.join(chroma_path, f"index_version-{collection_name}")
+        self._metrics = {
+            "loads": 0,
+            "cache_hits": 0,
+            "invalidations": 0,
+            "last_load_time": None,
+            "total_load_time": 0.0
+        }
+
         if not os.path.exists(chroma_path):
             os.makedirs(chroma_path, exist_ok=True)
             logger.info(f"Diretório ChromaDB criado: {chroma_path}")
-    
+
+    @classmethod
+    def _get_client(cls, chroma_path):
+        """
+        Retorna o cliente persistente do processo para o caminho informado
+
+        Args:
+            chroma_path: Caminho para o diretório do ChromaDB
+
+        Returns:
+            chromadb.PersistentClient: Cliente compartilhado
+        """
+        path = os.path.abspath(chroma_path)
+        with cls._clients_lock:
+            client = cls._clients.get(path)
+            if client is None:
+                client = chromadb.PersistentClient(path=path)
+                cls._clients[path] = client
+            return client
+
     def get_vectorstore(self):
         """
-        Carrega e retorna o vectorstore do ChromaDB
-        """
-        logger.debug(f"Carregando ChromaDB de: {self.chroma_path}")
-        load_start = __import__('time').time()
-        
-        chroma_client = chromadb.PersistentClient(path=self.chroma_path)
-        vectorstore = Chroma(
-            client=chroma_client,
-            embedding_function=self.embedding_function,
-            collection_name=self.collection_name
-        )
-        
-        load_time = __import__('time').time() - load_start
-        logger.info(f"✅ ChromaDB carregado com sucesso em {load_time:.4f}s")
-        
-        return vectorstore
-    
-    def add_documents(self, documents):
+        Retorna o vectorstore do ChromaDB, abrindo-o apenas na primeira chamada
+        ou quando o caminho/coleção mudarem ou o cache for invalidado
+        """
+        key = (os.path.abspath(self.chroma_path), self.collection_name)
+
+        with self._lock:
+            if self._vectorstore is not None and self._loaded_key == key:
+                self._metrics["cache_hits"] += 1
+                return self._vectorstore
+
+            logger.debug(f"Carregando ChromaDB de: {self.chroma_path}")
+            load_start = time.time()
+
+            chroma_client = self._get_client(self.chroma_path)
+            vectorstore = Chroma(
+                client=chroma_client,
+                embedding_function=self.embedding_function,
+                collection_name=self.collection_name
+            )
+
+            load_time = time.time() - load_start
+            self._vectorstore = vectorstore
+            self._loaded_key = key
+            self._metrics["loads"] += 1
+            self._metrics["last_load_time"] = round(load_time, 4)
+            self._metrics["total_load_time"] += load_time
+            logger.info(f"✅ ChromaDB carregado com sucesso em {load_time:.4f}s")
+
+            return vectorstore
+
+    def get_index_version(self):
+        """
+        Retorna a versão do índice, lida do disco a cada chamada
+
+        A versão é gravada por quem altera a coleção (ex.: init_chroma.py em
+        outro processo), então os processos da API percebem a reindexação.
+
+        Returns:
+            int: Versão do índice (crescente; 0 se a coleção nunca foi alterada)
+        """
+        try:
+            with open(self._version_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
+        except (OSError, ValueError) as e:
+            logger.warning(f"Versão do índice ilegível: {str(e)}")
+            return 0
+
+    def _bump_index_version(self):
+        """
+        Grava uma nova versão do índice (instante atual em ns) de forma atômica
+        """
+        with self._lock:
+            version = max(time.time_ns(), self.get_index_version() + 1)
+            fd, tmp_path = tempfile.mkstemp(dir=self.chroma_path, prefix=".index_version-")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    f.write(str(version))
+                os.replace(tmp_path, self._version_path)
+            except Exception:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+    def invalidate(self, drop_client=False):
+        """
+        Descarta o vectorstore em cache, forçando a reabertura na próxima chamada
+
+        Args:
+            drop_client: Se True, descarta também o cliente compartilhado do caminho
+        """
+        with self._lock:
+            self._vectorstore = None
+            self._loaded_key = None
+            self._metrics["invalidations"] += 1
+
+            if drop_client:
+                path = os.path.abspath(self.chroma_path)
+                with self._clients_lock:
+                    client = self._clients.pop(path, None)
+                if client is not None:
+                    # Limpa o cache de sistemas do chromadb para que o próximo cliente reabra o disco
+                    client.clear_system_cache()
+
+        logger.info(f"Cache do ChromaDB invalidado (descartar cliente: {drop_client})")
+
+    def get_metrics(self):
+        """
+        Retorna as métricas de carregamento e uso do cache do vectorstore
+
+        Returns:
+            dict: Métricas do repositório
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+        metrics["index_version"] = self.get_index_version()
+
+        metrics["total_load_time"] = round(metrics["total_load_time"], 4)
+        requests = metrics["loads"] + metrics["cache_hits"]
+        metrics["cache_hit_rate"] = round(metrics["cache_hits"] / requests, 4) if requests else 0.0
+        return metrics
+
+    def get_collection(self):
+        """
+        Retorna a coleção nativa do ChromaDB (para operações em massa)
+        """
+        client = self._get_client(self.chroma_path)
+        return client.get_or_create_collection(name=self.collection_name, embedding_function=None)
+
+    def upsert_embeddings(self, ids, embeddings, documents):
+        """
+        Grava documentos com embeddings já calculados usando upserts em massa
+
+        Args:
+            ids: IDs dos chunks
+            embeddings: Vetores de embedding, na mesma ordem dos documentos
+            documents: Lista de documentos (chunks)
+        """
+        if not documents:
+            return
+
+        collection = self.get_collection()
+        max_batch_size = self._get_client(self.chroma_path).get_max_batch_size()
+
+        for start in range(0, len(documents), max_batch_size):
+            end = start + max_batch_size
+            collection.upsert(
+                ids=ids[start:end],
+                embeddings=embeddings[start:end],
+                documents=[doc.page_content for doc in documents[start:end]],
+                metadatas=[doc.metadata or None for doc in documents[start:end]]
+            )
+
+        self._bump_index_version()
+        logger.info(f"✅ {len(documents)} documentos gravados (upsert) no ChromaDB")
+
+    def delete(self, ids):
+        """
+        Remove chunks do ChromaDB pelos IDs
+
+        Args:
+            ids: IDs dos chunks a remover
+        """
+        ids = list(ids)
+        if not ids:
+            return
+
+        self.get_collection().delete(ids=ids)
+        self._bump_index_version()
+        logger.info(f"🗑️ {len(ids)} chunks removidos do ChromaDB")
+
+    def count(self):
+        """
+        Retorna o número de chunks na coleção
+        """
+        return self.get_collection().count()
+
+    def get_documents(self, ids):
+        """
+        Busca chunks pelos IDs, preservando a ordem pedida
+
+        Args:
+            ids: IDs dos chunks
+
+        Returns:
+            list: Lista de documentos (IDs inexistentes são ignorados)
+        """
+        ids = list(ids)
+        if not ids:
+            return []
+
+        result = self.get_collection().get(ids=ids, include=["documents", "metadatas"])
+        found = {
+            chunk_id: Document(id=chunk_id, page_content=content or "", metadata=metadata or {})
+            for chunk_id, content, metadata in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+        return [found[chunk_id] for chunk_id in ids if chunk_id in found]
+
+    def reset_collection(self):
+        """
+        Apaga e recria a coleção (usado na reindexação completa)
+        """
+        client = self._get_client(self.chroma_path)
+        try:
+            client.delete_collection(name=self.collection_name)
+        except Exception as e:
+            logger.debug(f"Coleção {self.collection_name} não pôde ser apagada: {str(e)}")
+
+        self.invalidate()
+        self._bump_index_version()
+        logger.info(f"Coleção {self.collection_name} reiniciada")
+
+    def add_documents(self, documents, ids=None):
         """
         Adiciona documentos ao ChromaDB
-        
+
         Args:
             documents: Lista de documentos para adicionar
+            ids: IDs dos chunks (opcional; com IDs existentes o conteúdo é substituído)
         """
         vectorstore = self.get_vectorstore()
-        vectorstore.add_documents(documents)
-        logger.info(f"✅ {len(documents)} documentos adicionados ao ChromaDB") 
\ No newline at end of file
+        vectorstore.add_documents(documents, ids=ids)
+        self._bump_index_version()
+        logger.info(f"✅ {len(documents)} documentos adicionados ao ChromaDB")
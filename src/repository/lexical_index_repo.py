@@ -0,0 +1,279 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import logging
+import threading
+import unicodedata
+from langchain_core.documents import Document
+
+logger = logging.getLogger("lexical_index")
+
+# Termos muito frequentes que não ajudam a ranquear (sem acentos, em minúsculas)
+STOPWORDS = {
+    "a", "o", "as", "os", "um", "uma", "uns", "umas", "de", "do", "da", "dos", "das",
+    "em", "no", "na", "nos", "nas", "por", "pelo", "pela", "pelos", "pelas", "para", "pra",
+    "com", "sem", "sob", "sobre", "ao", "aos", "e", "ou", "que", "se", "qual", "quais",
+    "como", "onde", "quando", "quem", "porque", "foi", "ser", "sao", "era", "esta", "estao",
+    "ha", "tem", "mais", "menos", "muito", "ja", "nao", "sim", "me", "te", "lhe", "seu", "sua"
+}
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Versão do formato gravado; um índice em outra versão é recriado vazio (e reconstruído a partir do ChromaDB)
+SCHEMA_VERSION = 2
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+def tokenize(text):
+    """
+    Extrai os termos úteis de um texto (sem acentos, em minúsculas e sem stopwords)
+
+    Args:
+        text: Texto
+
+    Returns:
+        list: Termos, na ordem em que aparecem
+    """
+    return [
+        term for term in TOKEN_PATTERN.findall(_normalize(text))
+        if term not in STOPWORDS and (len(term) > 1 or term.isdigit())
+    ]
+
+
+class LexicalIndex:
+    """
+    Índice invertido em disco (SQLite FTS5 com ranqueamento BM25) dos mesmos
+    chunks gravados no ChromaDB
+
+    Complementa a busca vetorial em termos exatos (números de processo,
+    artigos, nomes das partes), que os embeddings densos aproximam mal.
+    Cada thread usa a sua própria conexão; as escritas são serializadas.
+    """
+
+    def __init__(self, path):
+        """
+        Inicializa o índice, criando o arquivo e as tabelas se necessário
+
+        Args:
+            path: Caminho do arquivo SQLite do índice
+        """
+        self.path = path
+
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"searches": 0, "total_search_time": 0.0, "errors": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            conn.execute("DROP TABLE IF EXISTS chunks_fts")
+            conn.execute("DROP TABLE IF EXISTS chunk_map")
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_map ("
+            "rowid INTEGER PRIMARY KEY, chunk_id TEXT NOT NULL UNIQUE, metadata TEXT)"
+        )
+        conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5("
+            "content, tokenize='unicode61 remove_diacritics 2')"
+        )
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def build_match_query(query):
+        """
+        Converte o texto da query em uma expressão MATCH do FTS5 (termos em OR)
+
+        Args:
+            query: Texto da query
+
+        Returns:
+            str | None: Expressão MATCH ou None se não houver termos úteis
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        return " OR ".join(f'"{term}"' for term in terms) or None
+
+    def _delete(self, conn, ids):
+        for chunk_id in ids:
+            row = conn.execute("SELECT rowid FROM chunk_map WHERE chunk_id = ?", (chunk_id,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM chunks_fts WHERE rowid = ?", row)
+                conn.execute("DELETE FROM chunk_map WHERE rowid = ?", row)
+
+    def upsert(self, ids, documents):
+        """
+        Grava (ou substitui) chunks no índice
+
+        Args:
+            ids: IDs dos chunks (os mesmos usados no ChromaDB)
+            documents: Lista de documentos, na mesma ordem dos IDs
+        """
+        if not documents:
+            return
+
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(conn, ids)
+                for chunk_id, doc in zip(ids, documents):
+                    metadata = json.dumps(doc.metadata or {}, ensure_ascii=False, default=str)
+                    cursor = conn.execute(
+                        "INSERT INTO chunk_map (chunk_id, metadata) VALUES (?, ?)", (chunk_id, metadata)
+                    )
+                    # O texto é normalizado como a query (ex.: "5º" vira "5o" nos dois lados)
+                    conn.execute(
+                        "INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)",
+                        (cursor.lastrowid, _normalize(doc.page_content))
+                    )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def delete(self, ids):
+        """
+        Remove chunks do índice pelos IDs
+
+        Args:
+            ids: IDs dos chunks a remover
+        """
+        ids = list(ids)
+        if not ids:
+            return
+
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._delete(conn, ids)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+    def reset(self):
+        """
+        Apaga todos os chunks do índice (usado na reindexação completa)
+        """
+        with self._write_lock:
+            conn = self._connection()
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM chunks_fts")
+            conn.execute("DELETE FROM chunk_map")
+            conn.execute("COMMIT")
+        logger.info(f"Índice léxico reiniciado: {self.path}")
+
+    def optimize(self):
+        """
+        Compacta os segmentos do FTS5 (chamado ao final da indexação)
+        """
+        with self._write_lock:
+            self._connection().execute("INSERT INTO chunks_fts (chunks_fts) VALUES ('optimize')")
+
+    def count(self):
+        """
+        Retorna o número de chunks no índice
+        """
+        return self._connection().execute("SELECT COUNT(*) FROM chunk_map").fetchone()[0]
+
+    def rebuild_from(self, chroma_repository, batch_size=1000):
+        """
+        Reconstrói o índice a partir dos chunks já gravados no ChromaDB
+
+        Args:
+            chroma_repository: Repositório ChromaDB de origem
+            batch_size: Número de chunks lidos por vez
+
+        Returns:
+            int: Número de chunks indexados
+        """
+        self.reset()
+        collection = chroma_repository.get_collection()
+        total = 0
+        offset = 0
+        while True:
+            batch = collection.get(include=["documents", "metadatas"], limit=batch_size, offset=offset)
+            if not batch["ids"]:
+                break
+
+            documents = [
+                Document(page_content=content or "", metadata=metadata or {})
+                for content, metadata in zip(batch["documents"], batch["metadatas"])
+            ]
+            self.upsert(batch["ids"], documents)
+            total += len(documents)
+            offset += batch_size
+
+        self.optimize()
+        logger.info(f"✅ Índice léxico reconstruído a partir do ChromaDB: {total} chunks")
+        return total
+
+    def search(self, query, k=5, filters=None):
+        """
+        Busca os chunks mais relevantes para a query (BM25)
+
+        Args:
+            query: Texto da query
+            k: Número de chunks a retornar
+            filters: Filtros de metadados por igualdade (ex.: {"case_id": "RE1463299"})
+
+        Returns:
+            list: Lista de (chunk_id, score), do mais para o menos relevante
+        """
+        match_query = self.build_match_query(query)
+        if match_query is None:
+            return []
+
+        search_start = time.time()
+        try:
+            # bm25() retorna valores negativos: quanto menor, mais relevante
+            sql = ("SELECT m.chunk_id, bm25(chunks_fts) AS score FROM chunks_fts "
+                   "JOIN chunk_map m ON m.rowid = chunks_fts.rowid WHERE chunks_fts MATCH ?")
+            params = [match_query]
+            for field, value in sorted((filters or {}).items()):
+                sql += " AND json_extract(m.metadata, ?) = ?"
+                params.extend([f"$.{field}", value])
+
+            rows = self._connection().execute(sql + " ORDER BY score LIMIT ?", params + [k]).fetchall()
+        except sqlite3.Error as e:
+            with self._metrics_lock:
+                self._metrics["errors"] += 1
+            logger.error(f"❌ Erro na busca léxica: {str(e)}")
+            return []
+
+        with self._metrics_lock:
+            self._metrics["searches"] += 1
+            self._metrics["total_search_time"] += time.time() - search_start
+
+        return [(chunk_id, -score) for chunk_id, score in rows]
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do índice
+
+        Returns:
+            dict: Número de buscas, erros e tempo médio de busca
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        searches = metrics["searches"]
+        metrics["avg_search_time"] = round(metrics["total_search_time"] / searches, 4) if searches else 0.0
+        metrics["total_search_time"] = round(metrics["total_search_time"], 4)
+        return metrics
@@ -1,6 +1,13 @@
 #!/bin/bash
 
 # Executar o script de inicialização e aguardar sua conclusão
-python3 /src/scripts/init_chroma.py && \
-# Somente após a conclusão bem-sucedida, iniciar o gunicorn
-gunicorn --workers=2 --chdir=/src/ main:app -b unix:/shared/chatbotsocket.sock
\ No newline at end of file
+python3 /src/scripts/init_chroma.py || exit 1
+
+# Somente após a conclusão bem-sucedida, iniciar o servidor
+if [ "${SERVER_MODE:-flask}" = "asgi" ]; then
+    # App assíncrono (FastAPI) servido pelo uvicorn
+    # (o ChromaDB é aberto com caminho relativo a /src, como no gunicorn --chdir)
+    cd /src && exec uvicorn asgi:app --uds /shared/chatbotsocket.sock --workers "${ASGI_WORKERS:-2}"
+else
+    exec gunicorn --workers=2 --chdir=/src/ main:app -b unix:/shared/chatbotsocket.sock
+fi
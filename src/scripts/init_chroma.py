@@ -19,9 +19,11 @@ from config import Config
 from services.s3_service import S3Service
 from services.indexing.embedding_service import EmbeddingService
 from services.indexing.document_loader_service import DocumentService
+from services.indexing.embedding_pipeline import EmbeddingPipeline
+from services.indexing.index_manifest import IndexManifest
+from services.indexing.document_sources import create_document_source
 from repository.chromaDB_repo import ChromaRepository
-
-import glob
+from repository.lexical_index_repo import LexicalIndex
 
 # Configuração de logging
 logging.basicConfig(
@@ -31,13 +33,14 @@ logging.basicConfig(
 )
 logger = logging.getLogger("init_chroma")
 
-def load_chroma_db(filter_patterns=None, force_reload=False):
+def load_chroma_db(filter_patterns=None, force_reload=False, source=None):
     """
-    Carrega documentos do S3 no ChromaDB
+    Carrega documentos do S3 (ou de uma origem local) no ChromaDB
     
     Args:
         filter_patterns: Lista de padrões para filtrar documentos
-        force_reload: Se True, força o recarregamento de documentos já processados
+        force_reload: Se True, apaga a coleção e reindexa todos os documentos
+        source: Caminho de um .zip ou diretório local com os PDFs (None usa o bucket S3)
         
     Returns:
         dict: Resultado do processamento
@@ -45,13 +48,17 @@ def load_chroma_db(filter_patterns=None, force_reload=False):
     logger.info("=== Iniciando carregamento do ChromaDB ===")
     logger.info(f"Filtros: {filter_patterns}, Forçar recarregamento: {force_reload}")
     
+    source = source or Config.DOCUMENT_SOURCE or None
+    document_source = None
+    
     try:
         # Carrega variáveis de ambiente se não estiverem carregadas
         # load_dotenv(override=True)
         
         # Validação de configurações
-        Config.validate()
+        Config.validate(require_s3=source is None)
         
+        logger.info(f"Origem dos documentos: {source or 'S3'}")
         logger.info(f"Bucket S3: {Config.S3_BUCKET_NAME}")
         logger.info(f"ChromaDB Path: {Config.CHROMA_LOCAL_PATH}")
         
@@ -71,40 +78,92 @@ def load_chroma_db(filter_patterns=None, force_reload=False):
             bucket_name=Config.S3_BUCKET_NAME
         )
         
+        # Origem local (.zip ou diretório) usa o mesmo pipeline do S3
+        document_source = create_document_source(source) if source else s3_service
+        
         chroma_repository = ChromaRepository(
             embedding_function=embedding_service.get_embeddings(),
             collection_name=Config.CHROMA_COLLECTION,
             chroma_path=Config.CHROMA_LOCAL_PATH
         )
         
+        # Índice léxico da busca híbrida, mantido em sincronia com a coleção
+        lexical_index = LexicalIndex(Config.LEXICAL_INDEX_PATH) if Config.HYBRID_SEARCH_ENABLED else None
+        
+        embedding_pipeline = EmbeddingPipeline(
+            embeddings=embedding_service.bedrock_embeddings,
+            batch_size=Config.EMBEDDING_BATCH_SIZE,
+            max_workers=Config.EMBEDDING_MAX_WORKERS,
+            max_requests_per_second=Config.EMBEDDING_MAX_RPS,
+            max_retries=Config.EMBEDDING_MAX_RETRIES
+        )
+        
         document_service = DocumentService(
             s3_service=s3_service,
             embedding_service=embedding_service,
-            chroma_repository=chroma_repository
+            chroma_repository=chroma_repository,
+            embedding_pipeline=embedding_pipeline,
+            download_workers=Config.INGEST_DOWNLOAD_WORKERS,
+            parse_workers=Config.INGEST_PARSE_WORKERS,
+            max_in_flight=Config.INGEST_MAX_IN_FLIGHT,
+            spool_max_memory=Config.INGEST_SPOOL_MAX_MEMORY,
+            document_source=document_source,
+            lexical_index=lexical_index
         )
         
+        manifest = IndexManifest(
+            path=Config.INDEX_MANIFEST_PATH,
+            collection_name=Config.CHROMA_COLLECTION
+        ).load()
+        
+        # Índice sem manifesto (legado) não permite saber quais chunks já existem
+        if not force_reload and not manifest.exists and chroma_repository.count() > 0:
+            logger.warning("ChromaDB existente sem manifesto: a coleção será reconstruída")
+            force_reload = True
+        
+        if force_reload:
+            chroma_repository.reset_collection()
+            manifest.reset()
+            if lexical_index is not None:
+                lexical_index.reset()
+        elif lexical_index is not None and lexical_index.count() == 0 and chroma_repository.count() > 0:
+            # Coleção indexada antes da busca híbrida: o índice léxico é montado a partir do ChromaDB
+            logger.info("Índice léxico vazio: reconstruindo a partir do ChromaDB")
+            lexical_index.rebuild_from(chroma_repository)
+        
         # Processa os documentos
         if filter_patterns:
             # TODO: Implementar filtragem de documentos
             logger.info(f"Aplicando filtros: {filter_patterns}")
             # Por enquanto, ignora os filtros
         
-        result = document_service.process_all_documents()
+        try:
+            result = document_service.process_all_documents(
+                manifest=manifest,
+                force_reload=force_reload
+            )
+        finally:
+            embedding_pipeline.close()
         
         success_result = {
             "status": "success",
             "message": "Carregamento do ChromaDB concluído com sucesso",
             "bucket": Config.S3_BUCKET_NAME,
+            "source": document_source.describe(),
             "collection": Config.CHROMA_COLLECTION,
             **result
         }
         
         logger.info("=== Resumo do Carregamento ===")
         logger.info(f"Status: {success_result['status']}")
-        logger.info(f"Bucket: {success_result['bucket']}")
+        logger.info(f"Origem: {success_result['source']}")
         logger.info(f"Arquivos processados: {len(success_result['processed_files'])}")
+        logger.info(f"Arquivos inalterados: {len(success_result['skipped_files'])}")
+        logger.info(f"Arquivos removidos: {len(success_result['removed_files'])}")
         logger.info(f"Arquivos com erro: {len(success_result['failed_files'])}")
         logger.info(f"Total de chunks: {success_result['total_chunks']}")
+        logger.info(f"Tempo por estágio: {success_result['stage_times']}")
+        logger.info(f"Vazão de embeddings: {success_result['chunks_per_second']} chunks/s")
         
         return success_result
             
@@ -120,26 +179,27 @@ def load_chroma_db(filter_patterns=None, force_reload=False):
         logger.error(f"Erro: {error_result['error']}")
         
         return error_result
+    finally:
+        if document_source is not None and hasattr(document_source, 'close'):
+            document_source.close()
 
 def main():
     """
     Função principal chamada ao executar o script
     """
-    parser = argparse.ArgumentParser(description='Inicializa e carrega o ChromaDB com documentos do S3')
+    parser = argparse.ArgumentParser(description='Inicializa e carrega o ChromaDB com documentos do S3 ou de uma origem local')
     parser.add_argument('--filter', '-f', type=str, nargs='*', help='Lista de padrões para filtrar documentos')
-    parser.add_argument('--force-reload', action='store_true', help='Força o recarregamento de documentos já processados')
+    parser.add_argument('--force-reload', action='store_true', help='Apaga a coleção e reindexa todos os documentos')
+    parser.add_argument('--source', '-s', type=str, help='Arquivo .zip ou diretório local com os PDFs (ex.: dataset/juridicos.zip); padrão: bucket S3')
     parser.add_argument('--output', '-o', type=str, help='Caminho para salvar o resultado em JSON')
     
     args = parser.parse_args()
     
-    if len(glob.glob('../bd/*')) > 0:
-        logger.info(' ✅ ChromaDB pré-carregado encontrado.')
-        sys.exit(0)
-
-    # Executa o carregamento
+    # Executa o carregamento (incremental: apenas objetos novos, alterados ou removidos)
     result = load_chroma_db(
         filter_patterns=args.filter,
-        force_reload=args.force_reload
+        force_reload=args.force_reload,
+        source=args.source
     )
     
     # Salva o resultado em um arquivo se solicitado
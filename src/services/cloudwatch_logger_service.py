@@ -1,126 +1,142 @@
 import os
+import sys
+import atexit
 import logging
-import watchtower
 import datetime
+import threading
 from config import Config
+from services.log_shipper import LogShipper, StreamSink, FileSink, CloudWatchSink
 
 class CloudWatchLoggerService:
     """
-    Serviço para configurar logging no AWS CloudWatch
+    Serviço para configurar o pipeline de logs do processo (console e AWS CloudWatch)
+
+    Todos os loggers (API e serviços) propagam para o logger raiz, que tem um
+    único handler não bloqueante; uma única thread envia os registros em
+    lotes ao console e ao CloudWatch, com um arquivo local (ou stderr) como
+    fallback quando o CloudWatch falha.
     """
-    
+
+    _shipper = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def setup_pipeline(cls,
+                       log_level=logging.INFO,
+                       enable_cloudwatch=False,
+                       log_group=None,
+                       log_stream_prefix=None,
+                       cloudwatch_client=None):
+        """
+        Instala o pipeline de logs no logger raiz (apenas na primeira chamada do processo)
+
+        Args:
+            log_level: Nível de logging
+            enable_cloudwatch: Se True, os lotes também são enviados ao CloudWatch
+            log_group: Nome do grupo de logs no CloudWatch
+            log_stream_prefix: Prefixo para o stream de logs (default: data atual)
+            cloudwatch_client: Cliente do CloudWatch Logs (default: criado a partir da configuração)
+
+        Returns:
+            LogShipper: O pipeline do processo
+        """
+        with cls._lock:
+            if cls._shipper is not None:
+                return cls._shipper
+
+            sinks = []
+            if Config.LOG_CONSOLE:
+                sinks.append(StreamSink(sys.stdout))
+
+            # Com o console habilitado, os registros não enviados ao CloudWatch já aparecem no stdout
+            fallback_sink = None
+            if Config.LOG_FALLBACK_FILE:
+                fallback_sink = FileSink(Config.LOG_FALLBACK_FILE)
+            elif not Config.LOG_CONSOLE:
+                fallback_sink = StreamSink(sys.stderr)
+
+            cloudwatch_status = "CloudWatch logging desabilitado por configuração"
+            if enable_cloudwatch:
+                try:
+                    client = cloudwatch_client or Config.get_cloudwatch_client()
+                    log_group_name = log_group or Config.CLOUDWATCH_LOG_GROUP
+                    stream_prefix = log_stream_prefix or datetime.datetime.now().strftime('%Y-%m-%d')
+                    log_stream_name = f"{stream_prefix}-{os.environ.get('ENVIRONMENT', 'dev')}"
+                    sinks.append(CloudWatchSink(client, log_group_name, log_stream_name))
+                    cloudwatch_status = f"CloudWatch logging habilitado: grupo={log_group_name}, stream={log_stream_name}"
+                except Exception as e:
+                    cloudwatch_status = f"Erro ao configurar CloudWatch logging, continuando sem ele: {str(e)}"
+
+            shipper = LogShipper(
+                sinks,
+                fallback_sink=fallback_sink,
+                queue_size=Config.LOG_QUEUE_SIZE,
+                batch_size=Config.LOG_BATCH_SIZE,
+                flush_interval=Config.LOG_FLUSH_INTERVAL
+            )
+            shipper.start()
+
+            # Substitui os handlers instalados por logging.basicConfig
+            root_logger = logging.getLogger()
+            for handler in list(root_logger.handlers):
+                root_logger.removeHandler(handler)
+            root_logger.addHandler(shipper.handler)
+            root_logger.setLevel(log_level)
+
+            atexit.register(shipper.close)
+            cls._shipper = shipper
+
+        logging.getLogger("log_shipper").info(
+            f"✅ Pipeline de logs iniciado (fila: {Config.LOG_QUEUE_SIZE}, lote: {Config.LOG_BATCH_SIZE}, "
+            f"intervalo: {Config.LOG_FLUSH_INTERVAL}s). {cloudwatch_status}"
+        )
+        return shipper
+
     @classmethod
-    def setup_logger(cls, 
-                     logger_name="app", 
-                     log_level=logging.INFO, 
-                     enable_cloudwatch=False, 
+    def setup_logger(cls,
+                     logger_name="app",
+                     log_level=logging.INFO,
+                     enable_cloudwatch=False,
                      log_group=None,
                      log_stream_prefix=None):
         """
-        Configura um logger com suporte a CloudWatch
-        
+        Configura um logger com suporte a CloudWatch (instalando o pipeline de logs do processo, se necessário)
+
         Args:
             logger_name: Nome do logger
             log_level: Nível de logging
             enable_cloudwatch: Se True, habilita o envio de logs para CloudWatch
             log_group: Nome do grupo de logs no CloudWatch
             log_stream_prefix: Prefixo para o stream de logs
-            
+
         Returns:
             logging.Logger: O logger configurado
         """
+        cls.setup_pipeline(
+            log_level=log_level,
+            enable_cloudwatch=enable_cloudwatch,
+            log_group=log_group,
+            log_stream_prefix=log_stream_prefix
+        )
+
         logger = logging.getLogger(logger_name)
         logger.setLevel(log_level)
-        
-        # Limpa handlers existentes para evitar duplicação
+
+        # Os registros seguem para o pipeline pelo logger raiz
         if logger.handlers:
             logger.handlers.clear()
-        
-        # Adiciona um handler para console
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(log_level)
-        console_format = logging.Formatter(
-            '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-            '%Y-%m-%d %H:%M:%S'
-        )
-        console_handler.setFormatter(console_format)
-        logger.addHandler(console_handler)
-        
-        # Se CloudWatch estiver habilitado e tivermos um cliente disponível
-        if enable_cloudwatch:
-            try:
-                _, _, cloudwatch_client = Config.get_aws_clients()
-                
-                if cloudwatch_client:
-                    # Configura nome do grupo e stream
-                    log_group_name = log_group or Config.CLOUDWATCH_LOG_GROUP
-                    stream_prefix = log_stream_prefix or datetime.datetime.now().strftime('%Y-%m-%d')
-                    log_stream_name = f"{stream_prefix}-{os.environ.get('ENVIRONMENT', 'dev')}"
-                    
-                    # Cria handler do watchtower
-                    cw_handler = watchtower.CloudWatchLogHandler(
-                        log_group_name=log_group_name,
-                        log_stream_name=log_stream_name,
-                        boto3_client=cloudwatch_client
-                    )
-                    cw_handler.setLevel(log_level)
-                    cw_handler.setFormatter(console_format)
-                    
-                    # Adiciona o handler ao logger
-                    logger.addHandler(cw_handler)
-                    logger.info(f"CloudWatch logging habilitado: grupo={log_group_name}, stream={log_stream_name}")
-                else:
-                    logger.warning("Cliente CloudWatch não disponível. O logging no CloudWatch não será habilitado.")
-            except Exception as e:
-                logger.error(f"Erro ao configurar CloudWatch logging: {str(e)}")
-                logger.warning("Continuando sem logging no CloudWatch")
-        else:
-            logger.info("CloudWatch logging desabilitado por configuração")
-        
+        logger.propagate = True
+
         return logger
-    
+
     @classmethod
-    def add_cloudwatch_handler(cls, existing_logger, cloudwatch_client, log_group_name, log_stream_prefix=None):
+    def get_metrics(cls):
         """
-        Adiciona um handler de CloudWatch a um logger existente
-        
-        Args:
-            existing_logger: Logger existente para adicionar o handler
-            cloudwatch_client: Cliente boto3 para CloudWatch Logs
-            log_group_name: Nome do grupo de logs
-            log_stream_prefix: Prefixo para o stream de logs (default: data atual)
-            
+        Retorna as métricas do pipeline de logs
+
         Returns:
-            logging.Logger: O logger atualizado
+            dict: Métricas do pipeline (vazio se não foi instalado)
         """
-        if not cloudwatch_client:
-            existing_logger.warning("Cliente CloudWatch não fornecido. O logging no CloudWatch não será habilitado.")
-            return existing_logger
-        
-        try:
-            # Configura nome do stream
-            stream_prefix = log_stream_prefix or datetime.datetime.now().strftime('%Y-%m-%d')
-            log_stream_name = f"{stream_prefix}-{os.environ.get('ENVIRONMENT', 'dev')}"
-            
-            # Cria handler do watchtower
-            cw_handler = watchtower.CloudWatchLogHandler(
-                log_group_name=log_group_name,
-                log_stream_name=log_stream_name,
-                boto3_client=cloudwatch_client
-            )
-            
-            # Define o formato dos logs
-            formatter = logging.Formatter(
-                '%(asctime)s [%(levelname)s] %(name)s: %(message)s',
-                '%Y-%m-%d %H:%M:%S'
-            )
-            cw_handler.setFormatter(formatter)
-            
-            # Adiciona o handler ao logger
-            existing_logger.addHandler(cw_handler)
-            existing_logger.info(f"CloudWatch handler adicionado: grupo={log_group_name}, stream={log_stream_name}")
-            
-            return existing_logger
-        except Exception as e:
-            existing_logger.error(f"Erro ao adicionar handler CloudWatch: {str(e)}")
-            return existing_logger 
\ No newline at end of file
+        if cls._shipper is None:
+            return {}
+        return cls._shipper.get_metrics()
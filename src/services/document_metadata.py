@@ -0,0 +1,189 @@
+import re
+import unicodedata
+
+# Campos de metadados que podem ser usados como filtro na busca
+FILTERABLE_FIELDS = ("case_id", "doc_type", "page_number")
+
+# Número do processo como aparece nas chaves dos objetos (ex.: RE1463299, ARE1467492)
+CASE_ID_SEGMENT_PATTERN = re.compile(r"^(a?re)[\s_-]*(\d{5,})$", re.IGNORECASE)
+# Número do processo citado na pergunta (ex.: "RE 1463299", "are1467492")
+CASE_ID_QUERY_PATTERN = re.compile(r"\b(a?re)\s*[-.]?\s*(\d{5,})\b")
+
+# Tipos de peça e expressões que os identificam na pergunta (sem acentos, em minúsculas).
+# A ordem importa: expressões mais específicas primeiro.
+DOC_TYPE_TERMS = (
+    ("acordao-embargos", ("acordao dos embargos", "acordao de embargos", "acordao nos embargos", "embargos de declaracao")),
+    ("acordao-recorrido", ("acordao recorrido",)),
+    ("decisao-admissibilidade", ("decisao de admissibilidade", "juizo de admissibilidade", "decisao que inadmitiu")),
+    ("agravo", ("agravo",)),
+    ("recurso-extraordinario", ("peticao do recurso extraordinario", "razoes do recurso extraordinario")),
+)
+
+# Formas explícitas de pedir um tipo de peça ({terms}: expressões do tipo). A simples menção ao tipo
+# ("cabe agravo?") não restringe a busca, apenas prioriza as peças do tipo (ver boost_doc_type).
+EXPLICIT_DOC_TYPE_PATTERNS = (
+    # "documentos do tipo agravo", "peças do tipo acórdão recorrido"
+    r"\b(?:documentos?|pecas?|arquivos?)\s+do\s+tipo\s+(?:{terms})\b",
+    # "no agravo nº 123", "o agravo número 123"
+    r"\b(?:{terms})\s+(?:n\s*[o°.]|numero)\s*\d",
+    # "agravo do RE 1463299", "embargos de declaração no processo ARE1467492"
+    r"\b(?:{terms})\s+(?:do|no|da|na)\s+(?:processo\s+)?a?re\s*[-.]?\s*\d{{5,}}",
+)
+EXPLICIT_DOC_TYPE_QUERY_PATTERNS = tuple(
+    (doc_type, tuple(
+        re.compile(pattern.format(terms="|".join(re.escape(term) for term in terms)))
+        for pattern in EXPLICIT_DOC_TYPE_PATTERNS
+    ))
+    for doc_type, terms in DOC_TYPE_TERMS
+)
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+def _case_id(prefix, number):
+    return f"{prefix.upper()}{number}"
+
+def derive_document_metadata(object_key):
+    """
+    Extrai metadados estruturados da chave do objeto (ex.: "RE1463299/recurso-extraordinario/47-recurso-extraordinario.pdf")
+
+    Args:
+        object_key: Chave do objeto de origem
+
+    Returns:
+        dict: "case_id" e "doc_type", quando identificados
+    """
+    metadata = {}
+    segments = [segment for segment in object_key.replace("\\", "/").split("/") if segment]
+
+    for position, segment in enumerate(segments[:-1]):
+        match = CASE_ID_SEGMENT_PATTERN.match(segment)
+        if match:
+            metadata["case_id"] = _case_id(match.group(1), match.group(2))
+            # A pasta seguinte ao processo é o tipo da peça
+            if position + 1 < len(segments) - 1:
+                metadata["doc_type"] = segments[position + 1].lower()
+            break
+
+    return metadata
+
+def normalize_filters(filters):
+    """
+    Valida e normaliza filtros informados na requisição
+
+    Args:
+        filters: Dicionário campo -> valor (ex.: {"case_id": "RE 1463299", "doc_type": "agravo"})
+
+    Returns:
+        dict: Filtros normalizados (sem valores vazios)
+
+    Raises:
+        ValueError: Se os filtros não forem um dicionário ou tiverem campos/valores inválidos
+    """
+    if filters is None:
+        return {}
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object")
+
+    normalized = {}
+    for field, value in filters.items():
+        if field not in FILTERABLE_FIELDS:
+            raise ValueError(f"unknown filter: {field} (allowed: {', '.join(FILTERABLE_FIELDS)})")
+        if value is None or value == "":
+            continue
+
+        if field == "case_id":
+            match = CASE_ID_SEGMENT_PATTERN.match(str(value).strip())
+            if not match:
+                raise ValueError(f"invalid case_id: {value}")
+            normalized[field] = _case_id(match.group(1), match.group(2))
+        elif field == "doc_type":
+            normalized[field] = str(value).strip().lower()
+        else:
+            try:
+                normalized[field] = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"invalid page_number: {value}")
+
+    return normalized
+
+def detect_filters(query):
+    """
+    Detecta filtros pedidos explicitamente na pergunta: o número do processo e o
+    tipo da peça em formas como "documentos do tipo agravo" ou "no agravo nº 123"
+
+    Args:
+        query: Texto da pergunta
+
+    Returns:
+        dict: Filtros detectados (vazio se nenhum)
+    """
+    text = _normalize(query)
+    filters = {}
+
+    case_ids = {_case_id(prefix, number) for prefix, number in CASE_ID_QUERY_PATTERN.findall(text)}
+    # Mais de um processo na pergunta: a busca não é restringida
+    if len(case_ids) == 1:
+        filters["case_id"] = case_ids.pop()
+
+    for doc_type, patterns in EXPLICIT_DOC_TYPE_QUERY_PATTERNS:
+        if any(pattern.search(text) for pattern in patterns):
+            filters["doc_type"] = doc_type
+            break
+
+    return filters
+
+def detect_doc_type(query):
+    """
+    Detecta o tipo de peça mencionado na pergunta, mesmo sem um pedido explícito
+
+    Args:
+        query: Texto da pergunta
+
+    Returns:
+        str | None: Tipo da peça ou None
+    """
+    text = _normalize(query)
+    for doc_type, terms in DOC_TYPE_TERMS:
+        if any(term in text for term in terms):
+            return doc_type
+    return None
+
+def boost_doc_type(docs, doc_type, boost):
+    """
+    Prioriza os documentos de um tipo de peça sem descartar os demais: cada
+    documento do tipo é ranqueado como se estivesse `boost` posições acima
+    (vencendo os empates)
+
+    Args:
+        docs: Documentos, do mais para o menos relevante
+        doc_type: Tipo de peça priorizado
+        boost: Número de posições ganhas pelos documentos do tipo
+
+    Returns:
+        list: Documentos reordenados
+    """
+    def position(item):
+        index, doc = item
+        matches = (getattr(doc, "metadata", None) or {}).get("doc_type") == doc_type
+        return (index - boost, 0) if matches else (index, 1)
+
+    return [doc for _, doc in sorted(enumerate(docs), key=position)]
+
+def build_where(filters):
+    """
+    Converte os filtros na cláusula where do ChromaDB
+
+    Args:
+        filters: Filtros normalizados
+
+    Returns:
+        dict | None: Cláusula where (None se não houver filtros)
+    """
+    if not filters:
+        return None
+    if len(filters) == 1:
+        return dict(filters)
+    return {"$and": [{field: value} for field, value in sorted(filters.items())]}
@@ -8,19 +8,9 @@ class GenerateEmbeddingQueryService:
     def __init__(self, llm):
         self.llm = llm
 
-    def generate_query(self, chat_history, query):
+    def _build_messages(self, chat_history, query):
         """
-        Generates a new query for a similarity search, based on a chat history and on a query.
-        
-        Args:
-            chat_history: list of SystemMessage, HumanMessage, AIMessage.
-            query: str
-
-        Returns:
-            {
-                "worth_searching": True | False
-                "refined_query": str    
-            }
+        Builds the prompt messages sent to the LLM.
         """
 
         prompt = SystemMessage("""
@@ -58,14 +48,44 @@ class GenerateEmbeddingQueryService:
             json:
         """)
 
+        return [prompt, question]
+
+    @staticmethod
+    def _error_result():
+        return {
+            "worth_searching": False,
+            "refined_query": "",
+            "error": True 
+        }
+
+    def generate_query(self, chat_history, query):
+        """
+        Generates a new query for a similarity search, based on a chat history and on a query.
+        
+        Args:
+            chat_history: list of SystemMessage, HumanMessage, AIMessage.
+            query: str
+
+        Returns:
+            {
+                "worth_searching": True | False
+                "refined_query": str    
+            }
+        """
+        try: 
+            res = json.loads(self.llm.invoke(self._build_messages(chat_history, query)).content)
+            return res
+        except Exception as e:
+            logger.error(f'An error occurred: {e}')
+            return self._error_result()
 
+    async def agenerate_query(self, chat_history, query):
+        """
+        Async version of generate_query (awaits the LLM instead of blocking the event loop).
+        """
         try: 
-            res = json.loads(self.llm.invoke([prompt, question]).content)
+            res = json.loads((await self.llm.ainvoke(self._build_messages(chat_history, query))).content)
             return res
         except Exception as e:
             logger.error(f'An error occurred: {e}')
-            return {
-                "worth_searching": False,
-                "refined_query": "",
-                "error": True 
-            }
\ No newline at end of file
+            return self._error_result()
\ No newline at end of file
@@ -8,17 +8,47 @@ from typing import Annotated
 
 from langgraph.checkpoint.memory import MemorySaver
 import sys
+import logging
 
 sys.path.insert(0, './src/')
+from services.token_counter_service import TokenCounterService
+from repository.checkpoint_repo import SnapshotCheckpointer, TurnWrite
+
+logger = logging.getLogger("graph_service")
 
 # LLM -----------------------------------------------------
 
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage, AIMessageChunk, RemoveMessage
+
+class ChatSnapshot:
+    """
+    Estado de um chat carregado uma única vez por requisição
+
+    O histórico é usado pelo GEQS e o mesmo checkpoint é entregue ao grafo na
+    geração da resposta, que não relê o checkpointer. O snapshot vale para uma
+    única execução do grafo; depois disso, o grafo volta a ler o checkpointer.
+    Se outra requisição do chat gravar um checkpoint nesse meio tempo, o turno
+    é reaplicado sobre o estado mais recente (ver SnapshotCheckpointer).
+    """
+
+    def __init__(self, chat_id, checkpoint_tuple):
+        self.chat_id = chat_id
+        self.checkpoint_tuple = checkpoint_tuple
+        self.used = False
+
+    @property
+    def messages(self):
+        if self.checkpoint_tuple is None:
+            return []
+        return self.checkpoint_tuple.checkpoint["channel_values"].get("messages", [])
 
 # Our graph is a state machine 
 
 class GraphService:
 
+    # Tentativas de gravar um turno quando outras requisições do chat gravam antes
+    MAX_TURN_WRITES = 5
+
     class State(TypedDict):
         messages: Annotated[list, add_messages]
         final_prompt: str
@@ -26,35 +56,102 @@ class GraphService:
 
 
     def trim_state_messages(self, messages):
-        return trim_messages(messages, strategy="last", include_system=True, max_tokens=1000, start_on="human", token_counter=self.llm)
+        # Per-message counts are cached, so each turn only counts the new messages
+        return trim_messages(messages, strategy="last", include_system=True, max_tokens=1000, start_on="human", token_counter=self.token_counter.count_messages)
+
+    def trim_state(self, messages):
+        """
+        Returns the trimmed history and the removals for the messages left out of it.
+        The add_messages reducer merges by id, so returning only the trimmed history
+        would never shrink the state: dropped messages are removed explicitly.
+        """
+        trimmed_chat_history = self.trim_state_messages(messages)
+        kept_ids = {message.id for message in trimmed_chat_history}
+        removals = [RemoveMessage(id=message.id) for message in messages if message.id and message.id not in kept_ids]
+        return trimmed_chat_history, removals
 
     def chatbot(self, state):
         original_prompt = state['original_prompt'] # query without injected content. This goes into chat history.
         final_prompt = state['final_prompt']
-        trimmed_chat_history = self.trim_state_messages(state['messages'])
+        trimmed_chat_history, removals = self.trim_state(state['messages'])
         
-        return {"messages": trimmed_chat_history + [HumanMessage(original_prompt), self.llm.invoke([self.system_prompt] + trimmed_chat_history + [HumanMessage(final_prompt)])]}
+        return {"messages": removals + [HumanMessage(original_prompt), self.llm.invoke([self.system_prompt] + trimmed_chat_history + [HumanMessage(final_prompt)])]}
+
+    async def achatbot(self, state):
+        # Mesma lógica do nó chatbot, aguardando o LLM sem bloquear o event loop
+        original_prompt = state['original_prompt']
+        final_prompt = state['final_prompt']
+        trimmed_chat_history, removals = self.trim_state(state['messages'])
+
+        response = await self.llm.ainvoke([self.system_prompt] + trimmed_chat_history + [HumanMessage(final_prompt)])
+        return {"messages": removals + [HumanMessage(original_prompt), response]}
         
 
-    def __init__(self, llm):
+    def __init__(self, llm, checkpointer=None, token_counter=None):
         self.llm = llm
+        self.token_counter = token_counter or TokenCounterService(getattr(llm, "model_id", ""), llm)
         self.system_prompt = SystemMessage("Você é um assistente útil. Responda as perguntas com clareza e objetividade.")
+
+        # Making Memory
+        # saves a state according to an id. Defaults to in-process memory;
+        # see repository/checkpoint_repo.py for the persistent (SQLite) checkpointer.
+        self.checkpointer = checkpointer if checkpointer is not None else MemorySaver()
+        # Lets a request hand its already-loaded ChatSnapshot to the graph
+        memory = SnapshotCheckpointer(self.checkpointer)
+
+        # Compiling
+        self.graph = self._build_graph(self.chatbot, memory) # we can now use the graph (run the state machine)
+        # Same graph with an async node, sharing the checkpointer (used by the ASGI app)
+        self.agraph = self._build_graph(self.achatbot, memory)
+
+    def _build_graph(self, chatbot_node, checkpointer):
         graph_builder = StateGraph(self.State)
 
         # Adding Nodes
-        graph_builder.add_node("chatbot", self.chatbot)
+        graph_builder.add_node("chatbot", chatbot_node)
 
         # Connecting Nodes
 
         graph_builder.add_edge(START, "chatbot") # specifying entrypoint
         graph_builder.add_edge("chatbot", END)
 
-        # Making Memory
-        memory = MemorySaver() # saves a state according to an id in memory
-        # can be updated to use a database instead. Not our focus for now.
+        return graph_builder.compile(checkpointer=checkpointer)
 
-        # Compiling
-        self.graph = graph_builder.compile(checkpointer=memory) # we can now use the graph (run the state machine)
+    @staticmethod
+    def _get_config(chat_id, snapshot=None, write=None):
+        config = {
+            "configurable": {
+                "thread_id": chat_id
+            }
+        }
+        if snapshot is not None and not snapshot.used and snapshot.chat_id == chat_id:
+            snapshot.used = True
+            config["configurable"][SnapshotCheckpointer.SNAPSHOT_KEY] = snapshot.checkpoint_tuple
+        if write is not None:
+            config["configurable"][SnapshotCheckpointer.WRITE_KEY] = write
+        return config
+
+    def load_snapshot(self, chat_id):
+        """
+        Carrega o estado do chat (uma leitura do checkpointer)
+
+        Returns:
+            ChatSnapshot: Estado do chat, a ser repassado ao invoke/stream
+        """
+        return ChatSnapshot(chat_id, self.checkpointer.get_tuple(self._get_config(chat_id)))
+
+    async def aload_snapshot(self, chat_id):
+        return ChatSnapshot(chat_id, await self.checkpointer.aget_tuple(self._get_config(chat_id)))
+
+    @staticmethod
+    def _chunk_text(chunk, metadata):
+        # Apenas os pedaços gerados pelo LLM (as mensagens do histórico também passam pelo stream)
+        if not isinstance(chunk, AIMessageChunk) or metadata.get("langgraph_node") != "chatbot":
+            return ""
+
+        if isinstance(chunk.content, str):
+            return chunk.content
+        return "".join(part.get("text", "") for part in chunk.content if isinstance(part, dict))
 
     # Seeing made graph
     def print_graph(self):
@@ -63,26 +160,116 @@ class GraphService:
     def set_system_prompt(self, system_prompt):
         self.system_prompt = system_prompt
 
-    def invoke(self, prompt, chat_id, original_prompt=None):
+    # checkpoint_during=False: only the final state is written back (a single put per request)
+    def invoke(self, prompt, chat_id, original_prompt=None, snapshot=None):
 
         if original_prompt is None:
             original_prompt = prompt
 
-        config = {
-            "configurable": {
-                "thread_id": chat_id
-            }
-        }
-        return self.graph.invoke(input={"original_prompt": original_prompt, "final_prompt": prompt}, config=config)
+        write = TurnWrite()
+        config = self._get_config(chat_id, snapshot, write)
+        result = self.graph.invoke(input={"original_prompt": original_prompt, "final_prompt": prompt}, config=config, checkpoint_during=False)
+        if write.conflict:
+            self.append_turn(chat_id, original_prompt, result["messages"][-1])
+        return result
+
+    def stream(self, prompt, chat_id, original_prompt=None, snapshot=None):
+        """
+        Executa o grafo emitindo os tokens da resposta do nó "chatbot" à medida que são gerados.
+        O estado final (com a resposta completa) é salvo no checkpoint ao fim do nó, como no invoke.
+        """
+        if original_prompt is None:
+            original_prompt = prompt
+
+        write = TurnWrite()
+        answer = []
+        for chunk, metadata in self.graph.stream(
+            input={"original_prompt": original_prompt, "final_prompt": prompt},
+            config=self._get_config(chat_id, snapshot, write),
+            stream_mode="messages",
+            checkpoint_during=False
+        ):
+            text = self._chunk_text(chunk, metadata)
+            if text:
+                answer.append(text)
+                yield text
+
+        if write.conflict:
+            self.append_turn(chat_id, original_prompt, "".join(answer))
+
+    async def ainvoke(self, prompt, chat_id, original_prompt=None, snapshot=None):
+        if original_prompt is None:
+            original_prompt = prompt
+
+        write = TurnWrite()
+        result = await self.agraph.ainvoke(
+            input={"original_prompt": original_prompt, "final_prompt": prompt},
+            config=self._get_config(chat_id, snapshot, write),
+            checkpoint_during=False
+        )
+        if write.conflict:
+            await self.aappend_turn(chat_id, original_prompt, result["messages"][-1])
+        return result
+
+    async def astream(self, prompt, chat_id, original_prompt=None, snapshot=None):
+        if original_prompt is None:
+            original_prompt = prompt
+
+        write = TurnWrite()
+        answer = []
+        async for chunk, metadata in self.agraph.astream(
+            input={"original_prompt": original_prompt, "final_prompt": prompt},
+            config=self._get_config(chat_id, snapshot, write),
+            stream_mode="messages",
+            checkpoint_during=False
+        ):
+            text = self._chunk_text(chunk, metadata)
+            if text:
+                answer.append(text)
+                yield text
+
+        if write.conflict:
+            await self.aappend_turn(chat_id, original_prompt, "".join(answer))
+
+    def _turn_update(self, chat_id, prompt, answer, snapshot):
+        if snapshot is None or snapshot.used or snapshot.chat_id != chat_id:
+            snapshot = self.load_snapshot(chat_id)
+        _, removals = self.trim_state(snapshot.messages)
+        answer = answer if isinstance(answer, AIMessage) else AIMessage(answer)
+        return snapshot, {"messages": removals + [HumanMessage(prompt), answer]}
+
+    def append_turn(self, chat_id, prompt, answer, snapshot=None):
+        """
+        Adiciona ao histórico uma resposta obtida sem o LLM (ex.: cache de respostas)
+        ou um turno cuja gravação conflitou com outra requisição do chat
+
+        Args:
+            chat_id: Id do chat
+            prompt: Pergunta do usuário
+            answer: Resposta (texto ou AIMessage)
+            snapshot: Estado do chat já carregado na requisição (opcional)
+        """
+        for _ in range(self.MAX_TURN_WRITES):
+            snapshot, values = self._turn_update(chat_id, prompt, answer, snapshot)
+            write = TurnWrite()
+            self.graph.update_state(self._get_config(chat_id, snapshot, write), values, as_node="chatbot")
+            if not write.conflict:
+                return
+        logger.error(f"❌ Turno não gravado no chat {chat_id}: {self.MAX_TURN_WRITES} conflitos seguidos")
+
+    async def aappend_turn(self, chat_id, prompt, answer, snapshot=None):
+        for _ in range(self.MAX_TURN_WRITES):
+            if snapshot is None or snapshot.used or snapshot.chat_id != chat_id:
+                snapshot = await self.aload_snapshot(chat_id)
+            snapshot, values = self._turn_update(chat_id, prompt, answer, snapshot)
+            write = TurnWrite()
+            await self.agraph.aupdate_state(self._get_config(chat_id, snapshot, write), values, as_node="chatbot")
+            if not write.conflict:
+                return
+        logger.error(f"❌ Turno não gravado no chat {chat_id}: {self.MAX_TURN_WRITES} conflitos seguidos")
 
     def get_chat_history(self, chat_id):
-        config = {
-            "configurable": {
-                "thread_id": chat_id
-            }
-        }
+        return self.load_snapshot(chat_id).messages
 
-        if len(self.graph.get_state(config).values) != 0:
-            return self.graph.get_state(config).values['messages']
-        else:
-            return []
\ No newline at end of file
+    async def aget_chat_history(self, chat_id):
+        return (await self.aload_snapshot(chat_id)).messages
@@ -1,125 +1,370 @@
+import io
 import os
+import time
 import logging
-from langchain_community.document_loaders import PyPDFLoader
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from pypdf import PdfReader
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.indexing.index_manifest import make_chunk_id, content_hash
+from services.document_metadata import derive_document_metadata
 
 logger = logging.getLogger("document_service")
 
+def load_pdf_pages(stream, object_key):
+    """
+    Lê as páginas de um PDF diretamente de um buffer, sem passar pelo disco
+
+    Produz os mesmos documentos por página que o PyPDFLoader (texto extraído e
+    metadados "source", "page", "page_label" e "total_pages").
+
+    Args:
+        stream: Buffer binário posicionável com o conteúdo do PDF
+        object_key: Chave do objeto de origem
+
+    Returns:
+        list: Lista de Document, um por página
+    """
+    reader = PdfReader(stream)
+    total_pages = len(reader.pages)
+    documents = []
+
+    for page_number, page in enumerate(reader.pages):
+        try:
+            page_label = reader.page_labels[page_number]
+        except (IndexError, KeyError):
+            page_label = str(page_number + 1)
+
+        documents.append(Document(
+            page_content=page.extract_text() or "",
+            metadata={
+                "source": object_key,
+                "page": page_number,
+                "page_label": page_label,
+                "total_pages": total_pages
+            }
+        ))
+
+    return documents
+
+def load_and_split_pdf(content, object_key, source_uri, chunk_size, chunk_overlap):
+    """
+    Carrega um PDF, enriquece os metadados e divide em chunks
+
+    Função de módulo para poder ser executada no pool de processos (etapa CPU-bound).
+
+    Args:
+        content: Conteúdo do PDF (bytes ou buffer binário posicionável)
+        object_key: Chave do objeto de origem
+        source_uri: URI do objeto de origem
+        chunk_size: Tamanho dos chunks para divisão de texto
+        chunk_overlap: Sobreposição entre chunks
+
+    Returns:
+        dict: "pages", "splits" e "parse_time"
+    """
+    parse_start = time.time()
+
+    stream = io.BytesIO(content) if isinstance(content, (bytes, bytearray)) else content
+    documents = load_pdf_pages(stream, object_key)
+
+    # Metadados estruturados (processo e tipo da peça), usados nos filtros da busca
+    document_metadata = derive_document_metadata(object_key)
+
+    # Enriquece os documentos com metadados
+    for doc in documents:
+        # Adiciona informações sobre o documento
+        doc.metadata['source'] = object_key
+        doc.metadata['file_name'] = os.path.basename(object_key)
+        doc.metadata['file_path'] = object_key
+        doc.metadata['s3_path'] = source_uri
+        doc.metadata['page_number'] = doc.metadata['page'] + 1
+        doc.metadata.update(document_metadata)
+
+        # Adiciona um prefixo ao conteúdo do documento para identificação
+        original_content = doc.page_content
+        doc.page_content = f"Documento: {object_key}\n\n{original_content}"
+
+    # Divide o texto em chunks
+    text_splitter = RecursiveCharacterTextSplitter(
+        chunk_size=chunk_size,
+        chunk_overlap=chunk_overlap
+    )
+    splits = text_splitter.split_documents(documents)
+
+    return {
+        "pages": len(documents),
+        "splits": splits,
+        "parse_time": time.time() - parse_start
+    }
+
+
 class DocumentService:
-    def __init__(self, s3_service, embedding_service, chroma_repository):
+    def __init__(self, s3_service, embedding_service, chroma_repository, embedding_pipeline=None,
+                 download_workers=4, parse_workers=None, max_in_flight=8, spool_max_memory=32 * 1024 * 1024,
+                 document_source=None, lexical_index=None):
         """
         Inicializa o serviço de processamento de documentos
-        
+
         Args:
             s3_service: Serviço S3
             embedding_service: Serviço de embeddings
             chroma_repository: Repositório ChromaDB
+            embedding_pipeline: EmbeddingPipeline para embeddings em lote (None usa add_documents)
+            download_workers: Número máximo de downloads simultâneos
+            parse_workers: Processos para leitura/divisão dos PDFs (padrão: nº de CPUs; 0 usa a própria thread)
+            max_in_flight: Número máximo de documentos em processamento ao mesmo tempo
+            spool_max_memory: Tamanho máximo (bytes) de um objeto mantido em memória antes de ir para disco
+            document_source: Origem dos documentos (padrão: o próprio S3Service); ver services.indexing.document_sources
+            lexical_index: LexicalIndex mantido em sincronia com o ChromaDB (opcional, para a busca híbrida)
         """
         self.s3_service = s3_service
+        self.document_source = document_source or s3_service
         self.embedding_service = embedding_service
         self.chroma_repository = chroma_repository
-    
-    def process_document(self, object_key):
+        self.embedding_pipeline = embedding_pipeline
+        self.lexical_index = lexical_index
+        self.download_workers = max(1, download_workers)
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.max_in_flight = max(1, max_in_flight)
+        self.spool_max_memory = spool_max_memory
+
+        self._download_slots = threading.BoundedSemaphore(self.download_workers)
+
+    def process_document(self, object_key, previous_chunks=None, parse_executor=None):
         """
-        Processa um documento do S3 e armazena no ChromaDB
-        
+        Processa um documento da origem (S3 ou local) e armazena no ChromaDB
+
         Args:
-            object_key: Chave do objeto no S3
-            
+            object_key: Chave do objeto na origem
+            previous_chunks: Chunks já indexados do objeto (chunk_id -> hash), vindos do manifesto
+            parse_executor: Pool de processos para a leitura do PDF (None executa na thread atual)
+
         Returns:
             dict: Resultado do processamento
         """
+        previous_chunks = previous_chunks or {}
+
         try:
             logger.info(f"Processando arquivo: {object_key}")
-            
-            # Baixa o arquivo temporariamente do S3
-            temp_file = f"/tmp/{os.path.basename(object_key)}"
-            success = self.s3_service.download_file(object_key, temp_file)
-            
-            if not success:
-                return {"success": False, "error": "Falha ao baixar arquivo do S3"}
-            
-            # Carrega o documento usando PyPDFLoader
-            loader = PyPDFLoader(temp_file)
-            documents = loader.load()
-            logger.info(f"Documento carregado: {len(documents)} páginas")
-
-            # Enriquece os documentos com metadados
-            for doc in documents:
-                # Garantir que existe metadata
-                if not hasattr(doc, 'metadata'):
-                    doc.metadata = {}
-                
-                # Adiciona informações sobre o documento
-                doc.metadata['source'] = object_key
-                doc.metadata['file_name'] = os.path.basename(object_key)
-                doc.metadata['file_path'] = temp_file
-                doc.metadata['s3_path'] = f"s3://{self.s3_service.bucket_name}/{object_key}"
-                
-                # Adiciona um prefixo ao conteúdo do documento para identificação
-                original_content = doc.page_content
-                doc.page_content = f"Documento: {object_key}\n\n{original_content}"
-
-            # Divide o texto em chunks
-            splits = self.embedding_service.split_documents(documents)
-            logger.info(f"Texto dividido em {len(splits)} chunks")
-
-            # Adiciona os documentos ao ChromaDB
-            self.chroma_repository.add_documents(splits)
+
+            # Lê o objeto para um buffer em memória (etapa I/O-bound, limitada por semáforo)
+            download_start = time.time()
+            with self._download_slots:
+                stream = self.document_source.open_stream(object_key, max_memory_size=self.spool_max_memory)
+            download_time = time.time() - download_start
+
+            with stream:
+                size = stream.seek(0, io.SEEK_END)
+                stream.seek(0)
+                source_uri = self.document_source.get_uri(object_key)
+                chunk_size = self.embedding_service.chunk_size
+                chunk_overlap = self.embedding_service.chunk_overlap
+
+                # Lê e divide o PDF (etapa CPU-bound, no pool de processos quando disponível).
+                # Objetos que excederam o limite em memória são lidos na própria thread, direto do buffer em disco.
+                if parse_executor is not None and size <= self.spool_max_memory:
+                    parsed = parse_executor.submit(
+                        load_and_split_pdf, stream.read(), object_key, source_uri, chunk_size, chunk_overlap
+                    ).result()
+                else:
+                    parsed = load_and_split_pdf(stream, object_key, source_uri, chunk_size, chunk_overlap)
+
+            splits = parsed["splits"]
+            logger.info(f"Documento carregado: {parsed['pages']} páginas, dividido em {len(splits)} chunks")
+
+            # Gera os embeddings apenas dos chunks novos ou alterados
+            index_result = self.index_chunks(object_key, splits, previous_chunks)
             logger.info("✅ Documento processado e adicionado ao ChromaDB")
 
-            # Remove o arquivo temporário
-            os.remove(temp_file)
-            
             return {
-                "success": True, 
-                "pages": len(documents), 
+                "success": True,
+                "pages": parsed["pages"],
                 "chunks": len(splits),
-                "document": object_key
+                "document": object_key,
+                "download_time": download_time,
+                "parse_time": parsed["parse_time"],
+                **index_result
             }
 
         except Exception as e:
             logger.error(f"❌ Erro ao processar {object_key}: {str(e)}")
-            # Garante que o arquivo temporário seja removido em caso de erro
-            if 'temp_file' in locals() and os.path.exists(temp_file):
-                os.remove(temp_file)
             return {"success": False, "error": str(e)}
-    
-    def process_all_documents(self):
+
+    def index_chunks(self, object_key, splits, previous_chunks):
         """
-        Processa todos os documentos do S3 e armazena no ChromaDB
-        
+        Grava no ChromaDB os chunks de um documento cujo conteúdo mudou e
+        remove os chunks que deixaram de existir
+
+        Args:
+            object_key: Chave do objeto de origem
+            splits: Chunks do documento
+            previous_chunks: Chunks já indexados do objeto (chunk_id -> hash)
+
+        Returns:
+            dict: "chunk_hashes", "embedded_chunks", "deleted_chunks", "embedding_time" e "write_time"
+        """
+        chunk_hashes = {}
+        changed_ids = []
+        changed_docs = []
+
+        for index, doc in enumerate(splits):
+            chunk_id = make_chunk_id(object_key, index)
+            chunk_hash = content_hash(doc)
+            chunk_hashes[chunk_id] = chunk_hash
+
+            if previous_chunks.get(chunk_id) != chunk_hash:
+                changed_ids.append(chunk_id)
+                changed_docs.append(doc)
+
+        stale_ids = [chunk_id for chunk_id in previous_chunks if chunk_id not in chunk_hashes]
+        self.chroma_repository.delete(stale_ids)
+
+        embedding_time = 0.0
+        write_time = 0.0
+        if changed_docs:
+            index_start = time.time()
+            if self.embedding_pipeline is not None:
+                index_stats = self.embedding_pipeline.run(changed_docs, self.chroma_repository, ids=changed_ids)
+                embedding_time = index_stats["embedding_time"]
+                write_time = index_stats["write_time"]
+            else:
+                self.chroma_repository.add_documents(changed_docs, ids=changed_ids)
+                embedding_time = time.time() - index_start
+
+        if self.lexical_index is not None:
+            self.lexical_index.delete(stale_ids)
+            self.lexical_index.upsert(changed_ids, changed_docs)
+
+        logger.info(f"{object_key}: {len(changed_docs)} chunks gravados, "
+                    f"{len(splits) - len(changed_docs)} inalterados, {len(stale_ids)} removidos")
+
+        return {
+            "chunk_hashes": chunk_hashes,
+            "embedded_chunks": len(changed_docs),
+            "deleted_chunks": len(stale_ids),
+            "embedding_time": embedding_time,
+            "write_time": write_time
+        }
+
+    def process_all_documents(self, manifest=None, force_reload=False):
+        """
+        Processa os documentos da origem (S3 ou local) e armazena no ChromaDB
+
+        Com um manifesto, apenas objetos novos ou alterados (ETag/tamanho) são
+        processados e os chunks de objetos removidos da origem são apagados.
+        Os documentos passam por um pipeline em estágios: downloads em threads,
+        leitura/divisão dos PDFs em processos e embeddings no pool do EmbeddingPipeline,
+        com no máximo `max_in_flight` documentos em memória ao mesmo tempo.
+
+        Args:
+            manifest: IndexManifest com o estado da última indexação (opcional)
+            force_reload: Se True, reprocessa todos os objetos, ignorando o manifesto
+
         Returns:
             dict: Resultado do processamento de todos os documentos
         """
         logger.info("=== Iniciando processamento de documentos ===")
-        files = self.s3_service.list_files()
-        logger.info(f"Total de arquivos encontrados: {len(files)}")
-        
+        process_start = time.time()
+        objects = self.document_source.list_objects()
+        logger.info(f"Total de arquivos encontrados: {len(objects)}")
+
         processed_files = []
         failed_files = []
+        skipped_files = []
+        removed_files = []
         total_chunks = 0
-        
-        for object_key in files:
-            result = self.process_document(object_key)
-            
-            if result.get("success", False):
-                processed_files.append(object_key)
-                total_chunks += result.get("chunks", 0)
-            else:
+        embedded_chunks = 0
+        stage_times = {"download": 0.0, "parse": 0.0, "embedding": 0.0, "write": 0.0}
+        results_lock = threading.Lock()
+
+        def handle_object(obj):
+            object_key = obj["key"]
+            with results_lock:
+                previous_chunks = manifest.get_chunks(object_key) if manifest is not None else {}
+
+            result = self.process_document(object_key, previous_chunks=previous_chunks, parse_executor=parse_executor)
+
+            with results_lock:
+                if result.get("success", False):
+                    processed_files.append(object_key)
+                    stage_times["download"] += result.get("download_time", 0.0)
+                    stage_times["parse"] += result.get("parse_time", 0.0)
+                    stage_times["embedding"] += result.get("embedding_time", 0.0)
+                    stage_times["write"] += result.get("write_time", 0.0)
+                    if manifest is not None:
+                        manifest.set(obj, result["chunk_hashes"])
+                    return result.get("chunks", 0), result.get("embedded_chunks", 0)
+
                 failed_files.append({
-                    "file": object_key, 
+                    "file": object_key,
                     "error": result.get("error", "Erro desconhecido")
                 })
-        
+                return 0, 0
+
+        # forkserver: os processos de leitura não herdam por fork as threads (coordenadoras, de embeddings, de logs)
+        # e os locks do processo principal, que poderiam estar travados no momento do fork
+        parse_executor = ProcessPoolExecutor(
+            max_workers=self.parse_workers,
+            mp_context=multiprocessing.get_context("forkserver")
+        ) if self.parse_workers > 0 else None
+
+        pending = []
+        try:
+            # Remove do índice os objetos que não existem mais na origem
+            if manifest is not None:
+                current_keys = {obj["key"] for obj in objects}
+                for object_key in sorted(manifest.keys() - current_keys):
+                    self.chroma_repository.delete(manifest.get_chunks(object_key).keys())
+                    if self.lexical_index is not None:
+                        self.lexical_index.delete(manifest.get_chunks(object_key).keys())
+                    manifest.remove(object_key)
+                    removed_files.append(object_key)
+                    logger.info(f"🗑️ Objeto removido da origem, chunks apagados: {object_key}")
+
+            for obj in objects:
+                if manifest is not None and not force_reload and manifest.is_unchanged(obj):
+                    skipped_files.append(obj["key"])
+                else:
+                    pending.append(obj)
+
+            # O tamanho do pool coordenador limita quantos documentos ficam em memória (backpressure)
+            with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="ingest") as executor:
+                for chunks, embedded in executor.map(handle_object, pending):
+                    total_chunks += chunks
+                    embedded_chunks += embedded
+        finally:
+            if parse_executor is not None:
+                parse_executor.shutdown(wait=True)
+            if manifest is not None:
+                manifest.save()
+            if self.lexical_index is not None and (pending or removed_files):
+                self.lexical_index.optimize()
+
+        total_time = time.time() - process_start
+
         result = {
             "processed_files": processed_files,
             "failed_files": failed_files,
-            "total_chunks": total_chunks
+            "skipped_files": skipped_files,
+            "removed_files": removed_files,
+            "total_chunks": total_chunks,
+            "embedded_chunks": embedded_chunks,
+            "processing_time": round(total_time, 4),
+            "embedding_time": round(stage_times["embedding"], 4),
+            "stage_times": {stage: round(value, 4) for stage, value in stage_times.items()},
+            "chunks_per_second": round(embedded_chunks / total_time, 2) if total_time > 0 else 0.0
         }
-        
+
         logger.info("=== Resumo do Processamento ===")
         logger.info(f"Arquivos processados: {len(processed_files)}")
+        logger.info(f"Arquivos inalterados: {len(skipped_files)}")
+        logger.info(f"Arquivos removidos: {len(removed_files)}")
         logger.info(f"Arquivos com erro: {len(failed_files)}")
-        logger.info(f"Total de chunks: {total_chunks}")
-        
-        return result 
\ No newline at end of file
+        logger.info(f"Total de chunks: {total_chunks} ({embedded_chunks} gravados)")
+        logger.info(f"Tempo acumulado por estágio: {result['stage_times']}")
+        logger.info(f"Vazão de embeddings: {result['chunks_per_second']} chunks/s")
+
+        return result
@@ -0,0 +1,172 @@
+import os
+import shutil
+import logging
+import zipfile
+import tempfile
+import threading
+from abc import ABC, abstractmethod
+
+logger = logging.getLogger("document_sources")
+
+class DocumentSource(ABC):
+    """
+    Interface das origens de documentos usadas pelo DocumentService
+
+    Implementada pelo S3Service e pelas classes abaixo, que permitem indexar o
+    corpus localmente, sem acesso ao S3.
+    """
+
+    @abstractmethod
+    def list_objects(self):
+        """
+        Lista os documentos da origem
+
+        Returns:
+            list: Lista de dicts com "key", "etag" e "size"
+        """
+
+    @abstractmethod
+    def open_stream(self, object_key, max_memory_size=32 * 1024 * 1024):
+        """
+        Abre um documento como um buffer binário posicionável
+
+        Args:
+            object_key: Chave do documento
+            max_memory_size: Tamanho máximo (bytes) mantido em memória
+
+        Returns:
+            Buffer binário posicionado no início (o chamador deve fechá-lo)
+        """
+
+    @abstractmethod
+    def get_uri(self, object_key):
+        """
+        Retorna a URI de um documento
+        """
+
+    @abstractmethod
+    def describe(self):
+        """
+        Retorna uma descrição curta da origem (para logs e resultados)
+        """
+
+
+class ZipDocumentSource(DocumentSource):
+    """
+    Lê os PDFs diretamente de um arquivo .zip (ex.: dataset/juridicos.zip),
+    membro a membro, sem extrair o arquivo para o disco
+    """
+
+    def __init__(self, zip_path, extensions=(".pdf",)):
+        """
+        Args:
+            zip_path: Caminho do arquivo .zip
+            extensions: Extensões de arquivo consideradas documentos
+        """
+        self.zip_path = zip_path
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        self._zip = zipfile.ZipFile(zip_path)
+        # Leituras concorrentes do mesmo ZipFile compartilham o descritor do arquivo
+        self._lock = threading.Lock()
+        logger.info(f"✅ Origem de documentos .zip inicializada: {zip_path}")
+
+    def list_objects(self):
+        objects = []
+        for info in self._zip.infolist():
+            if info.is_dir() or not info.filename.lower().endswith(self.extensions):
+                continue
+
+            objects.append({
+                "key": info.filename,
+                # O CRC32 do membro serve como impressão digital do conteúdo
+                "etag": f"{info.CRC:08x}",
+                "size": info.file_size
+            })
+
+        logger.info(f"✅ Listados {len(objects)} documentos de {self.zip_path}")
+        return objects
+
+    def open_stream(self, object_key, max_memory_size=32 * 1024 * 1024):
+        buffer = tempfile.SpooledTemporaryFile(max_size=max_memory_size)
+        try:
+            with self._lock, self._zip.open(object_key) as member:
+                shutil.copyfileobj(member, buffer)
+            buffer.seek(0)
+            return buffer
+        except Exception:
+            buffer.close()
+            raise
+
+    def get_uri(self, object_key):
+        return f"zip://{os.path.abspath(self.zip_path)}!/{object_key}"
+
+    def describe(self):
+        return f"zip:{self.zip_path}"
+
+    def close(self):
+        self._zip.close()
+
+
+class DirectoryDocumentSource(DocumentSource):
+    """
+    Lê os PDFs de um diretório local (recursivamente)
+    """
+
+    def __init__(self, root_dir, extensions=(".pdf",)):
+        """
+        Args:
+            root_dir: Diretório raiz do corpus
+            extensions: Extensões de arquivo consideradas documentos
+        """
+        self.root_dir = root_dir
+        self.extensions = tuple(ext.lower() for ext in extensions)
+        logger.info(f"✅ Origem de documentos em diretório inicializada: {root_dir}")
+
+    def _get_path(self, object_key):
+        return os.path.join(self.root_dir, *object_key.split("/"))
+
+    def list_objects(self):
+        objects = []
+        for current_dir, _, file_names in os.walk(self.root_dir):
+            for file_name in sorted(file_names):
+                if not file_name.lower().endswith(self.extensions):
+                    continue
+
+                path = os.path.join(current_dir, file_name)
+                stat = os.stat(path)
+                objects.append({
+                    "key": os.path.relpath(path, self.root_dir).replace(os.sep, "/"),
+                    # Data de modificação + tamanho evitam reler todos os arquivos a cada execução
+                    "etag": f"{stat.st_mtime_ns:x}-{stat.st_size:x}",
+                    "size": stat.st_size
+                })
+
+        logger.info(f"✅ Listados {len(objects)} documentos de {self.root_dir}")
+        return objects
+
+    def open_stream(self, object_key, max_memory_size=32 * 1024 * 1024):
+        # O arquivo local já é um buffer posicionável: não há necessidade de cópia
+        return open(self._get_path(object_key), "rb")
+
+    def get_uri(self, object_key):
+        return f"file://{os.path.abspath(self._get_path(object_key))}"
+
+    def describe(self):
+        return f"dir:{self.root_dir}"
+
+
+def create_document_source(location):
+    """
+    Cria a origem local adequada para o caminho informado
+
+    Args:
+        location: Caminho de um arquivo .zip ou de um diretório
+
+    Returns:
+        DocumentSource: Origem de documentos local
+    """
+    if os.path.isdir(location):
+        return DirectoryDocumentSource(location)
+    if zipfile.is_zipfile(location):
+        return ZipDocumentSource(location)
+    raise ValueError(f"Origem de documentos inválida (esperado .zip ou diretório): {location}")
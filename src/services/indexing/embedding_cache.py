@@ -0,0 +1,296 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from array import array
+from collections import OrderedDict
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger("embedding_cache")
+
+class EmbeddingCache:
+    """
+    Cache de embeddings de queries em memória (LRU + TTL), com camada
+    persistente opcional em SQLite compartilhada entre processos
+
+    A camada persistente também é limitada: a cada `PRUNE_INTERVAL` gravações,
+    as entradas expiradas e as mais antigas além de `persist_max_entries` são removidas.
+    """
+
+    # Gravações na camada persistente entre duas limpezas
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, model_id, max_entries=2048, max_bytes=64 * 1024 * 1024, ttl=86400, persist_path=None,
+                 persist_max_entries=100000):
+        """
+        Inicializa o cache de embeddings
+
+        Args:
+            model_id: ID do modelo de embedding (faz parte da chave)
+            max_entries: Número máximo de entradas em memória
+            max_bytes: Tamanho máximo (em bytes) dos vetores em memória
+            ttl: Tempo de vida das entradas em segundos (0 desabilita a expiração)
+            persist_path: Caminho do arquivo SQLite da camada persistente (None desabilita)
+            persist_max_entries: Número máximo de entradas na camada persistente (0 desabilita o limite)
+        """
+        self.model_id = model_id
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.persist_max_entries = persist_max_entries
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (timestamp, vetor, bytes)
+        self._bytes = 0
+        self._metrics = {
+            "hits": 0,
+            "misses": 0,
+            "persistent_hits": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "persistent_pruned": 0
+        }
+
+        self._db = None
+        self._db_lock = threading.Lock()
+        self._puts_since_prune = 0
+        if persist_path:
+            self._open_db(persist_path)
+
+    def _open_db(self, persist_path):
+        """
+        Abre (ou cria) o arquivo SQLite da camada persistente em modo WAL
+        """
+        directory = os.path.dirname(persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._db = sqlite3.connect(persist_path, timeout=5, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS query_embeddings ("
+            "key TEXT PRIMARY KEY, created_at REAL NOT NULL, vector BLOB NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS query_embeddings_created_at ON query_embeddings (created_at)")
+        logger.info(f"Camada persistente do cache de embeddings: {persist_path}")
+        self._prune_persistent()
+
+    @staticmethod
+    def normalize(text):
+        """
+        Normaliza o texto da query para uso na chave do cache
+
+        Args:
+            text: Texto da query
+
+        Returns:
+            str: Texto normalizado
+        """
+        text = unicodedata.normalize("NFC", text)
+        return " ".join(text.lower().split())
+
+    def make_key(self, text):
+        """
+        Gera a chave do cache a partir do modelo e do texto normalizado
+        """
+        raw = f"{self.model_id}\n{self.normalize(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _is_expired(self, created_at):
+        return self.ttl > 0 and (time.time() - created_at) > self.ttl
+
+    def get(self, text):
+        """
+        Busca o embedding de uma query no cache
+
+        Args:
+            text: Texto da query
+
+        Returns:
+            list | None: Vetor em cache ou None se ausente/expirado
+        """
+        key = self.make_key(text)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created_at, vector, size = entry
+                if not self._is_expired(created_at):
+                    self._entries.move_to_end(key)
+                    self._metrics["hits"] += 1
+                    return list(vector)
+
+                del self._entries[key]
+                self._bytes -= size
+                self._metrics["expirations"] += 1
+
+        vector = self._get_persistent(key)
+        with self._lock:
+            if vector is None:
+                self._metrics["misses"] += 1
+                return None
+            self._metrics["hits"] += 1
+            self._metrics["persistent_hits"] += 1
+
+        self._put_memory(key, vector, time.time())
+        return list(vector)
+
+    def put(self, text, vector):
+        """
+        Armazena o embedding de uma query no cache
+
+        Args:
+            text: Texto da query
+            vector: Vetor de embedding
+        """
+        key = self.make_key(text)
+        created_at = time.time()
+        packed = array("d", vector)
+
+        self._put_memory(key, packed, created_at)
+        self._put_persistent(key, packed, created_at)
+
+    def _put_memory(self, key, vector, created_at):
+        size = vector.itemsize * len(vector)
+
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+
+            self._entries[key] = (created_at, vector, size)
+            self._bytes += size
+
+            # Remove as entradas menos usadas até respeitar os limites
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, _, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._metrics["evictions"] += 1
+
+    def _get_persistent(self, key):
+        if self._db is None:
+            return None
+
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT created_at, vector FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao ler cache persistente de embeddings: {str(e)}")
+            return None
+
+        if row is None:
+            return None
+
+        created_at, blob = row
+        if self._is_expired(created_at):
+            return None
+
+        vector = array("d")
+        vector.frombytes(blob)
+        return vector
+
+    def _put_persistent(self, key, vector, created_at):
+        if self._db is None:
+            return
+
+        try:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, created_at, vector) VALUES (?, ?, ?)",
+                    (key, created_at, vector.tobytes())
+                )
+                self._puts_since_prune += 1
+                prune = self._puts_since_prune >= self.PRUNE_INTERVAL
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao gravar cache persistente de embeddings: {str(e)}")
+            return
+
+        if prune:
+            self._prune_persistent()
+
+    def _prune_persistent(self):
+        """
+        Remove da camada persistente as entradas expiradas e as mais antigas além do limite
+        """
+        try:
+            with self._db_lock:
+                self._puts_since_prune = 0
+                removed = 0
+                if self.ttl > 0:
+                    removed += self._db.execute(
+                        "DELETE FROM query_embeddings WHERE created_at < ?", (time.time() - self.ttl,)
+                    ).rowcount
+                if self.persist_max_entries > 0:
+                    removed += self._db.execute(
+                        "DELETE FROM query_embeddings WHERE key IN ("
+                        "SELECT key FROM query_embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                        (self.persist_max_entries,)
+                    ).rowcount
+        except sqlite3.Error as e:
+            logger.warning(f"Erro ao limpar cache persistente de embeddings: {str(e)}")
+            return
+
+        if removed:
+            with self._lock:
+                self._metrics["persistent_pruned"] += removed
+            logger.info(f"🗑️ {removed} entradas removidas do cache persistente de embeddings")
+
+    def clear(self):
+        """
+        Remove todas as entradas em memória (a camada persistente é mantida)
+        """
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_metrics(self):
+        """
+        Retorna os contadores do cache
+
+        Returns:
+            dict: Métricas de acertos, falhas e ocupação
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+            metrics["bytes"] = self._bytes
+
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / lookups, 4) if lookups else 0.0
+        metrics["persistent"] = self._db is not None
+        return metrics
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings que consultam o EmbeddingCache antes de chamar o modelo para queries.
+    Embeddings de documentos (indexação) são repassados sem cache.
+    """
+
+    def __init__(self, embeddings, cache):
+        """
+        Args:
+            embeddings: Embeddings de base (ex.: BedrockEmbeddings)
+            cache: Instância de EmbeddingCache
+        """
+        self.embeddings = embeddings
+        self.cache = cache
+
+    def embed_documents(self, texts):
+        return self.embeddings.embed_documents(texts)
+
+    def embed_query(self, text):
+        vector = self.cache.get(text)
+        if vector is not None:
+            return vector
+
+        vector = self.embeddings.embed_query(text)
+        self.cache.put(text, vector)
+        return vector
@@ -0,0 +1,206 @@
+import time
+import uuid
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger("embedding_pipeline")
+
+# Códigos de erro do Bedrock que indicam limitação de taxa / indisponibilidade temporária
+THROTTLING_ERROR_CODES = (
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+)
+
+def is_throttling_error(error):
+    """
+    Verifica se uma exceção corresponde a throttling do Bedrock
+
+    Args:
+        error: Exceção capturada
+
+    Returns:
+        bool: True se a chamada pode ser repetida após um backoff
+    """
+    response = getattr(error, "response", None)
+    if isinstance(response, dict):
+        code = response.get("Error", {}).get("Code", "")
+        if code in THROTTLING_ERROR_CODES:
+            return True
+
+    # BedrockEmbeddings encapsula o ClientError em um ValueError; resta inspecionar a mensagem
+    message = str(error)
+    return any(code in message for code in THROTTLING_ERROR_CODES) or "Too many requests" in message
+
+
+class RateLimiter:
+    """
+    Limitador de taxa (token bucket) compartilhado entre as threads do pipeline
+    """
+
+    def __init__(self, rate, burst=None):
+        """
+        Args:
+            rate: Requisições permitidas por segundo (0 ou None desabilita o limite)
+            burst: Capacidade máxima do balde (padrão: rate)
+        """
+        self.rate = rate
+        self.capacity = burst or rate or 0
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens=1):
+        """
+        Bloqueia até que `tokens` requisições possam ser feitas
+        """
+        if not self.rate:
+            return
+
+        # Um lote maior que o balde é cobrado em partes de até `capacity` tokens
+        # (cada texto do lote é uma chamada ao modelo)
+        while tokens > 0:
+            self._acquire_chunk(min(tokens, self.capacity))
+            tokens -= self.capacity
+
+    def _acquire_chunk(self, tokens):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class EmbeddingPipeline:
+    """
+    Estágio de indexação que gera embeddings em lotes, em paralelo,
+    e grava os chunks no ChromaDB com upserts em massa
+    """
+
+    def __init__(self, embeddings, batch_size=16, max_workers=4, max_requests_per_second=10,
+                 max_retries=5, backoff_base=0.5, backoff_max=20.0):
+        """
+        Inicializa o pipeline de embeddings
+
+        Args:
+            embeddings: Embeddings de base usados para os documentos (ex.: BedrockEmbeddings)
+            batch_size: Número de chunks por tarefa do pool
+            max_workers: Número máximo de threads simultâneas
+            max_requests_per_second: Limite de chamadas ao modelo por segundo (0 desabilita)
+            max_retries: Número máximo de novas tentativas em caso de throttling
+            backoff_base: Espera inicial (s) do backoff exponencial
+            backoff_max: Espera máxima (s) entre tentativas
+        """
+        self.embeddings = embeddings
+        self.batch_size = max(1, batch_size)
+        self.max_workers = max(1, max_workers)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.rate_limiter = RateLimiter(max_requests_per_second)
+
+        # Pool compartilhado entre execuções simultâneas de run() (vários documentos em paralelo)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="embedding")
+            return self._executor
+
+    def close(self):
+        """
+        Encerra o pool de threads de embeddings
+        """
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _embed_batch(self, texts):
+        """
+        Gera os embeddings de um lote, repetindo com backoff em caso de throttling
+        """
+        attempt = 0
+        while True:
+            # Titan gera um embedding por chamada: cada texto consome um token do limitador
+            self.rate_limiter.acquire(len(texts))
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt >= self.max_retries:
+                    raise
+
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+                delay = delay * (0.5 + random.random() / 2)
+                attempt += 1
+                logger.warning(f"Throttling do Bedrock, nova tentativa {attempt}/{self.max_retries} em {delay:.2f}s")
+                time.sleep(delay)
+
+    def embed_documents(self, documents):
+        """
+        Gera os embeddings dos documentos em lotes paralelos, preservando a ordem
+
+        Args:
+            documents: Lista de documentos (chunks)
+
+        Returns:
+            list: Lista de vetores, na mesma ordem dos documentos
+        """
+        texts = [doc.page_content for doc in documents]
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+
+        if not batches:
+            return []
+
+        vectors = []
+        for batch_vectors in self._get_executor().map(self._embed_batch, batches):
+            vectors.extend(batch_vectors)
+
+        return vectors
+
+    def run(self, documents, chroma_repository, ids=None):
+        """
+        Gera os embeddings dos documentos e os grava no ChromaDB
+
+        Args:
+            documents: Lista de documentos (chunks)
+            chroma_repository: Repositório ChromaDB de destino
+            ids: IDs dos chunks (padrão: UUIDs aleatórios)
+
+        Returns:
+            dict: Métricas do estágio (chunks, tempos e vazão)
+        """
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in documents]
+
+        embedding_start = time.time()
+        vectors = self.embed_documents(documents)
+        embedding_time = time.time() - embedding_start
+
+        write_start = time.time()
+        chroma_repository.upsert_embeddings(ids, vectors, documents)
+        write_time = time.time() - write_start
+
+        chunks_per_second = len(documents) / embedding_time if embedding_time > 0 else 0.0
+        logger.info(
+            f"✅ {len(documents)} chunks indexados (embedding: {embedding_time:.4f}s, "
+            f"gravação: {write_time:.4f}s, {chunks_per_second:.2f} chunks/s)"
+        )
+
+        return {
+            "chunks": len(documents),
+            "embedding_time": embedding_time,
+            "write_time": write_time
+        }
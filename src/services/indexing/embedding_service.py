@@ -1,13 +1,15 @@
 import logging
 import time
 import uuid
+from config import Config
 from langchain_aws import BedrockEmbeddings
 from langchain.text_splitter import RecursiveCharacterTextSplitter
+from services.indexing.embedding_cache import EmbeddingCache, CachedEmbeddings
 
 logger = logging.getLogger("embedding_service")
 
 class EmbeddingService:
-    def __init__(self, bedrock_client, model_id, chunk_size=1000, chunk_overlap=100):
+    def __init__(self, bedrock_client, model_id, chunk_size=1000, chunk_overlap=100, cache=None):
         """
         Inicializa o serviço de embeddings
         
@@ -16,21 +18,65 @@ class EmbeddingService:
             model_id: ID do modelo de embedding
             chunk_size: Tamanho dos chunks para divisão de texto
             chunk_overlap: Sobreposição entre chunks
+            cache: EmbeddingCache para embeddings de queries (None desabilita o cache)
         """
-        self.embeddings = BedrockEmbeddings(
+        self.model_id = model_id
+        self.bedrock_embeddings = BedrockEmbeddings(
             client=bedrock_client,
             model_id=model_id
         )
+        self.cache = cache
+
+        # Com cache, queries feitas via Chroma.similarity_search também passam por ele
+        if cache is not None:
+            self.embeddings = CachedEmbeddings(self.bedrock_embeddings, cache)
+        else:
+            self.embeddings = self.bedrock_embeddings
+
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
         logger.debug(f"Modelo de embeddings inicializado: {model_id}")
     
+    @classmethod
+    def build_query_cache(cls, model_id):
+        """
+        Cria o cache de embeddings de queries a partir da configuração
+        
+        Args:
+            model_id: ID do modelo de embedding
+            
+        Returns:
+            EmbeddingCache | None: Cache configurado ou None se desabilitado
+        """
+        if not Config.EMBEDDING_CACHE_ENABLED:
+            return None
+        
+        return EmbeddingCache(
+            model_id=model_id,
+            max_entries=Config.EMBEDDING_CACHE_MAX_ENTRIES,
+            max_bytes=Config.EMBEDDING_CACHE_MAX_BYTES,
+            ttl=Config.EMBEDDING_CACHE_TTL,
+            persist_path=Config.EMBEDDING_CACHE_PATH or None,
+            persist_max_entries=Config.EMBEDDING_CACHE_PERSIST_MAX_ENTRIES
+        )
+    
     def get_embeddings(self):
         """
         Retorna o objeto de embeddings configurado
         """
         return self.embeddings
     
+    def get_cache_metrics(self):
+        """
+        Retorna as métricas do cache de embeddings de queries
+        
+        Returns:
+            dict: Métricas do cache (vazio se desabilitado)
+        """
+        if self.cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.cache.get_metrics()}
+    
     def split_documents(self, documents):
         """
         Divide documentos em chunks menores
@@ -0,0 +1,167 @@
+import os
+import json
+import hashlib
+import logging
+import tempfile
+
+logger = logging.getLogger("index_manifest")
+
+MANIFEST_VERSION = 1
+
+def make_chunk_id(object_key, chunk_index):
+    """
+    Gera um ID determinístico para um chunk, tornando o upsert idempotente
+
+    Args:
+        object_key: Chave do objeto de origem
+        chunk_index: Posição do chunk dentro do documento
+
+    Returns:
+        str: ID do chunk
+    """
+    return hashlib.sha1(f"{object_key}#{chunk_index}".encode("utf-8")).hexdigest()
+
+def content_hash(document):
+    """
+    Calcula o hash do conteúdo (texto e metadados) de um chunk
+
+    Args:
+        document: Documento (chunk)
+
+    Returns:
+        str: Hash SHA-256 em hexadecimal
+    """
+    metadata = json.dumps(document.metadata or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{document.page_content}\n{metadata}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    Manifesto do índice: registra, para cada objeto indexado, o ETag/tamanho
+    e o hash de cada chunk gravado no ChromaDB
+    """
+
+    def __init__(self, path, collection_name):
+        """
+        Inicializa o manifesto
+
+        Args:
+            path: Caminho do arquivo JSON do manifesto
+            collection_name: Nome da coleção do ChromaDB à qual o manifesto se refere
+        """
+        self.path = path
+        self.collection_name = collection_name
+        self.exists = False
+        self.objects = {}
+
+    def load(self):
+        """
+        Carrega o manifesto do disco (manifesto vazio se inexistente ou de outra coleção)
+
+        Returns:
+            IndexManifest: A própria instância
+        """
+        self.objects = {}
+        self.exists = False
+
+        if not os.path.exists(self.path):
+            logger.info(f"Manifesto do índice não encontrado: {self.path}")
+            return self
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Manifesto do índice ilegível, será reconstruído: {str(e)}")
+            return self
+
+        if data.get("version") != MANIFEST_VERSION or data.get("collection") != self.collection_name:
+            logger.warning("Manifesto do índice incompatível com a coleção atual, será reconstruído")
+            return self
+
+        self.objects = data.get("objects", {})
+        self.exists = True
+        logger.info(f"Manifesto do índice carregado: {len(self.objects)} objetos")
+        return self
+
+    def save(self):
+        """
+        Grava o manifesto no disco de forma atômica
+        """
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+
+        data = {
+            "version": MANIFEST_VERSION,
+            "collection": self.collection_name,
+            "objects": self.objects
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".manifest-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        self.exists = True
+        logger.debug(f"Manifesto do índice salvo: {len(self.objects)} objetos")
+
+    def reset(self):
+        """
+        Esquece todos os objetos registrados
+        """
+        self.objects = {}
+
+    def is_unchanged(self, object_info):
+        """
+        Verifica se um objeto já está indexado com o mesmo ETag e tamanho
+
+        Args:
+            object_info: dict com "key", "etag" e "size"
+
+        Returns:
+            bool: True se o objeto não mudou desde a última indexação
+        """
+        entry = self.objects.get(object_info["key"])
+        if entry is None:
+            return False
+        return entry.get("etag") == object_info.get("etag") and entry.get("size") == object_info.get("size")
+
+    def get_chunks(self, object_key):
+        """
+        Retorna os chunks registrados de um objeto
+
+        Returns:
+            dict: Mapeamento chunk_id -> hash do conteúdo
+        """
+        return dict(self.objects.get(object_key, {}).get("chunks", {}))
+
+    def set(self, object_info, chunks):
+        """
+        Registra (ou atualiza) um objeto indexado
+
+        Args:
+            object_info: dict com "key", "etag" e "size"
+            chunks: Mapeamento chunk_id -> hash do conteúdo
+        """
+        self.objects[object_info["key"]] = {
+            "etag": object_info.get("etag"),
+            "size": object_info.get("size"),
+            "chunks": chunks
+        }
+
+    def remove(self, object_key):
+        """
+        Remove um objeto do manifesto
+
+        Returns:
+            dict: Chunks que estavam registrados para o objeto
+        """
+        return self.objects.pop(object_key, {}).get("chunks", {})
+
+    def keys(self):
+        return set(self.objects.keys())
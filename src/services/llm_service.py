@@ -10,7 +10,7 @@ from services.graph_service import GraphService
 logger = logging.getLogger("llm_service")
 
 class LLMService:
-    def __init__(self, bedrock_client, model_id="amazon.nova-micro-v1:0", callbacks=None):
+    def __init__(self, bedrock_client, model_id="amazon.nova-micro-v1:0", callbacks=None, checkpointer=None):
         """
         Inicializa o serviço LLM
         
@@ -18,6 +18,7 @@ class LLMService:
             bedrock_client: Cliente boto3 para Bedrock
             model_id: ID do modelo LLM
             callbacks: Callbacks para o modelo
+            checkpointer: Checkpointer do histórico de conversas (padrão: em memória)
         """
         logger.info(f"Inicializando LLMService com modelo {model_id}")
         self.model_id = model_id
@@ -47,7 +48,7 @@ class LLMService:
             "ATENÇÃO: Tenha em mente que os trechos fornecidos são um recurso auxiliar dado a você, assistente, e são desconhecidos pelo usuário. Esses trechos podem ou não ser relevante para o usuário."
         )
 
-        self.graph_service = GraphService(self.llm)
+        self.graph_service = GraphService(self.llm, checkpointer=checkpointer)
         self.graph_service.set_system_prompt(self.system_prompt)
 
         logger.info(f"✅ LLMService inicializado com sucesso: {model_id}")
@@ -92,7 +93,7 @@ class LLMService:
         Returns:
             list: Lista de mensagens do prompt
         """
-        logger.info(f"Criando prompt RAG para query: {query[:50]}...")
+        logger.info(f"Criando prompt RAG para query ({len(query)} caracteres)")
         context_length = len(context.split())
         logger.debug(f"Tamanho do contexto: {context_length} palavras")
         
@@ -105,12 +106,15 @@ class LLMService:
         logger.debug("Prompt RAG criado com sucesso")
         return [self.system_prompt, human_prompt]
     
-    def generate_response(self, messages, chat_id, query=None):
+    def generate_response(self, messages, chat_id, query=None, snapshot=None):
         """
         Gera uma resposta usando o LLM
         
         Args:
             messages: Lista de mensagens para o modelo
+            chat_id: ID do chat (thread do histórico)
+            query: Query original, salva no histórico
+            snapshot: ChatSnapshot já carregado na requisição (evita reler o histórico)
             
         Returns:
             str: Resposta do modelo
@@ -120,16 +124,14 @@ class LLMService:
         if query is None:
             query = messages[-1].content
 
-        # Log das mensagens de entrada (resumido)
-        for idx, msg in enumerate(messages):
-            content_preview = msg.content[:50] + "..." if len(msg.content) > 50 else msg.content
-            logger.debug(f"Mensagem {idx+1}/{len(messages)} ({type(msg).__name__}): {content_preview}")
+        # Log das mensagens de entrada (apenas tipo e tamanho)
+        logger.debug("Mensagens de entrada: " + ", ".join(f"{type(msg).__name__} ({len(msg.content)} caracteres)" for msg in messages))
         
         llm_start = time.time()
         try:
             trimmed_message_str = messages[-1].content  #messages[-1].content # raw content
             
-            response = self.graph_service.invoke(trimmed_message_str, chat_id, query)
+            response = self.graph_service.invoke(trimmed_message_str, chat_id, query, snapshot=snapshot)
             
             llm_time = time.time() - llm_start
             logger.info(f"✅ Resposta gerada com sucesso em {llm_time:.4f}s")
@@ -137,4 +139,91 @@ class LLMService:
             return response['messages'][-1].content
         except Exception as e:
             logger.error(f"❌ Erro ao gerar resposta: {str(e)}")
-            raise 
\ No newline at end of file
+            raise 
+    
+    def stream_response(self, messages, chat_id, query=None, snapshot=None):
+        """
+        Gera uma resposta usando o LLM, emitindo os tokens à medida que são gerados
+        
+        Args:
+            messages: Lista de mensagens para o modelo
+            chat_id: ID do chat (thread do histórico)
+            query: Query original, salva no histórico
+            snapshot: ChatSnapshot já carregado na requisição
+            
+        Yields:
+            str: Partes da resposta do modelo
+        """
+        logger.info(f"Iniciando geração de resposta (streaming) com LLM ({self.model_id})...")
+        
+        if query is None:
+            query = messages[-1].content
+        
+        llm_start = time.time()
+        try:
+            yield from self.graph_service.stream(messages[-1].content, chat_id, query, snapshot=snapshot)
+            
+            llm_time = time.time() - llm_start
+            logger.info(f"✅ Resposta (streaming) gerada com sucesso em {llm_time:.4f}s")
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar resposta (streaming): {str(e)}")
+            raise
+    
+    async def agenerate_response(self, messages, chat_id, query=None, snapshot=None):
+        """
+        Versão assíncrona de generate_response (aguarda o LLM sem bloquear o event loop)
+        
+        Args:
+            messages: Lista de mensagens para o modelo
+            chat_id: ID do chat (thread do histórico)
+            query: Query original, salva no histórico
+            snapshot: ChatSnapshot já carregado na requisição
+            
+        Returns:
+            str: Resposta do modelo
+        """
+        logger.info(f"Iniciando geração de resposta (async) com LLM ({self.model_id})...")
+        
+        if query is None:
+            query = messages[-1].content
+        
+        llm_start = time.time()
+        try:
+            response = await self.graph_service.ainvoke(messages[-1].content, chat_id, query, snapshot=snapshot)
+            
+            llm_time = time.time() - llm_start
+            logger.info(f"✅ Resposta gerada com sucesso em {llm_time:.4f}s")
+
+            return response['messages'][-1].content
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar resposta: {str(e)}")
+            raise
+    
+    async def astream_response(self, messages, chat_id, query=None, snapshot=None):
+        """
+        Versão assíncrona de stream_response
+        
+        Args:
+            messages: Lista de mensagens para o modelo
+            chat_id: ID do chat (thread do histórico)
+            query: Query original, salva no histórico
+            snapshot: ChatSnapshot já carregado na requisição
+            
+        Yields:
+            str: Partes da resposta do modelo
+        """
+        logger.info(f"Iniciando geração de resposta (streaming async) com LLM ({self.model_id})...")
+        
+        if query is None:
+            query = messages[-1].content
+        
+        llm_start = time.time()
+        try:
+            async for token in self.graph_service.astream(messages[-1].content, chat_id, query, snapshot=snapshot):
+                yield token
+            
+            llm_time = time.time() - llm_start
+            logger.info(f"✅ Resposta (streaming) gerada com sucesso em {llm_time:.4f}s")
+        except Exception as e:
+            logger.error(f"❌ Erro ao gerar resposta (streaming): {str(e)}")
+            raise
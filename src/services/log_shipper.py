@@ -0,0 +1,324 @@
+import sys
+import copy
+import time
+import queue
+import threading
+import logging
+import logging.handlers
+
+LOG_FORMAT = '%(asctime)s [%(levelname)s] %(name)s: %(message)s'
+LOG_DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Limites do PutLogEvents do CloudWatch Logs
+CLOUDWATCH_MAX_BATCH_EVENTS = 10000
+CLOUDWATCH_MAX_BATCH_BYTES = 1048576
+CLOUDWATCH_EVENT_OVERHEAD = 26
+CLOUDWATCH_MAX_EVENT_BYTES = 262144 - CLOUDWATCH_EVENT_OVERHEAD
+
+_STOP = object()
+
+
+class _FlushRequest:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler que nunca bloqueia quem loga: com a fila cheia, o registro é descartado e contado
+
+    Na thread que loga, apenas a mensagem é resolvida (msg % args); a formatação
+    completa da linha fica com a thread de envio. O lock do handler não é usado:
+    a queue.Queue já é thread-safe.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        # Só os descartes são contados aqui (caminho raro); os registros aceitos são contados na thread de envio
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._exception_formatter = logging.Formatter()
+
+    def handle(self, record):
+        rv = self.filter(record)
+        if isinstance(rv, logging.LogRecord):
+            record = rv
+        if rv:
+            self.emit(record)
+        return rv
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # O traceback é guardado como texto: a exceção (e seus frames) não deve seguir na fila
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+
+class StreamSink:
+    """
+    Destino que escreve as linhas em um stream (stdout/stderr)
+    """
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def write(self, events):
+        self.stream.write("".join(f"{message}\n" for _, message in events))
+        self.stream.flush()
+
+
+class FileSink:
+    """
+    Destino que acrescenta as linhas a um arquivo local
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def write(self, events):
+        with open(self.path, "a", encoding="utf-8") as log_file:
+            log_file.write("".join(f"{message}\n" for _, message in events))
+
+
+class CloudWatchSink:
+    """
+    Destino que envia os lotes ao CloudWatch Logs (PutLogEvents)
+
+    Aceita qualquer cliente com a interface do cliente boto3 "logs"
+    (create_log_group, create_log_stream, put_log_events), o que permite
+    testar com um substituto local.
+    """
+
+    def __init__(self, client, log_group, log_stream):
+        """
+        Inicializa o destino (o grupo e o stream são criados no primeiro envio)
+
+        Args:
+            client: Cliente do CloudWatch Logs
+            log_group: Nome do grupo de logs
+            log_stream: Nome do stream de logs
+        """
+        self.client = client
+        self.log_group = log_group
+        self.log_stream = log_stream
+        self.rejected = 0
+        self._stream_ready = False
+
+    @staticmethod
+    def _already_exists(error):
+        return getattr(error, "response", {}).get("Error", {}).get("Code") == "ResourceAlreadyExistsException"
+
+    def _ensure_stream(self):
+        for create, kwargs in (
+            (self.client.create_log_group, {"logGroupName": self.log_group}),
+            (self.client.create_log_stream, {"logGroupName": self.log_group, "logStreamName": self.log_stream}),
+        ):
+            try:
+                create(**kwargs)
+            except Exception as e:
+                if not self._already_exists(e):
+                    raise
+        self._stream_ready = True
+
+    def _batches(self, events):
+        batch, batch_bytes = [], 0
+        for timestamp, message in sorted(events, key=lambda event: event[0]):
+            encoded = message.encode("utf-8")
+            if len(encoded) > CLOUDWATCH_MAX_EVENT_BYTES:
+                message = encoded[:CLOUDWATCH_MAX_EVENT_BYTES].decode("utf-8", errors="ignore")
+                encoded = message.encode("utf-8")
+            size = len(encoded) + CLOUDWATCH_EVENT_OVERHEAD
+
+            if batch and (len(batch) >= CLOUDWATCH_MAX_BATCH_EVENTS or batch_bytes + size > CLOUDWATCH_MAX_BATCH_BYTES):
+                yield batch
+                batch, batch_bytes = [], 0
+            batch.append({"timestamp": timestamp, "message": message})
+            batch_bytes += size
+        if batch:
+            yield batch
+
+    def write(self, events):
+        if not self._stream_ready:
+            self._ensure_stream()
+
+        for batch in self._batches(events):
+            response = self.client.put_log_events(
+                logGroupName=self.log_group,
+                logStreamName=self.log_stream,
+                logEvents=batch
+            )
+            rejected = (response or {}).get("rejectedLogEventsInfo")
+            if rejected:
+                self.rejected += 1
+
+
+class LogShipper:
+    """
+    Pipeline de logs do processo: um handler não bloqueante (fila limitada)
+    e uma única thread que formata e envia os registros em lotes
+
+    O lote é enviado quando atinge `batch_size` registros ou quando o
+    registro mais antigo espera `flush_interval` segundos. Registros que não
+    cabem na fila são descartados e contados; se um destino falhar, o lote vai
+    para o destino de fallback (arquivo ou stdout local).
+    """
+
+    def __init__(self, sinks, fallback_sink=None, queue_size=10000, batch_size=500, flush_interval=2.0):
+        """
+        Inicializa o pipeline (a thread de envio é iniciada em start)
+
+        Args:
+            sinks: Destinos que recebem todos os lotes (ex.: StreamSink, CloudWatchSink)
+            fallback_sink: Destino dos lotes que falharem em algum destino (opcional)
+            queue_size: Número máximo de registros aguardando envio
+            batch_size: Número máximo de registros por lote
+            flush_interval: Espera máxima de um registro antes do envio, em segundos
+        """
+        self.sinks = list(sinks)
+        self.fallback_sink = fallback_sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        self.formatter = logging.Formatter(LOG_FORMAT, LOG_DATE_FORMAT)
+
+        self._thread = None
+        self._received = 0
+        self._reported_drops = 0
+        self._metrics = {"shipped": 0, "batches": 0, "sink_errors": 0, "fallback_records": 0, "total_flush_time": 0.0}
+
+    def start(self):
+        """
+        Inicia a thread de envio
+        """
+        self._thread = threading.Thread(target=self._run, name="log-shipper", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        batch = []
+        deadline = None
+        while True:
+            timeout = max(deadline - time.monotonic(), 0) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if isinstance(item, logging.LogRecord):
+                self._received += 1
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+                if len(batch) < self.batch_size and time.monotonic() < deadline:
+                    continue
+
+            if batch:
+                self._flush(batch)
+                batch = []
+
+            if isinstance(item, _FlushRequest):
+                item.done.set()
+            elif item is _STOP:
+                return
+
+    def _write(self, sink, events):
+        try:
+            sink.write(events)
+        except Exception as e:
+            self._metrics["sink_errors"] += 1
+            if self.fallback_sink is None or sink is self.fallback_sink:
+                return
+            notice = f"{time.strftime(LOG_DATE_FORMAT)} [ERROR] log_shipper: ❌ Falha no destino {type(sink).__name__} ({e!r}), {len(events)} registros enviados ao fallback"
+            try:
+                self.fallback_sink.write(events + [(int(time.time() * 1000), notice)])
+                self._metrics["fallback_records"] += len(events)
+            except Exception:
+                pass
+
+    def _flush(self, batch):
+        flush_start = time.time()
+        events = []
+        for record in batch:
+            try:
+                events.append((int(record.created * 1000), self.formatter.format(record)))
+            except Exception:
+                self._metrics["sink_errors"] += 1
+
+        # Descartes acontecem nas threads que logam; o aviso é emitido aqui, junto com o próximo lote
+        dropped = self.handler.dropped
+        if dropped > self._reported_drops:
+            events.append((int(time.time() * 1000), f"{time.strftime(LOG_DATE_FORMAT)} [WARNING] log_shipper: "
+                                                    f"⚠️ {dropped - self._reported_drops} registros de log descartados (fila cheia)"))
+            self._reported_drops = dropped
+
+        for sink in self.sinks:
+            self._write(sink, events)
+
+        self._metrics["shipped"] += len(batch)
+        self._metrics["batches"] += 1
+        self._metrics["total_flush_time"] += time.time() - flush_start
+
+    def flush(self, timeout=5.0):
+        """
+        Envia imediatamente os registros já enfileirados
+
+        Args:
+            timeout: Tempo máximo de espera, em segundos
+
+        Returns:
+            bool: True se o envio terminou dentro do tempo
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return False
+        request = _FlushRequest()
+        try:
+            self.queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout=5.0):
+        """
+        Envia os registros pendentes e encerra a thread de envio
+
+        Args:
+            timeout: Tempo máximo de espera, em segundos
+        """
+        if self._thread is None or not self._thread.is_alive():
+            return
+        try:
+            self.queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            return
+        self._thread.join(timeout)
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do pipeline
+
+        Returns:
+            dict: Registros enfileirados, enviados e descartados, lotes, falhas dos destinos e tempo médio de envio
+        """
+        metrics = dict(self._metrics)
+        # Registros aceitos na fila: já recebidos pela thread de envio ou ainda aguardando
+        metrics["enqueued"] = self._received + self.queue.qsize()
+        metrics["dropped"] = self.handler.dropped
+        metrics["queue_size"] = self.queue.qsize()
+        total_flush_time = metrics.pop("total_flush_time")
+        metrics["avg_flush_time"] = round(total_flush_time / metrics["batches"], 4) if metrics["batches"] else 0.0
+        metrics["rejected_batches"] = sum(getattr(sink, "rejected", 0) for sink in self.sinks)
+        return metrics
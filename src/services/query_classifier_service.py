@@ -0,0 +1,141 @@
+import re
+import logging
+import threading
+import unicodedata
+
+logger = logging.getLogger('query_classifier')
+
+# Saudações, agradecimentos e despedidas que não exigem busca
+GREETING_TERMS = {
+    "oi", "ola", "opa", "eai", "bom dia", "boa tarde", "boa noite", "tudo bem", "tudo bom",
+    "obrigado", "obrigada", "valeu", "grato", "grata", "tchau", "ate logo", "ate mais",
+    "ok", "certo", "entendi", "beleza", "perfeito", "show", "legal", "blz", "vlw", "obg"
+}
+
+# Pronomes e expressões que costumam retomar algo dito antes na conversa
+ANAPHORA_TERMS = {
+    "ele", "ela", "eles", "elas", "dele", "dela", "deles", "delas", "nele", "nela",
+    "isso", "isto", "aquilo", "disso", "disto", "daquilo", "nisso", "nisto",
+    "esse", "essa", "esses", "essas", "este", "estes", "estas",
+    "desse", "dessa", "deste", "desta", "nesse", "nessa", "neste", "nesta",
+    "aquele", "aquela", "daquele", "daquela", "naquele", "naquela",
+    "mesmo", "mesma", "anterior", "acima", "citado", "citada", "mencionado", "mencionada",
+    "lo", "la", "los", "las", "lhe", "lhes"
+}
+ANAPHORA_PREFIXES = ("e ", "e o ", "e a ", "e sobre", "e quanto", "mas e", "tambem", "e se", "e no", "e na")
+
+# Léxico jurídico (sem acentos, em minúsculas)
+LEGAL_TERMS = {
+    "recurso", "extraordinario", "agravo", "acordao", "embargos", "decisao", "admissibilidade",
+    "sentenca", "stf", "stj", "tribunal", "relator", "relatora", "ministro", "ministra",
+    "recorrente", "recorrido", "recorrida", "agravante", "agravado", "embargante", "embargado",
+    "lei", "artigo", "art", "sumula", "constituicao", "constitucional", "inciso", "paragrafo",
+    "codigo", "penal", "civil", "processo", "processual", "prescricao", "prazo", "juiz", "juiza",
+    "jurisprudencia", "transito", "julgado", "competencia", "repercussao", "geral", "pena",
+    "crime", "reu", "denuncia", "habeas", "corpus", "mandado", "seguranca", "liminar", "tese"
+}
+CASE_ID_PATTERN = re.compile(r"\b(a?re)\s*\d{5,}\b")
+ARTICLE_PATTERN = re.compile(r"\bart(igo)?\.?\s*\d+")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text):
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in text if not unicodedata.combining(char)).strip()
+
+
+class QueryClassifierService:
+    """
+    Classificador local (regras + traços léxicos) executado antes do GEQS.
+    Decide, sem chamar o LLM, quando a query não precisa ser reescrita ou
+    quando não há necessidade de busca; nos demais casos, delega ao GEQS.
+    """
+
+    NO_REWRITE = "no_rewrite"
+    NO_SEARCH = "no_search"
+    DEFER = "defer"
+
+    def __init__(self, confidence_threshold=0.75):
+        """
+        Args:
+            confidence_threshold: Confiança mínima para aceitar a decisão local
+        """
+        self.confidence_threshold = confidence_threshold
+        self._lock = threading.Lock()
+        self._metrics = {self.NO_REWRITE: 0, self.NO_SEARCH: 0, self.DEFER: 0}
+
+    def _score(self, query):
+        """
+        Calcula a decisão candidata e sua confiança a partir de traços léxicos
+        """
+        normalized = _normalize(query)
+        tokens = TOKEN_PATTERN.findall(normalized)
+        phrase = " ".join(tokens)
+
+        if not tokens:
+            return self.NO_SEARCH, 0.9
+
+        has_case_id = bool(CASE_ID_PATTERN.search(normalized))
+        has_article = bool(ARTICLE_PATTERN.search(normalized))
+        legal_hits = sum(1 for token in tokens if token in LEGAL_TERMS)
+        anaphora_hits = sum(1 for token in tokens if token in ANAPHORA_TERMS)
+        starts_with_reference = phrase.startswith(ANAPHORA_PREFIXES)
+
+        greeting_hits = sum(1 for term in GREETING_TERMS if re.search(rf"\b{term}\b", phrase))
+        is_short = len(tokens) <= 5
+
+        # Saudação/agradecimento curto e sem conteúdo jurídico
+        if greeting_hits and is_short and not legal_hits and not has_case_id:
+            return self.NO_SEARCH, 0.9 if len(tokens) <= 3 else 0.8
+
+        # Retomadas do histórico precisam do GEQS para serem reescritas
+        if anaphora_hits or starts_with_reference:
+            return self.DEFER, 0.0
+
+        # Pergunta autocontida: identificadores explícitos ou vocabulário jurídico suficiente
+        confidence = 0.0
+        if has_case_id:
+            confidence += 0.6
+        if has_article:
+            confidence += 0.2
+        confidence += min(legal_hits, 3) * 0.15
+        if len(tokens) >= 4:
+            confidence += 0.1
+        if query.strip().endswith("?"):
+            confidence += 0.05
+
+        return self.NO_REWRITE, min(confidence, 0.95)
+
+    def classify(self, query):
+        """
+        Classifica a query
+
+        Args:
+            query: Texto da query
+
+        Returns:
+            dict: {"decision": "no_rewrite" | "no_search" | "defer", "confidence": float}
+        """
+        decision, confidence = self._score(query)
+        if decision != self.DEFER and confidence < self.confidence_threshold:
+            decision = self.DEFER
+
+        with self._lock:
+            self._metrics[decision] += 1
+
+        logger.debug(f"Classificação local da query: {decision} (confiança {confidence:.2f})")
+        return {"decision": decision, "confidence": round(confidence, 4)}
+
+    def get_metrics(self):
+        """
+        Retorna os contadores de decisões
+
+        Returns:
+            dict: Contagem por decisão e taxa de chamadas ao GEQS evitadas
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+
+        total = sum(metrics.values())
+        metrics["skip_rate"] = round((total - metrics[self.DEFER]) / total, 4) if total else 0.0
+        return metrics
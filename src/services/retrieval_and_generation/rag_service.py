@@ -1,15 +1,47 @@
+import asyncio
 import logging
 import time
 import uuid
+import difflib
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 import sys
 sys.path.insert(0, '../src/')
 from services.generate_embedding_query_service import GenerateEmbeddingQueryService
+from services.query_classifier_service import QueryClassifierService
+from services.document_metadata import detect_filters, detect_doc_type, boost_doc_type
 
 logger = logging.getLogger("rag_service")
 
+NO_CONTEXT = '--- Nenhum trecho adicional de algum documento pareceu relevante para a pergunta do usuário ---'
+# Com um tipo de peça apenas mencionado na pergunta, a busca traz search_k * DOC_TYPE_OVERFETCH candidatos
+# para que as peças do tipo, priorizadas, possam entrar no resultado
+DOC_TYPE_OVERFETCH = 2
+
+def query_similarity(query_a, query_b):
+    """
+    Similaridade lexical (0 a 1) entre duas queries, usada para decidir se a
+    query refinada pelo GEQS difere materialmente da original
+    
+    Args:
+        query_a: Primeira query
+        query_b: Segunda query
+        
+    Returns:
+        float: Razão de similaridade entre as sequências de palavras
+    """
+    tokens_a = query_a.lower().split()
+    tokens_b = query_b.lower().split()
+    if not tokens_a and not tokens_b:
+        return 1.0
+    return difflib.SequenceMatcher(None, tokens_a, tokens_b).ratio()
+
 class RAGService:
-    def __init__(self, vector_search_service, llm_service, max_context_docs=5):
+    def __init__(self, vector_search_service, llm_service, max_context_docs=5,
+                 speculative_search=False, speculative_similarity_threshold=0.85, query_classifier=None,
+                 answer_cache=None, auto_filters=False, reranker=None, rerank_overfetch=4):
         """
         Inicializa o serviço RAG
         
@@ -17,84 +49,665 @@ class RAGService:
             vector_search_service: Serviço de busca vetorial
             llm_service: Serviço LLM
             max_context_docs: Número máximo de documentos para o contexto
+            speculative_search: Se True, busca com a query original em paralelo ao GEQS
+            speculative_similarity_threshold: Similaridade mínima entre a query refinada e a original
+                para reaproveitar o resultado da busca especulativa
+            query_classifier: QueryClassifierService executado antes do GEQS (None sempre usa o GEQS)
+            answer_cache: SemanticAnswerCache para respostas a perguntas repetidas (None desabilita)
+            auto_filters: Se True, detecta filtros pedidos explicitamente na pergunta (processo, tipo da peça)
+                quando não informados e prioriza as peças do tipo apenas mencionado
+            reranker: RerankerService que reordena os candidatos antes do contexto (None desabilita)
+            rerank_overfetch: Com reranker, a busca traz max_context_docs * rerank_overfetch candidatos
         """
         self.vector_search_service = vector_search_service
         self.llm_service = llm_service
         self.max_context_docs = max_context_docs
         self.geqs = GenerateEmbeddingQueryService(self.llm_service.llm)
+        self.query_classifier = query_classifier
+        self.answer_cache = answer_cache
+        self.auto_filters = auto_filters
+        self.reranker = reranker
+        # Com reordenação, a busca traz mais candidatos do que o contexto usa
+        self.search_k = max_context_docs * max(1, rerank_overfetch) if reranker is not None else max_context_docs
+        
+        self.speculative_search = speculative_search
+        self.speculative_similarity_threshold = speculative_similarity_threshold
+        self._executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag") if speculative_search else None
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "speculative_launched": 0,
+            "speculative_used": 0,
+            "speculative_discarded": 0,
+            "refined_searches": 0,
+            "geqs_calls": 0,
+            "filtered_searches": 0,
+            "auto_filters_detected": 0,
+            "auto_filters_fallbacks": 0,
+            "doc_type_boosts": 0
+        }
+    
+    def _count(self, metric):
+        with self._metrics_lock:
+            self._metrics[metric] += 1
+    
+    def get_metrics(self):
+        """
+        Retorna as métricas do serviço RAG
+        
+        Returns:
+            dict: Contadores da busca especulativa
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        
+        launched = metrics["speculative_launched"]
+        metrics["speculative_hit_rate"] = round(metrics["speculative_used"] / launched, 4) if launched else 0.0
+        if self.query_classifier is not None:
+            metrics["query_classifier"] = self.query_classifier.get_metrics()
+        if self.answer_cache is not None:
+            metrics["answer_cache"] = self.answer_cache.get_metrics()
+        if self.reranker is not None:
+            metrics["reranker"] = self.reranker.get_metrics()
+        return metrics
+    
+    @staticmethod
+    def _chunk_ids(docs):
+        return [doc.id or hashlib.sha1(doc.page_content.encode("utf-8")).hexdigest() for doc in docs]
+    
+    def _cache_key(self, prepared, embedding):
+        return {
+            "embedding": embedding,
+            "chunk_ids": self._chunk_ids(prepared["docs"]),
+            "index_version": prepared["index_version"],
+            "answer": None
+        }
+    
+    def _lookup_answer(self, query_id, prepared):
+        """
+        Busca no cache semântico uma resposta para a query refinada e os chunks recuperados
+        
+        Returns:
+            dict | None: Chave de cache (com "answer" preenchido em caso de acerto)
+                ou None quando o cache não se aplica (desabilitado ou sem documentos)
+        """
+        if self.answer_cache is None or not prepared["docs"]:
+            return None
+        
+        key = self._cache_key(prepared, self.vector_search_service.embed_query(prepared["query"]))
+        return self._check_answer(query_id, key)
+    
+    async def _alookup_answer(self, query_id, prepared):
+        if self.answer_cache is None or not prepared["docs"]:
+            return None
+        
+        embedding = await asyncio.to_thread(self.vector_search_service.embed_query, prepared["query"])
+        return self._check_answer(query_id, self._cache_key(prepared, embedding))
+    
+    def _check_answer(self, query_id, key):
+        entry = self.answer_cache.get(key["embedding"], key["chunk_ids"], key["index_version"])
+        if entry is not None:
+            key["answer"] = entry["answer"]
+            logger.info(f"[{query_id}] ✅ Resposta obtida do cache semântico")
+        return key
     
-    def process_query(self, query, chat_id):
+    def _store_answer(self, key, query, answer):
+        if key is not None and answer:
+            self.answer_cache.put(query, key["embedding"], key["chunk_ids"], answer, key["index_version"])
+    
+    def _resolve_filters(self, query_id, query, filters):
+        """
+        Define os filtros da busca: os informados na requisição ou, se habilitado, os detectados na pergunta
+        
+        Returns:
+            tuple: (filtros, True se foram detectados automaticamente)
+        """
+        if filters:
+            return filters, False
+        if not self.auto_filters:
+            return {}, False
+        
+        detected = detect_filters(query)
+        if detected:
+            self._count("auto_filters_detected")
+            logger.info(f"[{query_id}] Filtros detectados na pergunta: {detected}")
+        return detected, bool(detected)
+    
+    def _rerank(self, query, docs):
+        if self.reranker is None:
+            return docs
+        return self.reranker.rerank(query, docs, self.max_context_docs)
+    
+    def _mentioned_doc_type(self, query, filters):
+        """
+        Tipo de peça mencionado na pergunta sem um pedido explícito (não vira filtro, só prioriza as peças do tipo)
+        """
+        if not self.auto_filters or (filters and "doc_type" in filters):
+            return None
+        return detect_doc_type(query)
+    
+    def _boost(self, query_id, docs, doc_type):
+        if doc_type is None:
+            return docs
+        self._count("doc_type_boosts")
+        logger.info(f"[{query_id}] Peças do tipo {doc_type} priorizadas na busca")
+        return boost_doc_type(docs, doc_type, self.search_k)[:self.search_k]
+    
+    def _search(self, query_id, query, filters, auto_filters):
+        """
+        Busca os documentos candidatos com os filtros; filtros detectados automaticamente
+        que não encontram nenhum documento são descartados. Um tipo de peça apenas
+        mencionado na pergunta prioriza as peças do tipo entre os candidatos
+
+        A reordenação fica com quem escolhe a query final (a busca especulativa
+        usa a query original, mas o contexto é reordenado com a refinada).
+        """
+        if filters:
+            self._count("filtered_searches")
+        doc_type = self._mentioned_doc_type(query, filters)
+        k = self.search_k * DOC_TYPE_OVERFETCH if doc_type else self.search_k
+        docs = self.vector_search_service.similarity_search(query, k=k, filters=filters)
+        if not docs and auto_filters:
+            self._count("auto_filters_fallbacks")
+            logger.info(f"[{query_id}] Nenhum documento com os filtros detectados, buscando sem filtros")
+            docs = self.vector_search_service.similarity_search(query, k=k)
+        return self._boost(query_id, docs, doc_type)
+    
+    async def _asearch(self, query_id, query, filters, auto_filters):
+        """
+        Versão assíncrona de _search
+        """
+        if filters:
+            self._count("filtered_searches")
+        doc_type = self._mentioned_doc_type(query, filters)
+        k = self.search_k * DOC_TYPE_OVERFETCH if doc_type else self.search_k
+        docs = await self.vector_search_service.asimilarity_search(query, k=k, filters=filters)
+        if not docs and auto_filters:
+            self._count("auto_filters_fallbacks")
+            logger.info(f"[{query_id}] Nenhum documento com os filtros detectados, buscando sem filtros")
+            docs = await self.vector_search_service.asimilarity_search(query, k=k)
+        return self._boost(query_id, docs, doc_type)
+    
+    def _search_refined(self, query_id, original_query, refined_query, speculative_future, filters, auto_filters):
+        """
+        Busca os documentos para a query refinada, reaproveitando a busca
+        especulativa (feita com a query original) quando as queries são parecidas,
+        e os reordena com a query refinada
+        
+        Returns:
+            tuple: (documentos, True se o resultado especulativo foi usado)
+        """
+        if speculative_future is not None:
+            similarity = query_similarity(original_query, refined_query)
+            
+            if similarity >= self.speculative_similarity_threshold:
+                try:
+                    docs = speculative_future.result()
+                    self._count("speculative_used")
+                    logger.info(f"[{query_id}] Busca especulativa reaproveitada (similaridade {similarity:.2f})")
+                    return self._rerank(refined_query, docs), True
+                except Exception as e:
+                    logger.warning(f"[{query_id}] Busca especulativa falhou, buscando com a query refinada: {str(e)}")
+            else:
+                speculative_future.cancel()
+                logger.info(f"[{query_id}] Query refinada difere da original (similaridade {similarity:.2f})")
+            
+            self._count("speculative_discarded")
+        
+        self._count("refined_searches")
+        return self._rerank(refined_query, self._search(query_id, refined_query, filters, auto_filters)), False
+    
+    def _route_query(self, query_id, query, chat_history):
+        """
+        Decide como a query será tratada antes da busca
+        
+        Returns:
+            str: "no_search" (sem busca), "direct" (busca com a query original) ou "geqs"
+        """
+        # Classificação local: evita a chamada ao GEQS quando a decisão é evidente
+        decision = QueryClassifierService.DEFER
+        if self.query_classifier is not None:
+            decision = self.query_classifier.classify(query)["decision"]
+            logger.info(f"[{query_id}] Classificação local da query: {decision}")
+
+        if decision == QueryClassifierService.NO_SEARCH:
+            return "no_search"
+        if decision == QueryClassifierService.NO_REWRITE or len(chat_history) == 0:
+            return "direct"
+        return "geqs"
+    
+    def _build_context(self, query_id, docs):
+        """
+        Monta o contexto do prompt a partir dos documentos encontrados
+        
+        Returns:
+            tuple: (fontes dos documentos, contexto)
+        """
+        document_sources = []
+        
+        # Log dos documentos usados
+        logger.info(f"[{query_id}] Documentos selecionados para o contexto:")
+        for i, doc in enumerate(docs):
+            source = "Desconhecido"
+            if hasattr(doc, 'metadata') and doc.metadata:
+                source = doc.metadata.get('source', doc.metadata.get('file_path', 'Desconhecido'))
+            document_sources.append(source)
+            logger.info(f"[{query_id}]   {i+1}. {source}")
+        
+        # Construindo o contexto
+        logger.debug(f"[{query_id}] Construindo contexto a partir de {len(docs)} documentos")            
+        context = "\n\n".join([doc.page_content for doc in docs])
+        logger.debug(f"[{query_id}] Contexto construído com {len(context)} caracteres")
+        return document_sources, context
+    
+    def _prepared(self, snapshot, index_version, query, docs=None, document_sources=None, context=None, speculative_used=False,
+                  geqs_called=False, filters=None):
+        if context is None:
+            context = NO_CONTEXT
+        return {
+            "snapshot": snapshot,
+            "index_version": index_version,
+            "query": query,
+            "filters": filters or {},
+            "docs": docs or [],
+            "document_sources": document_sources or [],
+            "context": context,
+            "speculative_search_used": speculative_used,
+            "geqs_called": geqs_called
+        }
+    
+    def _refined_filters(self, query_id, refined_query, filters, auto_filters):
+        """
+        Sem filtros informados nem detectados na pergunta original, tenta detectá-los na query refinada
+        (o GEQS costuma trazer para a query o processo citado antes na conversa)
+        
+        Returns:
+            tuple: (filtros, True se foram detectados automaticamente)
+        """
+        if filters:
+            return filters, auto_filters
+        return self._resolve_filters(query_id, refined_query, None)
+    
+    def prepare_context(self, query_id, query, chat_id, filters=None):
+        """
+        Executa as etapas anteriores à geração: classificação, GEQS e busca de documentos
+        
+        Args:
+            query_id: ID da requisição (para logs)
+            query: Texto da query
+            chat_id: ID do chat
+            filters: Filtros de metadados informados na requisição (opcional)
+            
+        Returns:
+            dict: "snapshot" (estado do chat), "index_version" (versão do índice lida antes da busca),
+                "query" (query final), "filters", "docs",
+                "document_sources", "context", "speculative_search_used" e "geqs_called"
+        """
+        # Versão lida antes da busca: uma resposta gerada com chunks de antes de uma reindexação nunca entra
+        # no cache semântico com a versão nova
+        index_version = self.vector_search_service.chroma_repository.get_index_version()
+        # Estado do chat lido uma única vez: o mesmo snapshot é repassado à geração da resposta
+        snapshot = self.llm_service.graph_service.load_snapshot(chat_id)
+        chat_history = snapshot.messages
+        route = self._route_query(query_id, query, chat_history)
+
+        if route == "no_search":
+            return self._prepared(snapshot, index_version, query)
+        
+        filters, auto_filters = self._resolve_filters(query_id, query, filters)
+        if route == "direct":
+            docs = self._rerank(query, self._search(query_id, query, filters, auto_filters))
+            return self._prepared(snapshot, index_version, query, docs, *self._build_context(query_id, docs), filters=filters)
+
+        # Dispara a busca com a query original enquanto o GEQS refina a query
+        speculative_future = None
+        if self.speculative_search:
+            speculative_future = self._executor.submit(self._search, query_id, query, filters, auto_filters)
+            self._count("speculative_launched")
+        
+        geqs_result = self.geqs.generate_query(chat_history, query)
+        self._count("geqs_calls")
+
+        # GEQS approved searching documents.
+        if geqs_result['worth_searching']:
+            refined_query = geqs_result['refined_query']
+            refined_filters, auto_filters = self._refined_filters(query_id, refined_query, filters, auto_filters)
+            if refined_filters != filters and speculative_future is not None:
+                # A busca especulativa usou outros filtros e não pode ser reaproveitada
+                speculative_future.cancel()
+                self._count("speculative_discarded")
+                speculative_future = None
+            docs, speculative_used = self._search_refined(query_id, query, refined_query, speculative_future,
+                                                          refined_filters, auto_filters)
+            return self._prepared(snapshot, index_version, refined_query, docs, *self._build_context(query_id, docs),
+                                  speculative_used=speculative_used, geqs_called=True, filters=refined_filters)
+        
+        if speculative_future is not None:
+            # GEQS decidiu que não vale a pena buscar: o resultado especulativo é descartado
+            speculative_future.cancel()
+            self._count("speculative_discarded")
+        return self._prepared(snapshot, index_version, query, geqs_called=True)
+    
+    async def _asearch_refined(self, query_id, original_query, refined_query, speculative_task, filters, auto_filters):
+        """
+        Versão assíncrona de _search_refined (a busca especulativa é uma asyncio.Task)
+        """
+        if speculative_task is not None:
+            similarity = query_similarity(original_query, refined_query)
+            
+            if similarity >= self.speculative_similarity_threshold:
+                try:
+                    docs = await speculative_task
+                    self._count("speculative_used")
+                    logger.info(f"[{query_id}] Busca especulativa reaproveitada (similaridade {similarity:.2f})")
+                    # A reordenação é limitada pelo orçamento de tempo e roda no próprio event loop
+                    return self._rerank(refined_query, docs), True
+                except Exception as e:
+                    logger.warning(f"[{query_id}] Busca especulativa falhou, buscando com a query refinada: {str(e)}")
+            else:
+                speculative_task.cancel()
+                logger.info(f"[{query_id}] Query refinada difere da original (similaridade {similarity:.2f})")
+            
+            self._count("speculative_discarded")
+        
+        self._count("refined_searches")
+        return self._rerank(refined_query, await self._asearch(query_id, refined_query, filters, auto_filters)), False
+    
+    async def aprepare_context(self, query_id, query, chat_id, filters=None):
+        """
+        Versão assíncrona de prepare_context, usada pelo app ASGI
+        
+        Returns:
+            dict: Mesmo formato de prepare_context
+        """
+        index_version = self.vector_search_service.chroma_repository.get_index_version()
+        snapshot = await self.llm_service.graph_service.aload_snapshot(chat_id)
+        chat_history = snapshot.messages
+        route = self._route_query(query_id, query, chat_history)
+
+        if route == "no_search":
+            return self._prepared(snapshot, index_version, query)
+        
+        filters, auto_filters = self._resolve_filters(query_id, query, filters)
+        if route == "direct":
+            docs = self._rerank(query, await self._asearch(query_id, query, filters, auto_filters))
+            return self._prepared(snapshot, index_version, query, docs, *self._build_context(query_id, docs), filters=filters)
+
+        speculative_task = None
+        if self.speculative_search:
+            speculative_task = asyncio.create_task(self._asearch(query_id, query, filters, auto_filters))
+            self._count("speculative_launched")
+        
+        try:
+            geqs_result = await self.geqs.agenerate_query(chat_history, query)
+        except BaseException:
+            if speculative_task is not None:
+                speculative_task.cancel()
+            raise
+        self._count("geqs_calls")
+
+        if geqs_result['worth_searching']:
+            refined_query = geqs_result['refined_query']
+            refined_filters, auto_filters = self._refined_filters(query_id, refined_query, filters, auto_filters)
+            if refined_filters != filters and speculative_task is not None:
+                speculative_task.cancel()
+                self._count("speculative_discarded")
+                speculative_task = None
+            docs, speculative_used = await self._asearch_refined(query_id, query, refined_query, speculative_task,
+                                                                 refined_filters, auto_filters)
+            return self._prepared(snapshot, index_version, refined_query, docs, *self._build_context(query_id, docs),
+                                  speculative_used=speculative_used, geqs_called=True, filters=refined_filters)
+        
+        if speculative_task is not None:
+            speculative_task.cancel()
+            self._count("speculative_discarded")
+        return self._prepared(snapshot, index_version, query, geqs_called=True)
+    
+    def _build_result(self, prepared, response, llm_time, total_time, answer_cache_hit=False):
+        docs = prepared["docs"]
+        return {
+            "response": response,
+            "context_docs": len(docs),
+            "document_sources": prepared["document_sources"],
+            "model_used": self.llm_service.model_id,
+            "processing_time": round(total_time, 4),
+            "metrics": {
+                "llm_time": round(llm_time, 4),
+                "context_docs": len(docs),
+                "speculative_search_used": prepared["speculative_search_used"],
+                "geqs_called": prepared["geqs_called"],
+                "answer_cache_hit": answer_cache_hit,
+                "filters": prepared["filters"]
+            }
+        }
+    
+    def process_query(self, query, chat_id, filters=None):
         """
         Processa uma query usando RAG
         
         Args:
             query: Texto da query
-            chat_history: Histórico de chat opcional
+            chat_id: ID do chat (thread do histórico)
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299"}); sem filtros, podem ser detectados na pergunta
             
         Returns:
             dict: Resultado do processamento
         """
         query_id = str(uuid.uuid4())[:8]
-        logger.info(f"[{query_id}] Iniciando processamento de query: '{query}'")
+        logger.info(f"[{query_id}] Iniciando processamento de query ({len(query)} caracteres)")
         process_start = time.time()
         
         try:
-            chat_history = self.llm_service.graph_service.get_chat_history(chat_id)
-
-            geqs_result = self.geqs.generate_query(chat_history, query) if len(chat_history) > 0 else {"worth_searching": True, "refined_query": query}
-
-            # Busca documentos relevantes
-            docs = []
-            document_sources = []
-            context = '--- Nenhum trecho adicional de algum documento pareceu relevante para a pergunta do usuário ---'
-            
-            # GEQS approved searching documents.
-            if geqs_result['worth_searching']:
-                query = geqs_result['refined_query']
-                docs = self.vector_search_service.similarity_search(query, k=self.max_context_docs)
-            
-                # Log dos documentos usados
-                logger.info(f"[{query_id}] Documentos selecionados para o contexto:")
-                for i, doc in enumerate(docs):
-                    source = "Desconhecido"
-                    if hasattr(doc, 'metadata') and doc.metadata:
-                        source = doc.metadata.get('source', doc.metadata.get('file_path', 'Desconhecido'))
-                    document_sources.append(source)
-                    logger.info(f"[{query_id}]   {i+1}. {source}")
-                
-                # Construindo o contexto
-                logger.debug(f"[{query_id}] Construindo contexto a partir de {len(docs)} documentos")            
-                context_start = time.time()
-                context = "\n\n".join([doc.page_content for doc in docs])
-                logger.debug(f"[{query_id}] Contexto construído com {len(context)} caracteres")
-                context_time = time.time() - context_start
-            
-            # Cria o prompt RAG
-            logger.debug(f"[{query_id}] Criando prompt RAG")
-            messages = self.llm_service.create_rag_prompt(context, query)
-            
-            # Gera a resposta
-            logger.info(f"[{query_id}] Gerando resposta com LLM...")
+            prepared = self.prepare_context(query_id, query, chat_id, filters)
+            query = prepared["query"]
+            
+            # Pergunta repetida sobre os mesmos trechos: a resposta em cache entra no histórico sem chamar o LLM
+            cache_key = self._lookup_answer(query_id, prepared)
             llm_start = time.time()
-            response = self.llm_service.generate_response(messages, chat_id, query)
+            if cache_key is not None and cache_key["answer"] is not None:
+                response = cache_key["answer"]
+                self.llm_service.graph_service.append_turn(chat_id, query, response, snapshot=prepared["snapshot"])
+            else:
+                # Cria o prompt RAG
+                logger.debug(f"[{query_id}] Criando prompt RAG")
+                messages = self.llm_service.create_rag_prompt(prepared["context"], query)
+                
+                # Gera a resposta
+                logger.info(f"[{query_id}] Gerando resposta com LLM...")
+                response = self.llm_service.generate_response(messages, chat_id, query, snapshot=prepared["snapshot"])
+                logger.info(f"[{query_id}] ✅ Resposta gerada com sucesso em {time.time() - llm_start:.4f}s")
+                self._store_answer(cache_key, query, response)
             llm_time = time.time() - llm_start
-            logger.info(f"[{query_id}] ✅ Resposta gerada com sucesso em {llm_time:.4f}s")
             
             # Tempo total de processamento
             total_time = time.time() - process_start
             logger.info(f"[{query_id}] 🏁 Processamento completo em {total_time:.4f}s")
             
-            return {
-                "response": response,
+            return self._build_result(prepared, response, llm_time, total_time,
+                                      answer_cache_hit=cache_key is not None and cache_key["answer"] is not None)
+        except Exception as e:
+            logger.error(f"[{query_id}] ❌ Erro ao processar query: {str(e)}", exc_info=True)
+            raise
+    
+    async def aprocess_query(self, query, chat_id, filters=None):
+        """
+        Versão assíncrona de process_query: GEQS, busca e LLM são aguardados,
+        liberando o event loop para outras requisições
+        
+        Args:
+            query: Texto da query
+            chat_id: ID do chat (thread do histórico)
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299"}); sem filtros, podem ser detectados na pergunta
+            
+        Returns:
+            dict: Resultado do processamento (mesmo formato de process_query)
+        """
+        query_id = str(uuid.uuid4())[:8]
+        logger.info(f"[{query_id}] Iniciando processamento (async) de query ({len(query)} caracteres)")
+        process_start = time.time()
+        
+        try:
+            prepared = await self.aprepare_context(query_id, query, chat_id, filters)
+            query = prepared["query"]
+            
+            cache_key = await self._alookup_answer(query_id, prepared)
+            llm_start = time.time()
+            if cache_key is not None and cache_key["answer"] is not None:
+                response = cache_key["answer"]
+                await self.llm_service.graph_service.aappend_turn(chat_id, query, response, snapshot=prepared["snapshot"])
+            else:
+                messages = self.llm_service.create_rag_prompt(prepared["context"], query)
+                
+                logger.info(f"[{query_id}] Gerando resposta com LLM...")
+                response = await self.llm_service.agenerate_response(messages, chat_id, query, snapshot=prepared["snapshot"])
+                logger.info(f"[{query_id}] ✅ Resposta gerada com sucesso em {time.time() - llm_start:.4f}s")
+                self._store_answer(cache_key, query, response)
+            llm_time = time.time() - llm_start
+            
+            total_time = time.time() - process_start
+            logger.info(f"[{query_id}] 🏁 Processamento completo em {total_time:.4f}s")
+            
+            return self._build_result(prepared, response, llm_time, total_time,
+                                      answer_cache_hit=cache_key is not None and cache_key["answer"] is not None)
+        except Exception as e:
+            logger.error(f"[{query_id}] ❌ Erro ao processar query: {str(e)}", exc_info=True)
+            raise
+    
+    def stream_query(self, query, chat_id, filters=None):
+        """
+        Processa uma query usando RAG, emitindo a resposta em partes à medida que é gerada
+        
+        Args:
+            query: Texto da query
+            chat_id: ID do chat (thread do histórico)
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299"}); sem filtros, podem ser detectados na pergunta
+            
+        Yields:
+            dict: Eventos {"type": "start" | "token" | "end" | "error", ...}
+        """
+        query_id = str(uuid.uuid4())[:8]
+        logger.info(f"[{query_id}] Iniciando processamento (streaming) de query ({len(query)} caracteres)")
+        process_start = time.time()
+        
+        try:
+            prepared = self.prepare_context(query_id, query, chat_id, filters)
+            query = prepared["query"]
+            docs = prepared["docs"]
+            cache_key = self._lookup_answer(query_id, prepared)
+            cache_hit = cache_key is not None and cache_key["answer"] is not None
+            
+            yield {
+                "type": "start",
                 "context_docs": len(docs),
-                "document_sources": document_sources,
-                "model_used": self.llm_service.model_id,
+                "document_sources": prepared["document_sources"],
+                "model_used": self.llm_service.model_id
+            }
+            
+            llm_start = time.time()
+            first_token_time = None
+            if cache_hit:
+                self.llm_service.graph_service.append_turn(chat_id, query, cache_key["answer"], snapshot=prepared["snapshot"])
+                first_token_time = time.time() - process_start
+                yield {"type": "token", "content": cache_key["answer"]}
+            else:
+                messages = self.llm_service.create_rag_prompt(prepared["context"], query)
+                
+                logger.info(f"[{query_id}] Gerando resposta (streaming) com LLM...")
+                tokens = []
+                for token in self.llm_service.stream_response(messages, chat_id, query, snapshot=prepared["snapshot"]):
+                    if first_token_time is None:
+                        first_token_time = time.time() - process_start
+                        logger.info(f"[{query_id}] Primeiro token em {first_token_time:.4f}s")
+                    tokens.append(token)
+                    yield {"type": "token", "content": token}
+                self._store_answer(cache_key, query, "".join(tokens))
+            llm_time = time.time() - llm_start
+            
+            total_time = time.time() - process_start
+            logger.info(f"[{query_id}] 🏁 Processamento (streaming) completo em {total_time:.4f}s")
+            
+            yield {
+                "type": "end",
                 "processing_time": round(total_time, 4),
                 "metrics": {
                     "llm_time": round(llm_time, 4),
-                    "context_docs": len(docs)
+                    "time_to_first_token": round(first_token_time, 4) if first_token_time is not None else None,
+                    "context_docs": len(docs),
+                    "speculative_search_used": prepared["speculative_search_used"],
+                    "geqs_called": prepared["geqs_called"],
+                    "answer_cache_hit": cache_hit,
+                    "filters": prepared["filters"]
                 }
             }
         except Exception as e:
-            logger.error(f"[{query_id}] ❌ Erro ao processar query: {str(e)}", exc_info=True)
-            raise 
\ No newline at end of file
+            logger.error(f"[{query_id}] ❌ Erro ao processar query (streaming): {str(e)}", exc_info=True)
+            yield {"type": "error", "error": str(e)}
+    
+    async def astream_query(self, query, chat_id, filters=None):
+        """
+        Versão assíncrona de stream_query
+        
+        Args:
+            query: Texto da query
+            chat_id: ID do chat (thread do histórico)
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299"}); sem filtros, podem ser detectados na pergunta
+            
+        Yields:
+            dict: Eventos {"type": "start" | "token" | "end" | "error", ...}
+        """
+        query_id = str(uuid.uuid4())[:8]
+        logger.info(f"[{query_id}] Iniciando processamento (streaming async) de query ({len(query)} caracteres)")
+        process_start = time.time()
+        
+        try:
+            prepared = await self.aprepare_context(query_id, query, chat_id, filters)
+            query = prepared["query"]
+            docs = prepared["docs"]
+            cache_key = await self._alookup_answer(query_id, prepared)
+            cache_hit = cache_key is not None and cache_key["answer"] is not None
+            
+            yield {
+                "type": "start",
+                "context_docs": len(docs),
+                "document_sources": prepared["document_sources"],
+                "model_used": self.llm_service.model_id
+            }
+            
+            llm_start = time.time()
+            first_token_time = None
+            if cache_hit:
+                await self.llm_service.graph_service.aappend_turn(chat_id, query, cache_key["answer"], snapshot=prepared["snapshot"])
+                first_token_time = time.time() - process_start
+                yield {"type": "token", "content": cache_key["answer"]}
+            else:
+                messages = self.llm_service.create_rag_prompt(prepared["context"], query)
+                
+                logger.info(f"[{query_id}] Gerando resposta (streaming) com LLM...")
+                tokens = []
+                async for token in self.llm_service.astream_response(messages, chat_id, query, snapshot=prepared["snapshot"]):
+                    if first_token_time is None:
+                        first_token_time = time.time() - process_start
+                        logger.info(f"[{query_id}] Primeiro token em {first_token_time:.4f}s")
+                    tokens.append(token)
+                    yield {"type": "token", "content": token}
+                self._store_answer(cache_key, query, "".join(tokens))
+            llm_time = time.time() - llm_start
+            
+            total_time = time.time() - process_start
+            logger.info(f"[{query_id}] 🏁 Processamento (streaming) completo em {total_time:.4f}s")
+            
+            yield {
+                "type": "end",
+                "processing_time": round(total_time, 4),
+                "metrics": {
+                    "llm_time": round(llm_time, 4),
+                    "time_to_first_token": round(first_token_time, 4) if first_token_time is not None else None,
+                    "context_docs": len(docs),
+                    "speculative_search_used": prepared["speculative_search_used"],
+                    "geqs_called": prepared["geqs_called"],
+                    "answer_cache_hit": cache_hit,
+                    "filters": prepared["filters"]
+                }
+            }
+        except Exception as e:
+            logger.error(f"[{query_id}] ❌ Erro ao processar query (streaming): {str(e)}", exc_info=True)
+            yield {"type": "error", "error": str(e)}
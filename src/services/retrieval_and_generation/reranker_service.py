@@ -0,0 +1,128 @@
+import math
+import time
+import logging
+import threading
+from collections import Counter
+
+from repository.lexical_index_repo import tokenize
+
+logger = logging.getLogger("reranker_service")
+
+class RerankerService:
+    """
+    Reordenação local (CPU) dos documentos recuperados antes de montar o contexto
+
+    Os candidatos (a busca traz mais documentos do que o contexto usa) recebem
+    um score que combina o BM25 da pergunta calculado sobre os próprios
+    candidatos com a posição original na busca. A reordenação tem um orçamento
+    de tempo por requisição: se for excedido, vale a ordem original.
+    """
+
+    # Parâmetros do BM25
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, lexical_weight=0.5, time_budget=0.05):
+        """
+        Inicializa o reranker
+
+        Args:
+            lexical_weight: Peso do score léxico (0 a 1); o restante é dado à posição original
+            time_budget: Tempo máximo da reordenação em segundos
+        """
+        self.lexical_weight = min(max(lexical_weight, 0.0), 1.0)
+        self.time_budget = time_budget
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {"reranks": 0, "budget_exceeded": 0, "top_changed": 0, "total_time": 0.0}
+
+    def _bm25_scores(self, query_terms, docs_terms):
+        doc_count = len(docs_terms)
+        avg_length = sum(len(terms) for terms in docs_terms) / doc_count or 1.0
+        document_frequency = Counter(term for terms in docs_terms for term in set(terms) if term in query_terms)
+
+        scores = []
+        for terms in docs_terms:
+            frequencies = Counter(terms)
+            length_norm = self.K1 * (1 - self.B + self.B * len(terms) / avg_length)
+            score = 0.0
+            for term in query_terms:
+                frequency = frequencies.get(term, 0)
+                if frequency:
+                    idf = math.log(1 + (doc_count - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+                    score += idf * frequency * (self.K1 + 1) / (frequency + length_norm)
+            scores.append(score)
+        return scores
+
+    def _over_budget(self, start, docs, k):
+        """
+        Registra o orçamento excedido e retorna a ordem original da busca
+        """
+        elapsed = time.time() - start
+        with self._metrics_lock:
+            self._metrics["budget_exceeded"] += 1
+            self._metrics["total_time"] += elapsed
+        logger.warning(f"Reordenação excedeu o orçamento ({elapsed:.4f}s), mantendo a ordem da busca")
+        return docs[:k]
+
+    def rerank(self, query, docs, k):
+        """
+        Reordena os documentos e retorna os k melhores
+
+        Args:
+            query: Texto da pergunta
+            docs: Documentos candidatos, na ordem da busca
+            k: Número de documentos a retornar
+
+        Returns:
+            list: Os k documentos mais relevantes (a ordem original, se o orçamento de tempo for excedido)
+        """
+        if len(docs) <= 1:
+            return docs[:k]
+
+        start = time.time()
+        query_terms = set(tokenize(query))
+
+        docs_terms = []
+        for doc in docs:
+            docs_terms.append(tokenize(doc.page_content))
+            if time.time() - start > self.time_budget:
+                return self._over_budget(start, docs, k)
+
+        lexical_scores = self._bm25_scores(query_terms, docs_terms) if query_terms else [0.0] * len(docs)
+        # O BM25 roda sem verificações intermediárias: o orçamento é conferido de novo ao final
+        if time.time() - start > self.time_budget:
+            return self._over_budget(start, docs, k)
+        max_score = max(lexical_scores) or 1.0
+
+        scored = []
+        for position, (doc, lexical_score) in enumerate(zip(docs, lexical_scores)):
+            position_score = 1.0 - position / len(docs)
+            score = self.lexical_weight * lexical_score / max_score + (1 - self.lexical_weight) * position_score
+            scored.append((score, -position, doc))
+        scored.sort(key=lambda item: (item[0], item[1]), reverse=True)
+        reranked = [doc for _, _, doc in scored[:k]]
+
+        elapsed = time.time() - start
+        with self._metrics_lock:
+            self._metrics["reranks"] += 1
+            self._metrics["total_time"] += elapsed
+            if reranked[0] is not docs[0]:
+                self._metrics["top_changed"] += 1
+        logger.debug(f"Reordenação de {len(docs)} candidatos em {elapsed:.4f}s")
+        return reranked
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do reranker
+
+        Returns:
+            dict: Reordenações, vezes em que o orçamento foi excedido e tempo médio
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        calls = metrics["reranks"] + metrics["budget_exceeded"]
+        total_time = metrics.pop("total_time")
+        metrics["avg_time"] = round(total_time / calls, 4) if calls else 0.0
+        return metrics
@@ -0,0 +1,111 @@
+import json
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+
+logger = logging.getLogger("retrieval_cache")
+
+class RetrievalCache:
+    """
+    Cache de resultados da busca vetorial (LRU + TTL)
+
+    A chave é (query normalizada, k, filtros, versão do índice) e o valor é a
+    lista de IDs dos chunks com seus scores. Como a versão do índice faz parte
+    da chave, resultados anteriores a uma reindexação nunca são reaproveitados.
+    """
+
+    def __init__(self, max_entries=2048, ttl=3600):
+        """
+        Inicializa o cache
+
+        Args:
+            max_entries: Número máximo de buscas em cache
+            ttl: Tempo de vida das entradas em segundos (0 desabilita a expiração)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # chave -> (timestamp, [(chunk_id, score), ...])
+        self._metrics = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    @staticmethod
+    def make_key(query, k, filters, index_version):
+        """
+        Gera a chave do cache
+
+        Args:
+            query: Texto da query
+            k: Número de documentos pedidos
+            filters: Filtros de metadados (dict ou None)
+            index_version: Versão do índice do ChromaDB
+
+        Returns:
+            tuple: Chave do cache
+        """
+        normalized = " ".join(unicodedata.normalize("NFC", query).lower().split())
+        filters_key = json.dumps(filters, sort_keys=True, ensure_ascii=False, default=str) if filters else ""
+        return (normalized, k, filters_key, index_version)
+
+    def get(self, query, k, filters, index_version):
+        """
+        Busca o resultado de uma busca em cache
+
+        Returns:
+            list | None: Lista de (chunk_id, score) ou None
+        """
+        key = self.make_key(query, k, filters, index_version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self.ttl and time.time() - entry[0] > self.ttl:
+                del self._entries[key]
+                self._metrics["expirations"] += 1
+                entry = None
+
+            if entry is None:
+                self._metrics["misses"] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._metrics["hits"] += 1
+            return list(entry[1])
+
+    def put(self, query, k, filters, index_version, results):
+        """
+        Armazena o resultado de uma busca
+
+        Args:
+            query: Texto da query
+            k: Número de documentos pedidos
+            filters: Filtros de metadados (dict ou None)
+            index_version: Versão do índice do ChromaDB usada na busca
+            results: Lista de (chunk_id, score)
+        """
+        key = self.make_key(query, k, filters, index_version)
+        with self._lock:
+            self._entries[key] = (time.time(), list(results))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._metrics["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do cache
+
+        Returns:
+            dict: Contadores, número de entradas e taxa de acerto
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+
+        total = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / total, 4) if total else 0.0
+        return metrics
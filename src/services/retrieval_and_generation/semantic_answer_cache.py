@@ -0,0 +1,207 @@
+import time
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+logger = logging.getLogger("semantic_answer_cache")
+
+class SemanticAnswerCache:
+    """
+    Cache semântico de respostas do RAG
+
+    Uma resposta é reaproveitada quando o embedding da query refinada está a
+    uma distância de cosseno de no máximo `max_distance` de uma query em cache
+    e os chunks recuperados são os mesmos. Os embeddings ficam em uma matriz
+    de tamanho fixo (`max_entries` linhas), consultada com um único produto
+    matricial; as entradas expiram por TTL e são removidas por LRU.
+    """
+
+    def __init__(self, max_entries=1000, max_distance=0.05, ttl=3600):
+        """
+        Inicializa o cache
+
+        Args:
+            max_entries: Número máximo de respostas em cache
+            max_distance: Distância de cosseno máxima entre as queries (0 = idênticas)
+            ttl: Tempo de vida das respostas em segundos (0 desabilita a expiração)
+        """
+        self.max_entries = max(1, max_entries)
+        self.max_distance = max_distance
+        self.ttl = ttl
+
+        self._lock = threading.Lock()
+        self._vectors = None  # matriz (max_entries x dimensão), criada no primeiro put
+        self._entries = {}  # linha -> entrada
+        self._lru = OrderedDict()  # linhas em ordem de uso (da menos à mais recente)
+        self._free = list(range(self.max_entries - 1, -1, -1))
+        self._index_version = None
+        self._metrics = {
+            "lookups": 0,
+            "hits": 0,
+            "misses": 0,
+            "chunk_mismatches": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "stale_puts": 0
+        }
+
+    @staticmethod
+    def _normalize(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def _remove(self, row):
+        self._entries.pop(row, None)
+        self._lru.pop(row, None)
+        self._vectors[row] = 0.0
+        self._free.append(row)
+
+    def _clear(self):
+        if self._vectors is not None:
+            self._vectors[:] = 0.0
+        self._entries.clear()
+        self._lru.clear()
+        self._free = list(range(self.max_entries - 1, -1, -1))
+
+    def _check_version(self, index_version):
+        """
+        Acompanha a versão persistida do índice (crescente, compartilhada entre os processos)
+
+        Returns:
+            bool: False se a versão é anterior à atual do cache (busca feita antes de uma reindexação)
+        """
+        if self._index_version is not None and index_version < self._index_version:
+            return False
+        # Reindexação do ChromaDB: todas as respostas em cache deixam de valer
+        if index_version != self._index_version:
+            if self._entries:
+                self._metrics["invalidations"] += 1
+                logger.info("Cache semântico de respostas invalidado (índice atualizado)")
+            self._clear()
+            self._index_version = index_version
+        return True
+
+    def _is_expired(self, entry, now):
+        return self.ttl and now - entry["created_at"] > self.ttl
+
+    def _nearest(self, vector):
+        """
+        Retorna as linhas dentro da distância máxima, da mais próxima para a mais distante
+        """
+        if self._vectors is None or not self._entries or self._vectors.shape[1] != vector.shape[0]:
+            return []
+
+        similarities = self._vectors @ vector
+        rows = np.flatnonzero(similarities >= 1.0 - self.max_distance)
+        return [int(row) for row in rows[np.argsort(-similarities[rows])] if int(row) in self._entries]
+
+    def get(self, embedding, chunk_ids, index_version):
+        """
+        Busca uma resposta em cache
+
+        Args:
+            embedding: Embedding da query refinada
+            chunk_ids: IDs dos chunks recuperados para a query
+            index_version: Versão atual do índice do ChromaDB
+
+        Returns:
+            dict | None: Entrada em cache ("query", "answer", ...) ou None
+        """
+        vector = self._normalize(embedding)
+        chunk_ids = frozenset(chunk_ids)
+        now = time.time()
+
+        with self._lock:
+            self._metrics["lookups"] += 1
+            if not self._check_version(index_version):
+                self._metrics["misses"] += 1
+                return None
+
+            near = False
+            for row in self._nearest(vector):
+                entry = self._entries[row]
+                if self._is_expired(entry, now):
+                    self._remove(row)
+                    self._metrics["expirations"] += 1
+                    continue
+
+                near = True
+                if entry["chunk_ids"] == chunk_ids:
+                    self._lru.move_to_end(row)
+                    self._metrics["hits"] += 1
+                    return dict(entry)
+
+            if near:
+                self._metrics["chunk_mismatches"] += 1
+            self._metrics["misses"] += 1
+            return None
+
+    def put(self, query, embedding, chunk_ids, answer, index_version):
+        """
+        Armazena uma resposta
+
+        Args:
+            query: Query refinada
+            embedding: Embedding da query refinada
+            chunk_ids: IDs dos chunks usados no contexto
+            answer: Resposta gerada pelo LLM
+            index_version: Versão do índice do ChromaDB usada na busca
+        """
+        vector = self._normalize(embedding)
+        chunk_ids = frozenset(chunk_ids)
+
+        with self._lock:
+            # Resposta gerada com chunks de antes de uma reindexação: não é armazenada
+            if not self._check_version(index_version):
+                self._metrics["stale_puts"] += 1
+                return
+
+            if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+                self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+                self._clear()
+
+            # Mesma query e mesmos chunks: substitui a entrada existente
+            for row in self._nearest(vector):
+                if self._entries[row]["chunk_ids"] == chunk_ids:
+                    self._remove(row)
+                    break
+
+            if not self._free:
+                self._remove(next(iter(self._lru)))
+                self._metrics["evictions"] += 1
+
+            row = self._free.pop()
+            self._vectors[row] = vector
+            self._entries[row] = {
+                "query": query,
+                "chunk_ids": chunk_ids,
+                "answer": answer,
+                "created_at": time.time()
+            }
+            self._lru[row] = None
+
+    def invalidate(self):
+        """
+        Descarta todas as respostas em cache
+        """
+        with self._lock:
+            self._clear()
+            self._metrics["invalidations"] += 1
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do cache
+
+        Returns:
+            dict: Contadores, número de entradas e taxa de acerto
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._entries)
+
+        metrics["hit_rate"] = round(metrics["hits"] / metrics["lookups"], 4) if metrics["lookups"] else 0.0
+        return metrics
@@ -1,52 +1,193 @@
+import asyncio
 import logging
+import threading
 import time
 import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
+from services.document_metadata import build_where
 
 logger = logging.getLogger("vector_search_service")
 
+def reciprocal_rank_fusion(rankings, rrf_k=60):
+    """
+    Funde rankings pela soma de 1 / (rrf_k + posição) de cada item
+
+    Args:
+        rankings: Lista de rankings (listas de IDs, do mais para o menos relevante)
+        rrf_k: Constante de suavização do RRF
+
+    Returns:
+        list: Lista de (ID, score fundido), do maior para o menor score
+    """
+    scores = {}
+    for ranking in rankings:
+        for position, item_id in enumerate(ranking, start=1):
+            scores[item_id] = scores.get(item_id, 0.0) + 1.0 / (rrf_k + position)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
 class VectorSearchService:
-    def __init__(self, chroma_repository, embedding_service):
+    def __init__(self, chroma_repository, embedding_service, retrieval_cache=None,
+                 lexical_index=None, candidates_multiplier=2, rrf_k=60, lexical_workers=8):
         """
         Inicializa o serviço de busca vetorial
         
         Args:
             chroma_repository: Repositório ChromaDB
             embedding_service: Serviço de embeddings
+            retrieval_cache: Cache de resultados de busca (RetrievalCache, opcional)
+            lexical_index: Índice léxico (LexicalIndex) que ativa a busca híbrida (opcional)
+            candidates_multiplier: Na busca híbrida, cada busca traz k * candidates_multiplier candidatos
+            rrf_k: Constante de suavização da fusão por RRF
+            lexical_workers: Threads para a busca léxica executada em paralelo à vetorial
         """
         self.chroma_repository = chroma_repository
         self.embedding_service = embedding_service
+        self.retrieval_cache = retrieval_cache
+        self.lexical_index = lexical_index
+        self.candidates_multiplier = max(1, candidates_multiplier)
+        self.rrf_k = rrf_k
+
+        self._executor = None
+        if lexical_index is not None:
+            self._executor = ThreadPoolExecutor(max_workers=lexical_workers, thread_name_prefix="lexical_search")
+
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "searches": 0,
+            "hybrid_searches": 0,
+            "lexical_only_docs": 0,
+            "vector_time": 0.0,
+            "lexical_time": 0.0,
+            "fusion_time": 0.0
+        }
     
-    def similarity_search(self, query, k=5):
+    def _cached_search(self, query, k, filters, index_version):
+        """
+        Busca os documentos de uma busca em cache (None se não houver ou se algum chunk sumiu)
+        """
+        if self.retrieval_cache is None:
+            return None
+
+        cached = self.retrieval_cache.get(query, k, filters, index_version)
+        if cached is None:
+            return None
+
+        docs = self.chroma_repository.get_documents([chunk_id for chunk_id, _ in cached])
+        if len(docs) != len(cached):
+            return None
+        return docs
+
+    def _vector_search(self, query, k, filters):
+        """
+        Busca vetorial (embedding da query + consulta HNSW)
+
+        Returns:
+            tuple: (lista de (documento, score), tempo em segundos)
+        """
+        vector_start = time.time()
+        vectorstore = self.chroma_repository.get_vectorstore()
+        # Filtros aplicados pelo próprio ChromaDB (cláusula where), antes do ranqueamento
+        results = vectorstore.similarity_search_with_score(query, k=k, filter=build_where(filters))
+        return results, time.time() - vector_start
+
+    def _lexical_search(self, query, k, filters):
+        """
+        Busca léxica (BM25) no índice invertido
+
+        Returns:
+            tuple: (lista de (chunk_id, score), tempo em segundos)
+        """
+        lexical_start = time.time()
+        results = self.lexical_index.search(query, k=k, filters=filters)
+        return results, time.time() - lexical_start
+
+    def _hybrid_search(self, query, k, filters, timings):
+        """
+        Executa as buscas vetorial e léxica em paralelo e funde os rankings por RRF
+
+        Returns:
+            list: Lista de (documento, score fundido)
+        """
+        candidates = k * self.candidates_multiplier
+
+        lexical_future = self._executor.submit(self._lexical_search, query, candidates, filters)
+        vector_results, timings["vector"] = self._vector_search(query, candidates, filters)
+        lexical_results, timings["lexical"] = lexical_future.result()
+
+        fusion_start = time.time()
+        fused = reciprocal_rank_fusion(
+            [[doc.id for doc, _ in vector_results], [chunk_id for chunk_id, _ in lexical_results]],
+            rrf_k=self.rrf_k
+        )[:k]
+
+        # Chunks encontrados apenas pela busca léxica são lidos do ChromaDB pelo ID
+        docs_by_id = {doc.id: doc for doc, _ in vector_results}
+        lexical_only = [chunk_id for chunk_id, _ in fused if chunk_id not in docs_by_id]
+        for doc in self.chroma_repository.get_documents(lexical_only):
+            docs_by_id[doc.id] = doc
+
+        results = [(docs_by_id[chunk_id], score) for chunk_id, score in fused if chunk_id in docs_by_id]
+        timings["fusion"] = time.time() - fusion_start
+        timings["lexical_only_docs"] = len(lexical_only)
+        return results
+
+    def _record(self, timings):
+        with self._metrics_lock:
+            self._metrics["searches"] += 1
+            self._metrics["vector_time"] += timings.get("vector", 0.0)
+            if "fusion" in timings:
+                self._metrics["hybrid_searches"] += 1
+                self._metrics["lexical_time"] += timings["lexical"]
+                self._metrics["fusion_time"] += timings["fusion"]
+                self._metrics["lexical_only_docs"] += timings["lexical_only_docs"]
+
+    def similarity_search(self, query, k=5, filters=None):
         """
-        Realiza busca por similaridade no ChromaDB
+        Realiza busca por similaridade no ChromaDB (híbrida, com o índice léxico, quando configurado)
         
         Args:
             query: Texto da query
             k: Número de documentos a retornar
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299", "doc_type": "agravo"}; opcional)
             
         Returns:
             list: Lista de documentos relevantes
         """
         request_id = str(uuid.uuid4())[:8]
-        logger.info(f"🔍 [{request_id}] Iniciando similarity search com query: '{query}' (k={k})")
+        logger.info(f"🔍 [{request_id}] Iniciando similarity search ({len(query)} caracteres, k={k}, filtros: {filters or 'nenhum'})")
         
         # Medição de tempo
         start_time = time.time()
         
-        # Acessa o vectorstore
-        vectorstore = self.chroma_repository.get_vectorstore()
-        
-        # Realizando a busca no vectorstore
+        # A versão é lida antes da busca: uma reindexação concorrente nunca fica em cache com a versão nova
+        index_version = self.chroma_repository.get_index_version()
         search_start = time.time()
-        docs = vectorstore.similarity_search(query, k=k)
+        docs = self._cached_search(query, k, filters, index_version)
+        cache_hit = docs is not None
+        timings = {}
+
+        if not cache_hit:
+            if self.lexical_index is not None:
+                results = self._hybrid_search(query, k, filters, timings)
+            else:
+                results, timings["vector"] = self._vector_search(query, k, filters)
+            docs = [doc for doc, _ in results]
+            self._record(timings)
+
+            if self.retrieval_cache is not None and all(doc.id for doc in docs):
+                self.retrieval_cache.put(query, k, filters, index_version, [(doc.id, score) for doc, score in results])
         search_time = time.time() - search_start
         
         # Calcular o tempo total
         total_time = time.time() - start_time
         
         # Log detalhado dos resultados
-        logger.info(f"[{request_id}] ✅ Busca concluída em {total_time:.4f}s (search: {search_time:.4f}s)")
+        logger.info(f"[{request_id}] ✅ Busca concluída em {total_time:.4f}s (search: {search_time:.4f}s, cache: {'hit' if cache_hit else 'miss'})")
+        if timings:
+            logger.info(f"[{request_id}] Tempo por etapa: " + ", ".join(
+                f"{leg}: {value:.4f}s" for leg, value in timings.items() if leg != "lexical_only_docs"
+            ))
         logger.info(f"[{request_id}] Encontrados {len(docs)} documentos relevantes")
         
         # Processar metadados e detalhar documentos encontrados
@@ -69,11 +210,61 @@ class VectorSearchService:
                 # Extrair apenas o nome do arquivo se for um caminho completo
                 source = os.path.basename(source)
                 
-            # Log de debug com detalhes do documento
-            logger.debug(f"[{request_id}] Documento #{i+1}:")
-            logger.debug(f"   - Fonte: {source}")
-            logger.debug(f"   - Conteúdo ({len(doc.page_content)} caracteres): {doc.page_content[:150]}...")
-            if doc.metadata:
-                logger.debug(f"   - Metadata completa: {doc.metadata}")
+            # Log de debug resumido (sem o conteúdo e os metadados completos, que pesam em toda requisição)
+            logger.debug(f"[{request_id}] Documento #{i+1}: {source} ({len(doc.page_content)} caracteres)")
     
-        return docs 
\ No newline at end of file
+        return docs
+
+    def embed_query(self, query):
+        """
+        Gera o embedding da query (com o cache de embeddings, a query recém-buscada não é recalculada)
+        
+        Args:
+            query: Texto da query
+            
+        Returns:
+            list: Vetor de embedding
+        """
+        return self.embedding_service.get_embeddings().embed_query(query)
+    
+    async def asimilarity_search(self, query, k=5, filters=None):
+        """
+        Versão assíncrona de similarity_search: o embedding da query e a consulta
+        ao ChromaDB são bloqueantes e rodam no pool de threads do event loop
+        
+        Args:
+            query: Texto da query
+            k: Número de documentos a retornar
+            filters: Filtros de metadados (ex.: {"case_id": "RE1463299", "doc_type": "agravo"}; opcional)
+            
+        Returns:
+            list: Lista de documentos relevantes
+        """
+        return await asyncio.to_thread(self.similarity_search, query, k, filters)
+
+    def get_metrics(self):
+        """
+        Retorna as métricas da busca: tempo médio de cada etapa (vetorial, léxica e fusão),
+        cache de resultados e índice léxico
+
+        Returns:
+            dict: Métricas da busca
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+
+        searches = metrics["searches"]
+        hybrid_searches = metrics["hybrid_searches"]
+        metrics["hybrid"] = self.lexical_index is not None
+        vector_time = metrics.pop("vector_time")
+        lexical_time = metrics.pop("lexical_time")
+        fusion_time = metrics.pop("fusion_time")
+        metrics["avg_vector_time"] = round(vector_time / searches, 4) if searches else 0.0
+        metrics["avg_lexical_time"] = round(lexical_time / hybrid_searches, 4) if hybrid_searches else 0.0
+        metrics["avg_fusion_time"] = round(fusion_time / hybrid_searches, 4) if hybrid_searches else 0.0
+
+        if self.retrieval_cache is not None:
+            metrics["retrieval_cache"] = self.retrieval_cache.get_metrics()
+        if self.lexical_index is not None:
+            metrics["lexical_index"] = self.lexical_index.get_metrics()
+        return metrics
@@ -1,9 +1,11 @@
 import os
 import logging
+import tempfile
+from services.indexing.document_sources import DocumentSource
 
 logger = logging.getLogger("s3_service")
 
-class S3Service:
+class S3Service(DocumentSource):
     def __init__(self, s3_client, bucket_name):
         """
         Inicializa o serviço S3
@@ -46,6 +48,89 @@ class S3Service:
             logger.error(f"❌ Erro ao listar arquivos do S3: {str(e)}")
             return []
     
+    def list_objects(self):
+        """
+        Lista todos os objetos no bucket S3 com ETag e tamanho
+        
+        Returns:
+            list: Lista de dicts com "key", "etag" e "size"
+        """
+        logger.info(f"Listando objetos do bucket S3: {self.bucket_name}")
+        try:
+            paginator = self.s3_client.get_paginator('list_objects_v2')
+            objects = []
+            
+            for page in paginator.paginate(Bucket=self.bucket_name):
+                for obj in page.get('Contents', []):
+                    objects.append({
+                        "key": obj['Key'],
+                        "etag": obj.get('ETag', '').strip('"'),
+                        "size": obj.get('Size', 0)
+                    })
+
+            logger.info(f"✅ Listados {len(objects)} objetos do S3 bucket: {self.bucket_name}")
+            return objects
+        except Exception as e:
+            logger.error(f"❌ Erro ao listar objetos do S3: {str(e)}")
+            raise
+    
+    def get_bytes(self, object_key):
+        """
+        Lê o conteúdo completo de um objeto do S3 em memória
+        
+        Args:
+            object_key: Chave do objeto no S3
+        
+        Returns:
+            bytes: Conteúdo do objeto
+        """
+        logger.info(f"Lendo objeto {object_key} do bucket {self.bucket_name}")
+        try:
+            response = self.s3_client.get_object(Bucket=self.bucket_name, Key=object_key)
+            content = response['Body'].read()
+            logger.info(f"✅ Objeto {object_key} lido com sucesso: {len(content)/1024:.2f} KB")
+            return content
+        except Exception as e:
+            logger.error(f"❌ Erro ao ler objeto {object_key}: {str(e)}")
+            raise
+    
+    def open_stream(self, object_key, max_memory_size=32 * 1024 * 1024):
+        """
+        Abre um objeto do S3 como um buffer posicionável, mantido em memória
+        e transferido para disco apenas acima de `max_memory_size`
+        
+        Args:
+            object_key: Chave do objeto no S3
+            max_memory_size: Tamanho máximo (bytes) mantido em memória
+        
+        Returns:
+            tempfile.SpooledTemporaryFile: Buffer posicionado no início (o chamador deve fechá-lo)
+        """
+        logger.info(f"Abrindo stream do objeto {object_key} do bucket {self.bucket_name}")
+        buffer = tempfile.SpooledTemporaryFile(max_size=max_memory_size)
+        try:
+            self.s3_client.download_fileobj(self.bucket_name, object_key, buffer)
+            size = buffer.tell()
+            buffer.seek(0)
+            logger.info(f"✅ Objeto {object_key} carregado em buffer: {size/1024:.2f} KB")
+            return buffer
+        except Exception as e:
+            buffer.close()
+            logger.error(f"❌ Erro ao abrir stream do objeto {object_key}: {str(e)}")
+            raise
+    
+    def get_uri(self, object_key):
+        """
+        Retorna a URI S3 de um objeto
+        """
+        return f"s3://{self.bucket_name}/{object_key}"
+    
+    def describe(self):
+        """
+        Retorna uma descrição curta da origem (para logs e resultados)
+        """
+        return f"s3://{self.bucket_name}"
+    
     def download_file(self, object_key, local_path):
         """
         Baixa um arquivo do S3 para o caminho local
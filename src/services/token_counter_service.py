@@ -0,0 +1,128 @@
+import re
+import logging
+import threading
+from collections import OrderedDict
+
+logger = logging.getLogger("token_counter")
+
+# Palavras, números e sinais de pontuação isolados
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+class TokenCounterService:
+    """
+    Contagem de tokens das mensagens do histórico, usada por trim_messages
+
+    A contagem de cada mensagem é calculada uma única vez (cache LRU por ID da
+    mensagem), então cada turno só processa as mensagens novas. Para os modelos
+    Nova, que não têm tokenizador público, usa uma aproximação local; para os
+    demais modelos, delega ao contador do próprio LLM.
+    """
+
+    # Tokens de formatação (papel/delimitadores) somados a cada mensagem
+    MESSAGE_OVERHEAD = 4
+    # Palavras longas costumam ser divididas em vários sub-tokens
+    CHARS_PER_SUBTOKEN = 6
+
+    def __init__(self, model_id, llm=None, max_entries=10000):
+        """
+        Inicializa o contador de tokens
+
+        Args:
+            model_id: ID do modelo LLM
+            llm: LLM usado como contador exato para modelos que não são Nova
+            max_entries: Número máximo de contagens mantidas em cache
+        """
+        self.model_id = model_id
+        self.llm = llm
+        self.max_entries = max_entries
+        self.approximate = "nova" in model_id or llm is None
+
+        self._lock = threading.Lock()
+        self._counts = OrderedDict()  # ID da mensagem -> tokens
+        self._metrics = {"hits": 0, "misses": 0}
+        logger.debug(f"Contador de tokens {'aproximado' if self.approximate else 'do modelo'} para {model_id}")
+
+    @classmethod
+    def approximate_text_tokens(cls, text):
+        """
+        Estima o número de tokens de um texto (tende a superestimar, o que é seguro para o corte)
+
+        Args:
+            text: Texto
+
+        Returns:
+            int: Número aproximado de tokens
+        """
+        return sum(1 + len(piece) // cls.CHARS_PER_SUBTOKEN for piece in TOKEN_PATTERN.findall(text))
+
+    @staticmethod
+    def _message_text(message):
+        if isinstance(message.content, str):
+            return message.content
+        return " ".join(
+            part.get("text", "") if isinstance(part, dict) else str(part) for part in message.content
+        )
+
+    def _count_message(self, message):
+        # Respostas do modelo já trazem a contagem exata de tokens gerados
+        usage = getattr(message, "usage_metadata", None)
+        if usage and usage.get("output_tokens"):
+            return usage["output_tokens"] + self.MESSAGE_OVERHEAD
+
+        if self.approximate:
+            return self.approximate_text_tokens(self._message_text(message)) + self.MESSAGE_OVERHEAD
+        return self.llm.get_num_tokens_from_messages([message])
+
+    def count_message(self, message):
+        """
+        Retorna o número de tokens de uma mensagem, usando o cache quando possível
+
+        Args:
+            message: Mensagem (BaseMessage)
+
+        Returns:
+            int: Número de tokens
+        """
+        key = message.id
+        if key is None:
+            return self._count_message(message)
+
+        with self._lock:
+            count = self._counts.get(key)
+            if count is not None:
+                self._counts.move_to_end(key)
+                self._metrics["hits"] += 1
+                return count
+
+        count = self._count_message(message)
+        with self._lock:
+            self._metrics["misses"] += 1
+            self._counts[key] = count
+            while len(self._counts) > self.max_entries:
+                self._counts.popitem(last=False)
+        return count
+
+    def count_messages(self, messages):
+        """
+        Contador de tokens de uma lista de mensagens (formato esperado por trim_messages)
+
+        Args:
+            messages: Lista de mensagens
+
+        Returns:
+            int: Número total de tokens
+        """
+        return sum(self.count_message(message) for message in messages)
+
+    def get_metrics(self):
+        """
+        Retorna as métricas do cache de contagens
+        """
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["entries"] = len(self._counts)
+
+        total = metrics["hits"] + metrics["misses"]
+        metrics["hit_rate"] = round(metrics["hits"] / total, 4) if total else 0.0
+        metrics["approximate"] = self.approximate
+        return metrics
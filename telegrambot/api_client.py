@@ -0,0 +1,146 @@
+import os
+import json
+import random
+import asyncio
+import logging
+import httpx
+
+logger = logging.getLogger("api_client")
+
+# Falhas em que a requisição não chegou a ser processada pela API e pode ser repetida com segurança.
+# Timeouts de leitura não entram: a API pode já ter respondido e gravado o turno no histórico do chat.
+RETRYABLE_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+RETRYABLE_STATUS = {502, 503}
+
+class ChatbotAPIClient:
+    """
+    Cliente assíncrono da API do chatbot
+
+    Usa um único httpx.AsyncClient com conexões keep-alive reaproveitadas,
+    limita o número de requisições simultâneas e repete, com backoff
+    exponencial, as requisições que falharam antes de chegar à API.
+    """
+
+    def __init__(self, base_url, connect_timeout=5.0, read_timeout=120.0, max_concurrency=32,
+                 max_retries=3, backoff_base=0.5):
+        """
+        Inicializa o cliente (as conexões são abertas em start)
+
+        Args:
+            base_url: URL base da API (ex.: http://host.docker.internal:80)
+            connect_timeout: Tempo máximo para abrir a conexão, em segundos
+            read_timeout: Tempo máximo de espera pela resposta, em segundos
+            max_concurrency: Número máximo de requisições simultâneas à API
+            max_retries: Número máximo de novas tentativas em falhas de conexão
+            backoff_base: Espera inicial entre tentativas, em segundos (dobra a cada tentativa)
+        """
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+
+        self._client = None
+        self._slots = asyncio.Semaphore(max_concurrency)
+
+    @classmethod
+    def from_env(cls):
+        """
+        Cria o cliente a partir das variáveis de ambiente do bot
+        """
+        return cls(
+            base_url=os.getenv("API_URL", "http://host.docker.internal:80"),
+            connect_timeout=float(os.getenv("API_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("API_READ_TIMEOUT", "120")),
+            max_concurrency=int(os.getenv("API_MAX_CONCURRENCY", "32")),
+            max_retries=int(os.getenv("API_MAX_RETRIES", "3")),
+            backoff_base=float(os.getenv("API_BACKOFF_BASE", "0.5"))
+        )
+
+    async def start(self):
+        """
+        Abre o pool de conexões
+        """
+        limits = httpx.Limits(max_connections=self.max_concurrency, max_keepalive_connections=self.max_concurrency)
+        self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=limits)
+        logger.info(f"Cliente da API iniciado: {self.base_url} (até {self.max_concurrency} requisições simultâneas)")
+
+    async def close(self):
+        """
+        Fecha o pool de conexões
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _backoff(self, attempt):
+        delay = self.backoff_base * (2 ** attempt)
+        await asyncio.sleep(delay + random.uniform(0, delay / 2))
+
+    async def query(self, mensagem, chat_id):
+        """
+        Envia uma pergunta ao endpoint /query
+
+        Args:
+            mensagem: Texto da pergunta
+            chat_id: ID do chat no Telegram
+
+        Returns:
+            dict: Resposta JSON da API
+
+        Raises:
+            httpx.HTTPError: Se a API não responder com sucesso após as tentativas
+        """
+        payload = {"query": mensagem, "chat_id": chat_id}
+
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await self._client.post("/query", json=payload)
+                    if response.status_code in RETRYABLE_STATUS and attempt < self.max_retries:
+                        logger.warning(f"API indisponível ({response.status_code}), nova tentativa {attempt + 1}/{self.max_retries}")
+                        await self._backoff(attempt)
+                        continue
+                    response.raise_for_status()
+                    return response.json()
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    logger.warning(f"Falha de conexão com a API ({e!r}), nova tentativa {attempt + 1}/{self.max_retries}")
+                    await self._backoff(attempt)
+
+    async def stream_query(self, mensagem, chat_id):
+        """
+        Envia uma pergunta ao endpoint /query/stream e repassa os eventos à medida que chegam
+
+        Só há novas tentativas antes do início da resposta. Use com
+        contextlib.aclosing para liberar a conexão se o consumo for interrompido.
+
+        Args:
+            mensagem: Texto da pergunta
+            chat_id: ID do chat no Telegram
+
+        Yields:
+            dict: Eventos NDJSON da API ({"type": "start" | "token" | "end" | "error", ...})
+
+        Raises:
+            httpx.HTTPError: Se a API não responder com sucesso após as tentativas
+        """
+        payload = {"query": mensagem, "chat_id": chat_id}
+
+        async with self._slots:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._client.stream("POST", "/query/stream", json=payload) as response:
+                        if response.status_code not in RETRYABLE_STATUS or attempt >= self.max_retries:
+                            response.raise_for_status()
+                            async for line in response.aiter_lines():
+                                if line.strip():
+                                    yield json.loads(line)
+                            return
+                        logger.warning(f"API indisponível ({response.status_code}), nova tentativa {attempt + 1}/{self.max_retries}")
+                except RETRYABLE_ERRORS as e:
+                    if attempt >= self.max_retries:
+                        raise
+                    logger.warning(f"Falha de conexão com a API ({e!r}), nova tentativa {attempt + 1}/{self.max_retries}")
+                await self._backoff(attempt)
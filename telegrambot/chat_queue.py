@@ -0,0 +1,119 @@
+import asyncio
+import logging
+
+logger = logging.getLogger("chat_queue")
+
+class _ChatState:
+    def __init__(self):
+        self.pending = []  # (texto, update) ainda não enviados à API
+        self.last_message_at = 0.0
+        self.wakeup = asyncio.Event()
+        self.worker = None
+
+
+class ChatQueue:
+    """
+    Fila de mensagens por chat do Telegram
+
+    Cada chat tem no máximo uma requisição à API por vez (o histórico do chat
+    nunca é atualizado por duas requisições concorrentes). Mensagens enviadas
+    em sequência, dentro da janela de agrupamento, viram uma única pergunta.
+    Mensagens que chegam enquanto a pergunta anterior ainda está sendo
+    respondida esperam a resposta e seguem juntas na próxima requisição: uma
+    requisição já enviada à API nunca é cancelada nem reenviada, pois a API
+    grava o turno no histórico mesmo que o bot desista da resposta.
+    """
+
+    def __init__(self, handler, coalesce_window=1.0, max_wait=5.0):
+        """
+        Inicializa a fila
+
+        Args:
+            handler: Corrotina handler(chat_id, texto, update) que processa uma pergunta
+            coalesce_window: Tempo (s) de espera por novas mensagens antes de enviar a pergunta
+            max_wait: Espera máxima (s) desde a primeira mensagem do grupo, mesmo com mensagens chegando
+        """
+        self.handler = handler
+        self.coalesce_window = coalesce_window
+        self.max_wait = max_wait
+
+        self._chats = {}
+        self._metrics = {"messages": 0, "requests": 0, "coalesced_messages": 0}
+
+    def submit(self, chat_id, texto, update):
+        """
+        Enfileira uma mensagem do chat
+
+        Args:
+            chat_id: ID do chat
+            texto: Texto da mensagem
+            update: Update do Telegram (a resposta é enviada à última mensagem do grupo)
+        """
+        state = self._chats.get(chat_id)
+        if state is None:
+            state = self._chats[chat_id] = _ChatState()
+
+        state.pending.append((texto, update))
+        state.last_message_at = asyncio.get_running_loop().time()
+        state.wakeup.set()
+        self._metrics["messages"] += 1
+
+        if state.worker is None:
+            state.worker = asyncio.create_task(self._run(chat_id, state))
+
+    async def _wait_for_burst(self, state):
+        """
+        Espera até que o chat fique `coalesce_window` segundos sem novas mensagens (ou até `max_wait`)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+
+        while True:
+            state.wakeup.clear()
+            remaining = min(state.last_message_at + self.coalesce_window, deadline) - loop.time()
+            if remaining <= 0:
+                return
+            try:
+                await asyncio.wait_for(state.wakeup.wait(), remaining)
+            except asyncio.TimeoutError:
+                return
+
+    async def _run(self, chat_id, state):
+        try:
+            while state.pending:
+                await self._wait_for_burst(state)
+
+                batch, state.pending = state.pending, []
+                texto = "\n".join(texto for texto, _ in batch)
+                self._metrics["requests"] += 1
+                self._metrics["coalesced_messages"] += len(batch) - 1
+                if len(batch) > 1:
+                    logger.info(f"{len(batch)} mensagens do chat {chat_id} agrupadas em uma pergunta")
+
+                try:
+                    await self.handler(chat_id, texto, batch[-1][1])
+                except Exception as e:
+                    logger.error(f"❌ Erro ao processar mensagens do chat {chat_id}: {e!r}")
+        finally:
+            if self._chats.get(chat_id) is state:
+                del self._chats[chat_id]
+
+    async def close(self):
+        """
+        Cancela o processamento em andamento (encerramento do bot) e descarta as mensagens pendentes
+        """
+        workers = [state.worker for state in self._chats.values() if state.worker is not None]
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def get_metrics(self):
+        """
+        Retorna os contadores da fila
+
+        Returns:
+            dict: Mensagens recebidas, requisições feitas e mensagens agrupadas
+        """
+        metrics = dict(self._metrics)
+        metrics["active_chats"] = len(self._chats)
+        return metrics
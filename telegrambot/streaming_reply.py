@@ -0,0 +1,133 @@
+import asyncio
+import logging
+from telegram.constants import MessageLimit
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger("streaming_reply")
+
+def split_text(text, max_length=MessageLimit.MAX_TEXT_LENGTH):
+    """
+    Separa do início do texto uma parte que cabe em uma mensagem do Telegram
+
+    Corta, de preferência, na última quebra de linha (ou espaço) da segunda
+    metade do limite, para não partir palavras.
+
+    Args:
+        text: Texto a dividir
+        max_length: Tamanho máximo de uma mensagem
+
+    Returns:
+        tuple: (parte que cabe na mensagem, restante do texto)
+    """
+    if len(text) <= max_length:
+        return text, ""
+
+    cut = max_length
+    for separator in ("\n", " "):
+        position = text.rfind(separator, max_length // 2, max_length)
+        if position != -1:
+            cut = position
+            break
+    return text[:cut].rstrip(), text[cut:].lstrip()
+
+
+class StreamingReply:
+    """
+    Resposta do bot entregue aos poucos, à medida que o texto é gerado
+
+    O texto recebido substitui o aviso já enviado e é atualizado por edições
+    da mensagem, no máximo uma a cada `edit_interval` segundos (o Telegram
+    limita a frequência de edições por chat). Quando o texto passa do tamanho
+    máximo de uma mensagem, a mensagem atual é finalizada e o restante
+    continua em uma nova.
+    """
+
+    def __init__(self, placeholder, send, edit_interval=1.0, max_length=MessageLimit.MAX_TEXT_LENGTH):
+        """
+        Inicializa a resposta
+
+        Args:
+            placeholder: Mensagem de aviso já enviada, editada com o início da resposta
+            send: Corrotina send(texto) que envia uma nova mensagem no chat e a retorna
+            edit_interval: Intervalo mínimo entre edições, em segundos
+            max_length: Tamanho máximo de uma mensagem
+        """
+        self.send = send
+        self.edit_interval = edit_interval
+        self.max_length = max_length
+
+        self.messages = [placeholder]
+        self._current = placeholder
+        self._shown = placeholder.text or ""
+        self._text = ""
+        self._last_edit = 0.0
+        self._retry_at = 0.0
+
+    async def append(self, content):
+        """
+        Acrescenta um trecho à resposta, editando a mensagem se o intervalo mínimo já passou
+
+        Args:
+            content: Trecho de texto gerado
+        """
+        self._text += content
+
+        while len(self._text) > self.max_length:
+            part, self._text = split_text(self._text, self.max_length)
+            await self._flush(part, final=True)
+            # O restante continua em uma nova mensagem
+            self._current = None
+            self._shown = ""
+
+        now = asyncio.get_running_loop().time()
+        if now - self._last_edit >= self.edit_interval and now >= self._retry_at:
+            await self._flush(self._text)
+
+    async def finish(self, fallback=None):
+        """
+        Exibe o texto completo da resposta (ignorando o intervalo mínimo)
+
+        Args:
+            fallback: Texto exibido se a resposta estiver vazia
+        """
+        text = self._text if self._text.strip() else fallback
+        if text:
+            await self._flush(text, final=True)
+
+    async def _flush(self, text, final=False):
+        if not text.strip() or text == self._shown:
+            return
+
+        while True:
+            try:
+                if self._current is None:
+                    self._current = await self.send(text)
+                    self.messages.append(self._current)
+                else:
+                    await self._current.edit_text(text)
+                self._shown = text
+                self._last_edit = asyncio.get_running_loop().time()
+                return
+            except RetryAfter as e:
+                retry_after = float(e.retry_after)
+                # Edições intermediárias podem ser puladas; o texto final não
+                if not final:
+                    logger.warning(f"Limite de edições do Telegram atingido, próxima edição em {retry_after}s")
+                    self._retry_at = asyncio.get_running_loop().time() + retry_after
+                    return
+                await asyncio.sleep(retry_after)
+            except BadRequest as e:
+                if "not modified" in str(e).lower():
+                    self._shown = text
+                    return
+                raise
+
+    async def delete(self):
+        """
+        Remove as mensagens já enviadas (processamento cancelado no encerramento do bot)
+        """
+        for message in self.messages:
+            try:
+                await message.delete()
+            except Exception as e:
+                logger.warning(f"Não foi possível remover a mensagem: {e!r}")
@@ -1,5 +1,5 @@
 import os
-import requests
+import httpx
 import telegram
 from telegram import Update
 from telegram.constants import ChatAction
@@ -12,7 +12,31 @@ from telegram.ext import (
     filters,
 )
 import asyncio
+from contextlib import aclosing
+from api_client import ChatbotAPIClient
+from chat_queue import ChatQueue
+from streaming_reply import StreamingReply
 BOT_TOKEN = os.getenv("BOT_TOKEN")
+# Número de updates do Telegram tratados ao mesmo tempo (conversas diferentes não esperam umas pelas outras)
+BOT_CONCURRENT_UPDATES = int(os.getenv("BOT_CONCURRENT_UPDATES", "64"))
+# Mensagens do mesmo chat enviadas dentro da janela (segundos) viram uma única pergunta
+BOT_COALESCE_WINDOW = float(os.getenv("BOT_COALESCE_WINDOW", "1.0"))
+BOT_COALESCE_MAX_WAIT = float(os.getenv("BOT_COALESCE_MAX_WAIT", "5.0"))
+# Resposta exibida à medida que é gerada (endpoint /query/stream), editando a mensagem no máximo a cada intervalo (segundos)
+BOT_STREAMING = os.getenv("BOT_STREAMING", "true").lower() == "true"
+BOT_STREAM_EDIT_INTERVAL = float(os.getenv("BOT_STREAM_EDIT_INTERVAL", "1.0"))
+# "polling" (o bot consulta o Telegram) ou "webhook" (o Telegram envia os updates ao bot, via nginx)
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+# URL da Bot API (alterada apenas para testes locais com uma API falsa)
+BOT_API_BASE_URL = os.getenv("BOT_API_BASE_URL", "")
+# Modo webhook: URL pública registrada no Telegram e endereço em que o bot recebe os updates
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+# Conexões simultâneas que o Telegram pode abrir para entregar updates
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
 
 # Configuração de logging
 logging.basicConfig(
@@ -26,22 +50,77 @@ logger = logging.getLogger("init_chroma")
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.message.reply_text("Olá! Sou o chatbot do grupo 3. Tenho acesso a uma série de documentos jurídicos e posso lhe responder quaisquer dúvidas acerca de seu conteúdo. Como posso lhe ajudar hoje?")
 
+MENSAGEM_ERRO_API = "Perdão! Houve um erro ao processar a sua solicitação. A API que me providencia respostas pode estar temporariamente fora do ar. Por favor, tente novamente em alguns intantes."
+MENSAGEM_RESPOSTA_INTERROMPIDA = "\n\n⚠️ A resposta foi interrompida por um erro. Por favor, tente novamente."
+
 #fazer um request para o flask
-async def fazer_request_flask(mensagem, chat_id):
-    url = "http://host.docker.internal:80/query"  # URL do endpoint Flask
-    payload = {"query": mensagem, "chat_id": chat_id}  # Payload com a mensagem
-    headers = {"Content-Type": "application/json"}
-    
+async def fazer_request_flask(api_client, mensagem, chat_id):
     try:
-        response = requests.post(url, json=payload, headers=headers)
-        
-        if response.status_code == 200:
-            return response.json()  # Retorna a resposta JSON do Flask
-        else:
-            return {"error": "Erro ao processar a solicitação."}
+        return await api_client.query(mensagem, chat_id)
+    except httpx.HTTPStatusError as e:
+        logger.error(f'API respondeu com erro: {e.response.status_code}')
+        return {"error": "Erro ao processar a solicitação."}
     except Exception as e:
-        logger.error(f'Não foi possível realizar requisição à API: {e}')
-        return {"response": "Perdão! Houve um erro ao processar a sua solicitação. A API que me providencia respostas pode estar temporariamente fora do ar. Por favor, tente novamente em alguns intantes."}
+        logger.error(f'Não foi possível realizar requisição à API: {e!r}')
+        return {"response": MENSAGEM_ERRO_API}
+
+# Consome a resposta em streaming da API, atualizando a mensagem a cada trecho gerado
+async def transmitir_resposta(api_client, mensagem, chat_id, resposta):
+    recebeu_texto = False
+    try:
+        async with aclosing(api_client.stream_query(mensagem, chat_id)) as eventos:
+            async for evento in eventos:
+                if evento.get("type") == "token":
+                    recebeu_texto = True
+                    await resposta.append(evento.get("content", ""))
+                elif evento.get("type") == "error":
+                    raise ValueError(evento.get("error"))
+    except httpx.HTTPStatusError as e:
+        logger.error(f'API respondeu com erro: {e.response.status_code}')
+        await resposta.finish(fallback="Erro ao processar a solicitação.")
+        return
+    except (httpx.HTTPError, ValueError) as e:
+        logger.error(f'Não foi possível obter a resposta da API: {e!r}')
+        if recebeu_texto:
+            await resposta.append(MENSAGEM_RESPOSTA_INTERROMPIDA)
+        await resposta.finish(fallback=MENSAGEM_ERRO_API)
+        return
+
+    await resposta.finish(fallback="Nenhuma resposta encontrada.")
+
+# Pergunta (uma ou mais mensagens agrupadas) de um chat, chamada pela fila do chat
+async def processar_pergunta(api_client, texto, update):
+    aviso = await update.message.reply_text("Só um momento enquanto busco informações...")
+    # O aviso é substituído pela resposta (dividida em várias mensagens se passar do limite do Telegram)
+    resposta = StreamingReply(aviso, update.message.reply_text, edit_interval=BOT_STREAM_EDIT_INTERVAL)
+
+    try:
+        if BOT_STREAMING:
+            await transmitir_resposta(api_client, texto, update.message.chat_id, resposta)
+        else:
+            #fazer um request para o flask
+            resultado = await fazer_request_flask(api_client, texto, update.message.chat_id)
+            await resposta.append(resultado.get("response", ""))
+            await resposta.finish(fallback="Nenhuma resposta encontrada.")
+    except asyncio.CancelledError:
+        # Bot encerrado durante a resposta: o aviso (e a resposta parcial) são removidos
+        await asyncio.shield(resposta.delete())
+        raise
+
+# Cliente HTTP e fila de mensagens compartilhados por todas as conversas (abertos e fechados junto com o bot)
+async def iniciar_cliente_api(app):
+    api_client = ChatbotAPIClient.from_env()
+    await api_client.start()
+    app.bot_data["api_client"] = api_client
+    app.bot_data["chat_queue"] = ChatQueue(
+        lambda chat_id, texto, update: processar_pergunta(api_client, texto, update),
+        coalesce_window=BOT_COALESCE_WINDOW,
+        max_wait=BOT_COALESCE_MAX_WAIT
+    )
+
+async def fechar_cliente_api(app):
+    await app.bot_data["chat_queue"].close()
+    await app.bot_data["api_client"].close()
 
 
 # Qualquer mensagem de texto
@@ -49,19 +128,42 @@ async def responder_texto(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await update.effective_chat.send_chat_action(ChatAction.TYPING)
     #await app.bot.send_chat_action(chat_id=update.message.chat_id, action=ChatAction.TYPING)
 
-    await update.message.reply_text("Só um momento enquanto busco informações...")
+    # A fila do chat agrupa mensagens em sequência e garante uma requisição por vez por chat
+    context.bot_data["chat_queue"].submit(update.message.chat_id, update.message.text, update)
 
-    #fazer um request para o flask
-    resposta = await fazer_request_flask(update.message.text, update.message.chat_id)
-    resposta_tratada = resposta.get("response", "Nenhuma resposta encontrada.")
+# Recebe os updates por webhook: o Telegram (ou o nginx, com várias réplicas do bot) envia cada update
+# por POST em WEBHOOK_PATH, e requisições sem o header X-Telegram-Bot-Api-Secret-Token correto são recusadas (403)
+def iniciar_webhook(app):
+    if not WEBHOOK_URL or not WEBHOOK_SECRET_TOKEN:
+        raise RuntimeError("WEBHOOK_URL e WEBHOOK_SECRET_TOKEN são obrigatórios no modo webhook")
 
-    await update.message.reply_text(resposta_tratada)
+    print(f"Iniciando webhook em {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+    app.run_webhook(
+        listen=WEBHOOK_LISTEN,
+        port=WEBHOOK_PORT,
+        url_path=WEBHOOK_PATH,
+        webhook_url=WEBHOOK_URL,
+        secret_token=WEBHOOK_SECRET_TOKEN,
+        max_connections=WEBHOOK_MAX_CONNECTIONS
+    )
 
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(BOT_TOKEN).build()
+    builder = (
+        ApplicationBuilder()
+        .token(BOT_TOKEN)
+        .concurrent_updates(BOT_CONCURRENT_UPDATES)
+        .post_init(iniciar_cliente_api)
+        .post_shutdown(fechar_cliente_api)
+    )
+    if BOT_API_BASE_URL:
+        builder = builder.base_url(BOT_API_BASE_URL)
+    app = builder.build()
 
     app.add_handler(CommandHandler("start", start))
     app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, responder_texto))
 
-    print("Iniciando polling...")
-    app.run_polling()
+    if BOT_MODE == "webhook":
+        iniciar_webhook(app)
+    else:
+        print("Iniciando polling...")
+        app.run_polling()
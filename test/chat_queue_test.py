@@ -0,0 +1,134 @@
+import os
+import sys
+import asyncio
+
+# Adiciona o diretório do bot ao PYTHONPATH (os módulos do bot são importados sem pacote)
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "telegrambot"))
+
+from chat_queue import ChatQueue
+
+class RegistroHandler:
+    """
+    Handler falso: registra as perguntas e, opcionalmente, segura a resposta até `liberar`
+    """
+
+    def __init__(self, bloquear=False):
+        self.perguntas = []
+        self.em_andamento = 0
+        self.max_em_andamento = 0
+        self.liberar = asyncio.Event()
+        if not bloquear:
+            self.liberar.set()
+
+    async def __call__(self, chat_id, texto, update):
+        self.em_andamento += 1
+        self.max_em_andamento = max(self.max_em_andamento, self.em_andamento)
+        self.perguntas.append((chat_id, texto, update))
+        await self.liberar.wait()
+        self.em_andamento -= 1
+
+
+async def esperar_fila(queue):
+    while queue.get_metrics()["active_chats"]:
+        await asyncio.sleep(0.01)
+
+
+def test_rajada_vira_uma_pergunta():
+    async def cenario():
+        handler = RegistroHandler()
+        queue = ChatQueue(handler, coalesce_window=0.05, max_wait=1.0)
+        for i in range(3):
+            queue.submit(1, f"parte {i}", f"update {i}")
+            await asyncio.sleep(0.01)
+        await esperar_fila(queue)
+        return handler, queue
+
+    handler, queue = asyncio.run(cenario())
+    # A resposta vai para a última mensagem do grupo
+    assert handler.perguntas == [(1, "parte 0\nparte 1\nparte 2", "update 2")]
+    assert queue.get_metrics()["coalesced_messages"] == 2
+
+
+def test_mensagens_durante_a_resposta_seguem_juntas_depois():
+    async def cenario():
+        handler = RegistroHandler(bloquear=True)
+        queue = ChatQueue(handler, coalesce_window=0.02, max_wait=1.0)
+        queue.submit(1, "primeira", "u1")
+        await asyncio.sleep(0.1)
+
+        # A pergunta anterior ainda está sendo respondida: nada é cancelado nem reenviado
+        queue.submit(1, "segunda", "u2")
+        queue.submit(1, "terceira", "u3")
+        await asyncio.sleep(0.1)
+        assert [texto for _, texto, _ in handler.perguntas] == ["primeira"]
+
+        handler.liberar.set()
+        await esperar_fila(queue)
+        return handler
+
+    handler = asyncio.run(cenario())
+    assert [texto for _, texto, _ in handler.perguntas] == ["primeira", "segunda\nterceira"]
+    assert handler.max_em_andamento == 1
+
+
+def test_chats_diferentes_em_paralelo():
+    async def cenario():
+        handler = RegistroHandler(bloquear=True)
+        queue = ChatQueue(handler, coalesce_window=0.02, max_wait=1.0)
+        queue.submit(1, "chat 1", "u1")
+        queue.submit(2, "chat 2", "u2")
+        await asyncio.sleep(0.1)
+        handler.liberar.set()
+        await esperar_fila(queue)
+        return handler
+
+    handler = asyncio.run(cenario())
+    assert sorted(chat_id for chat_id, _, _ in handler.perguntas) == [1, 2]
+    assert handler.max_em_andamento == 2
+
+
+def test_espera_maxima_com_mensagens_chegando():
+    async def cenario():
+        handler = RegistroHandler()
+        queue = ChatQueue(handler, coalesce_window=0.05, max_wait=0.15)
+        for i in range(10):
+            queue.submit(1, f"parte {i}", None)
+            await asyncio.sleep(0.03)
+        await esperar_fila(queue)
+        return handler
+
+    handler = asyncio.run(cenario())
+    # Mensagens chegando sem parar não adiam a pergunta além de max_wait
+    assert len(handler.perguntas) > 1
+    assert "\n".join(texto for _, texto, _ in handler.perguntas) == "\n".join(f"parte {i}" for i in range(10))
+
+
+def test_erro_no_handler_nao_trava_o_chat():
+    async def cenario():
+        perguntas = []
+
+        async def handler(chat_id, texto, update):
+            perguntas.append(texto)
+            if texto == "falha":
+                raise RuntimeError("erro da API")
+
+        queue = ChatQueue(handler, coalesce_window=0.01, max_wait=1.0)
+        queue.submit(1, "falha", None)
+        await esperar_fila(queue)
+        queue.submit(1, "depois", None)
+        await esperar_fila(queue)
+        return perguntas
+
+    assert asyncio.run(cenario()) == ["falha", "depois"]
+
+
+def test_close_cancela_o_processamento():
+    async def cenario():
+        handler = RegistroHandler(bloquear=True)
+        queue = ChatQueue(handler, coalesce_window=0.01, max_wait=1.0)
+        queue.submit(1, "pergunta", None)
+        await asyncio.sleep(0.05)
+        await queue.close()
+        return queue
+
+    assert asyncio.run(cenario()).get_metrics()["active_chats"] == 0
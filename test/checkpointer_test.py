@@ -0,0 +1,158 @@
+import os
+import sys
+import time
+
+import pytest
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+from langgraph.checkpoint.memory import MemorySaver
+
+from repository.checkpoint_repo import SqliteCheckpointSaver, BoundedMemorySaver, create_checkpointer
+from services.graph_service import GraphService
+
+class EcoLLM:
+    """
+    LLM falso: responde "resp:<pergunta>" sem chamar o Bedrock
+    """
+
+    model_id = "eco"
+
+    def invoke(self, messages):
+        return AIMessage(f"resp:{messages[-1].content}")
+
+    async def ainvoke(self, messages):
+        return self.invoke(messages)
+
+    def get_num_tokens_from_messages(self, messages):
+        return sum(len(str(message.content)) for message in messages)
+
+
+def config(thread_id="chat"):
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+
+def gravar_turnos(saver, turnos, thread_id="chat"):
+    """
+    Grava `turnos` checkpoints seguidos, o i-ésimo com i + 1 pares pergunta/resposta
+    """
+    anterior = None
+    for i in range(turnos):
+        checkpoint = empty_checkpoint() if anterior is None else create_checkpoint(anterior.checkpoint, None, i)
+        checkpoint["channel_values"] = {
+            "messages": [m for j in range(i + 1) for m in (HumanMessage(f"q{j}"), AIMessage(f"a{j}"))]
+        }
+        saver.put(config(thread_id), checkpoint, {"step": i}, {})
+        anterior = saver.get_tuple(config(thread_id))
+    return anterior
+
+
+@pytest.fixture
+def sqlite_saver(tmp_path):
+    return SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"), max_messages=4, keep_checkpoints=2)
+
+
+def test_sqlite_compacta_o_historico(sqlite_saver):
+    ultimo = gravar_turnos(sqlite_saver, 5)
+
+    messages = ultimo.checkpoint["channel_values"]["messages"]
+    assert [m.content for m in messages] == ["q3", "a3", "q4", "a4"]
+    assert sqlite_saver.get_metrics()["compactions"] > 0
+
+
+def test_sqlite_mantem_os_ultimos_checkpoints(sqlite_saver):
+    gravar_turnos(sqlite_saver, 5)
+
+    assert len(list(sqlite_saver.list(config()))) == 2
+
+
+def test_sqlite_put_if_latest(sqlite_saver):
+    ultimo = gravar_turnos(sqlite_saver, 2)
+    checkpoint = create_checkpoint(ultimo.checkpoint, None, 2)
+
+    # Outro checkpoint foi gravado depois do lido: a escrita é recusada
+    assert sqlite_saver.put_if_latest(config(), checkpoint, {}, {}, "id-antigo") is None
+    assert sqlite_saver.get_tuple(config()).checkpoint["id"] == ultimo.checkpoint["id"]
+
+    gravado = sqlite_saver.put_if_latest(config(), checkpoint, {}, {}, ultimo.checkpoint["id"])
+    assert gravado["configurable"]["checkpoint_id"] == checkpoint["id"]
+
+    # Chat sem histórico: o id esperado é None
+    novo = empty_checkpoint()
+    assert sqlite_saver.put_if_latest(config("outro"), novo, {}, {}, None) is not None
+
+
+def test_sqlite_remove_chats_sem_atividade(tmp_path, monkeypatch):
+    saver = SqliteCheckpointSaver(str(tmp_path / "checkpoints.db"), ttl=60)
+    gravar_turnos(saver, 1, thread_id="antigo")
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 120)
+    gravar_turnos(saver, 1, thread_id="recente")
+
+    assert saver.evict_idle() == 1
+    assert saver.get_tuple(config("antigo")) is None
+    assert saver.get_tuple(config("recente")) is not None
+    assert saver.get_metrics()["threads"] == 1
+
+
+def test_sqlite_compartilhado_entre_instancias(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    gravar_turnos(SqliteCheckpointSaver(path), 2)
+
+    # Outro worker abre o mesmo arquivo
+    assert SqliteCheckpointSaver(path).get_tuple(config()) is not None
+
+
+def test_memoria_remove_os_chats_menos_usados():
+    saver = BoundedMemorySaver(max_threads=2)
+    for thread_id in ("a", "b"):
+        gravar_turnos(saver, 1, thread_id=thread_id)
+    saver.get_tuple(config("a"))
+    gravar_turnos(saver, 1, thread_id="c")
+
+    assert saver.get_tuple(config("b")) is None
+    assert saver.get_tuple(config("a")) is not None
+    assert saver.get_metrics()["evicted_threads"] == 1
+
+
+def test_memoria_limite_de_bytes():
+    saver = BoundedMemorySaver(max_bytes=1)
+    gravar_turnos(saver, 1, thread_id="a")
+    gravar_turnos(saver, 1, thread_id="b")
+
+    # O chat recém-gravado é mantido mesmo acima do limite
+    assert saver.get_tuple(config("a")) is None
+    assert saver.get_tuple(config("b")) is not None
+
+
+def test_create_checkpointer(tmp_path):
+    assert isinstance(create_checkpointer("sqlite", path=str(tmp_path / "c.db")), SqliteCheckpointSaver)
+    assert isinstance(create_checkpointer("memory"), BoundedMemorySaver)
+
+
+@pytest.mark.parametrize("backend", ["sqlite", "bounded", "memory"])
+def test_turnos_concorrentes_nao_se_perdem(backend, tmp_path):
+    checkpointer = {
+        "sqlite": lambda: SqliteCheckpointSaver(str(tmp_path / "checkpoints.db")),
+        "bounded": BoundedMemorySaver,
+        "memory": MemorySaver
+    }[backend]()
+    graph = GraphService(EcoLLM(), checkpointer=checkpointer)
+    graph.invoke("Q0", "chat")
+
+    # Duas requisições leem o mesmo estado; a segunda termina primeiro
+    snapshot_q1 = graph.load_snapshot("chat")
+    graph.invoke("Q2", "chat", snapshot=graph.load_snapshot("chat"))
+    snapshot_q3 = graph.load_snapshot("chat")
+    graph.invoke("Q1", "chat", snapshot=snapshot_q1)
+    # Resposta do cache gravada com o estado lido antes do turno Q1
+    graph.append_turn("chat", "Q3", "cache", snapshot=snapshot_q3)
+
+    # O turno que perdeu a corrida é reaplicado sobre o estado mais recente
+    assert [m.content for m in graph.get_chat_history("chat")] == [
+        "Q0", "resp:Q0", "Q2", "resp:Q2", "Q1", "resp:Q1", "Q3", "cache"
+    ]
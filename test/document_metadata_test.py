@@ -0,0 +1,115 @@
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from langchain_core.documents import Document
+
+from services.document_metadata import (
+    boost_doc_type,
+    build_where,
+    derive_document_metadata,
+    detect_doc_type,
+    detect_filters,
+    normalize_filters,
+)
+from services.retrieval_and_generation.rag_service import RAGService
+
+class FakeVectorSearchService:
+    """
+    Busca falsa: devolve os `k` primeiros documentos da lista, registrando os filtros recebidos
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.buscas = []
+
+    def similarity_search(self, query, k=5, filters=None):
+        self.buscas.append((k, filters))
+        return self.docs[:k]
+
+
+def peca(chunk_id, doc_type):
+    return Document(id=chunk_id, page_content=chunk_id, metadata={"doc_type": doc_type})
+
+
+def test_metadados_derivados_da_chave():
+    assert derive_document_metadata("RE1463299/recurso-extraordinario/47-recurso.pdf") == {
+        "case_id": "RE1463299", "doc_type": "recurso-extraordinario"
+    }
+    assert derive_document_metadata("ARE_1467492/arquivo.pdf") == {"case_id": "ARE1467492"}
+    assert derive_document_metadata("outros/arquivo.pdf") == {}
+
+
+def test_normalize_filters():
+    assert normalize_filters({"case_id": "re 1463299", "doc_type": " Agravo ", "page_number": "3"}) == {
+        "case_id": "RE1463299", "doc_type": "agravo", "page_number": 3
+    }
+    with pytest.raises(ValueError):
+        normalize_filters({"autor": "x"})
+
+
+@pytest.mark.parametrize("pergunta", [
+    "Cabe agravo nesse caso?",
+    "O que diz o agravo sobre a repercussão geral?",
+    "Quais os requisitos do agravo interno?",
+])
+def test_mencao_ao_tipo_nao_vira_filtro(pergunta):
+    assert detect_filters(pergunta) == {}
+    assert detect_doc_type(pergunta) == "agravo"
+
+
+@pytest.mark.parametrize("pergunta, filtros", [
+    ("Resuma os documentos do tipo agravo", {"doc_type": "agravo"}),
+    ("O que foi decidido no agravo nº 123?", {"doc_type": "agravo"}),
+    ("Peças do tipo acórdão recorrido", {"doc_type": "acordao-recorrido"}),
+    ("Qual o fundamento do agravo do RE 1463299?", {"case_id": "RE1463299", "doc_type": "agravo"}),
+    ("Qual o tema do RE 1463299?", {"case_id": "RE1463299"}),
+    ("Compare o RE 1463299 com o ARE 1467492", {}),
+])
+def test_filtros_pedidos_explicitamente(pergunta, filtros):
+    assert detect_filters(pergunta) == filtros
+
+
+def test_build_where():
+    assert build_where({}) is None
+    assert build_where({"case_id": "RE1"}) == {"case_id": "RE1"}
+    assert build_where({"doc_type": "agravo", "case_id": "RE1"}) == {
+        "$and": [{"case_id": "RE1"}, {"doc_type": "agravo"}]
+    }
+
+
+def test_boost_prioriza_sem_descartar():
+    docs = [peca("a", "acordao"), peca("b", "acordao"), peca("c", "agravo"), peca("d", "acordao")]
+
+    assert [doc.id for doc in boost_doc_type(docs, "agravo", boost=1)] == ["a", "c", "b", "d"]
+    assert [doc.id for doc in boost_doc_type(docs, "agravo", boost=10)] == ["c", "a", "b", "d"]
+    assert boost_doc_type(docs, "embargos", boost=10) == docs
+
+
+def test_busca_prioriza_o_tipo_mencionado():
+    docs = [peca(f"acordao{i}", "acordao") for i in range(5)] + [peca("agravo", "agravo")]
+    search = FakeVectorSearchService(docs)
+    rag = RAGService(search, SimpleNamespace(llm=None), max_context_docs=3, auto_filters=True)
+
+    resultado = rag._search("q", "Cabe agravo nesse caso?", {}, False)
+
+    # Sem filtro: a busca traz mais candidatos e a peça do tipo mencionado entra no resultado
+    assert search.buscas == [(6, {})]
+    assert len(resultado) == 3
+    assert "agravo" in [doc.id for doc in resultado]
+    assert rag.get_metrics()["doc_type_boosts"] == 1
+
+
+def test_busca_com_filtro_de_tipo_nao_prioriza():
+    search = FakeVectorSearchService([peca("agravo", "agravo")])
+    rag = RAGService(search, SimpleNamespace(llm=None), max_context_docs=3, auto_filters=True)
+
+    rag._search("q", "Resuma os documentos do tipo agravo", {"doc_type": "agravo"}, True)
+
+    assert search.buscas == [(3, {"doc_type": "agravo"})]
+    assert rag.get_metrics()["doc_type_boosts"] == 0
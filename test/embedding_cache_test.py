@@ -0,0 +1,113 @@
+import os
+import sys
+import time
+import sqlite3
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from services.indexing.embedding_cache import EmbeddingCache, CachedEmbeddings
+
+class ContadorEmbeddings:
+    """
+    Embeddings falsos que contam as chamadas ao modelo
+    """
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def embed_query(self, text):
+        self.chamadas += 1
+        return [float(len(text)), 1.0]
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+
+def contar_linhas(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM query_embeddings").fetchone()[0]
+
+
+def test_chave_normaliza_caixa_e_espacos():
+    cache = EmbeddingCache("modelo")
+    cache.put("  Qual o  PRAZO? ", [1.0, 2.0])
+
+    assert cache.get("qual o prazo?") == [1.0, 2.0]
+    assert EmbeddingCache("outro-modelo").make_key("qual o prazo?") != cache.make_key("qual o prazo?")
+
+
+def test_lru_remove_a_entrada_menos_usada():
+    cache = EmbeddingCache("modelo", max_entries=2)
+    cache.put("a", [1.0])
+    cache.put("b", [2.0])
+    cache.get("a")
+    cache.put("c", [3.0])
+
+    assert cache.get("b") is None
+    assert cache.get("a") == [1.0]
+    assert cache.get("c") == [3.0]
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_limite_de_bytes():
+    # Cada vetor de 4 floats ocupa 32 bytes
+    cache = EmbeddingCache("modelo", max_bytes=64)
+    for i in range(3):
+        cache.put(f"query {i}", [float(i)] * 4)
+
+    metrics = cache.get_metrics()
+    assert metrics["entries"] == 2
+    assert metrics["bytes"] <= 64
+
+
+def test_ttl_expira_entradas(monkeypatch):
+    cache = EmbeddingCache("modelo", ttl=10)
+    cache.put("a", [1.0])
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 11)
+    assert cache.get("a") is None
+    assert cache.get_metrics()["expirations"] == 1
+
+
+def test_camada_persistente_compartilhada(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache("modelo", persist_path=path).put("a", [1.0, 2.0])
+
+    outro_processo = EmbeddingCache("modelo", persist_path=path)
+    assert outro_processo.get("a") == [1.0, 2.0]
+    assert outro_processo.get_metrics()["persistent_hits"] == 1
+
+
+def test_camada_persistente_limitada(tmp_path):
+    path = str(tmp_path / "embeddings.db")
+    cache = EmbeddingCache("modelo", persist_path=path, persist_max_entries=50)
+    for i in range(3 * EmbeddingCache.PRUNE_INTERVAL):
+        cache.put(f"query {i}", [float(i)])
+
+    # A limpeza roda a cada PRUNE_INTERVAL gravações
+    assert contar_linhas(path) <= 50 + EmbeddingCache.PRUNE_INTERVAL
+    assert cache.get_metrics()["persistent_pruned"] > 0
+
+
+def test_camada_persistente_remove_expiradas_ao_abrir(tmp_path, monkeypatch):
+    path = str(tmp_path / "embeddings.db")
+    EmbeddingCache("modelo", persist_path=path, ttl=10).put("a", [1.0])
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 11)
+    EmbeddingCache("modelo", persist_path=path, ttl=10)
+    assert contar_linhas(path) == 0
+
+
+def test_cached_embeddings_chama_o_modelo_uma_vez():
+    base = ContadorEmbeddings()
+    embeddings = CachedEmbeddings(base, EmbeddingCache("modelo"))
+
+    assert embeddings.embed_query("prazo") == embeddings.embed_query("Prazo ")
+    assert base.chamadas == 1
+
+    # Embeddings de documentos (indexação) não passam pelo cache
+    embeddings.embed_documents(["prazo", "prazo"])
+    assert base.chamadas == 3
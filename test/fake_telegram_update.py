@@ -0,0 +1,179 @@
+import sys
+import json
+import time
+import logging
+import argparse
+import threading
+from urllib.parse import parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("fake_telegram_update")
+
+# Respostas da Bot API falsa para os métodos que o bot usa
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "Chatbot", "username": "chatbot_teste_bot"}
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+class FakeBotAPI(BaseHTTPRequestHandler):
+    """
+    Bot API falsa: responde às chamadas do bot (getMe, setWebhook, sendMessage...)
+    e registra as mensagens enviadas, sem acessar o Telegram
+    """
+
+    sent_messages = []
+    next_message_id = 1000
+    last_activity = 0.0
+    lock = threading.Lock()
+
+    def _read_params(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length).decode("utf-8") if length else ""
+        if self.headers.get("Content-Type", "").startswith("application/json"):
+            return json.loads(body or "{}")
+        # A biblioteca do bot envia os parâmetros como formulário, com valores em JSON
+        params = {}
+        for key, values in parse_qs(body).items():
+            try:
+                params[key] = json.loads(values[0])
+            except ValueError:
+                params[key] = values[0]
+        return params
+
+    def do_POST(self):
+        method = self.path.rstrip("/").rsplit("/", 1)[-1]
+        params = self._read_params()
+
+        if method == "getMe":
+            result = BOT_USER
+        elif method in ("sendMessage", "editMessageText"):
+            with self.lock:
+                FakeBotAPI.next_message_id += 1
+                message_id = params.get("message_id", FakeBotAPI.next_message_id)
+                FakeBotAPI.sent_messages.append((method, params.get("chat_id"), params.get("text")))
+                FakeBotAPI.last_activity = time.time()
+            logger.info(f"Bot -> {method} (chat {params.get('chat_id')}): {params.get('text')!r}")
+            result = {
+                "message_id": message_id,
+                "date": int(time.time()),
+                "chat": {"id": int(params.get("chat_id", 0)), "type": "private"},
+                "from": BOT_USER,
+                "text": params.get("text", "")
+            }
+        else:
+            logger.info(f"Bot -> {method} {params}")
+            result = True
+
+        body = json.dumps({"ok": True, "result": result}).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+def criar_update(update_id, chat_id, texto):
+    """
+    Monta um update do Telegram com uma mensagem de texto de um chat privado
+    """
+    usuario = {"id": chat_id, "is_bot": False, "first_name": "Teste"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private", "first_name": "Teste"},
+            "from": usuario,
+            "text": texto
+        }
+    }
+
+def enviar_updates(webhook_url, secret, mensagens, chats, intervalo, espera_inicial):
+    """
+    Envia os updates ao webhook do bot, como o Telegram faria (o bot pode ser iniciado depois deste script)
+
+    Returns:
+        bool: True se o webhook aceitou todos os updates e recusou o segredo inválido
+    """
+    ok = True
+    with httpx.Client(timeout=10) as client:
+        # Segredo inválido: o bot deve recusar (repetido até o webhook estar no ar)
+        deadline = time.time() + espera_inicial
+        while True:
+            try:
+                response = client.post(webhook_url, json=criar_update(1, chats[0], "teste"), headers={SECRET_HEADER: "segredo-invalido"})
+                break
+            except httpx.TransportError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(1)
+
+        if response.status_code != 403:
+            logger.error(f"❌ Update com segredo inválido respondido com {response.status_code} (esperado 403)")
+            ok = False
+        else:
+            logger.info("✅ Update com segredo inválido recusado (403)")
+
+        for indice, texto in enumerate(mensagens):
+            chat_id = chats[indice % len(chats)]
+            response = client.post(webhook_url, json=criar_update(indice + 2, chat_id, texto), headers={SECRET_HEADER: secret})
+            if response.status_code != 200:
+                logger.error(f"❌ Update {indice + 2} respondido com {response.status_code}")
+                ok = False
+            else:
+                logger.info(f"Update {indice + 2} (chat {chat_id}) entregue: {texto!r}")
+            time.sleep(intervalo)
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Envia updates falsos do Telegram ao webhook do bot e simula a Bot API. "
+                    "Inicie o bot com BOT_MODE=webhook, BOT_API_BASE_URL=http://localhost:<api-port>/bot, "
+                    "WEBHOOK_URL=<webhook-url> e o mesmo WEBHOOK_SECRET_TOKEN."
+    )
+    parser.add_argument("--webhook-url", default="http://localhost:8443/telegram", help="URL do webhook do bot (ou do nginx)")
+    parser.add_argument("--secret", required=True, help="Valor de WEBHOOK_SECRET_TOKEN do bot")
+    parser.add_argument("--api-port", type=int, default=8081, help="Porta da Bot API falsa")
+    parser.add_argument("--chats", type=int, nargs="+", default=[111, 222], help="IDs dos chats simulados")
+    parser.add_argument("--interval", type=float, default=0.2, help="Intervalo entre updates (s)")
+    parser.add_argument("--wait", type=float, default=60.0, help="Tempo máximo de espera pelas respostas do bot (s)")
+    parser.add_argument("--idle", type=float, default=3.0, help="Tempo sem novas mensagens do bot para considerar as respostas completas (s)")
+    parser.add_argument("--startup-wait", type=float, default=60.0, help="Tempo de espera até o webhook do bot estar no ar (s)")
+    parser.add_argument("mensagens", nargs="*", default=["Olá!", "O que é um recurso extraordinário?"])
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("0.0.0.0", args.api_port), FakeBotAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logger.info(f"Bot API falsa em http://localhost:{args.api_port}/bot")
+
+    try:
+        ok = enviar_updates(args.webhook_url, args.secret, args.mensagens, args.chats, args.interval, args.startup_wait)
+
+        # Espera até que todos os chats tenham recebido respostas e o bot pare de enviar/editar mensagens
+        chats_esperados = {args.chats[indice % len(args.chats)] for indice in range(len(args.mensagens))}
+        deadline = time.time() + args.wait
+        while time.time() < deadline:
+            with FakeBotAPI.lock:
+                respostas = {chat_id for _, chat_id, _ in FakeBotAPI.sent_messages}
+                ocioso = time.time() - FakeBotAPI.last_activity >= args.idle
+            if chats_esperados <= respostas and ocioso:
+                break
+            time.sleep(0.5)
+
+        with FakeBotAPI.lock:
+            total = len(FakeBotAPI.sent_messages)
+            respostas = {chat_id for _, chat_id, _ in FakeBotAPI.sent_messages}
+        sem_resposta = chats_esperados - respostas
+        if sem_resposta:
+            logger.error(f"❌ Chats sem resposta do bot: {sorted(sem_resposta)}")
+            ok = False
+        logger.info(f"{'✅' if ok else '❌'} {total} mensagens enviadas/editadas pelo bot")
+        return ok
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,130 @@
+import os
+import sys
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from langchain_core.documents import Document
+
+from repository.lexical_index_repo import LexicalIndex, tokenize
+from services.retrieval_and_generation.retrieval_cache import RetrievalCache
+from services.retrieval_and_generation.vector_search_service import VectorSearchService, reciprocal_rank_fusion
+
+class FakeVectorstore:
+    def __init__(self, ranking):
+        self.ranking = ranking
+        self.buscas = 0
+
+    def similarity_search_with_score(self, query, k, filter=None):
+        self.buscas += 1
+        return [(doc, 0.1 * position) for position, doc in enumerate(self.ranking[:k])]
+
+
+class FakeChromaRepository:
+    """
+    Substituto do ChromaRepository: ranking vetorial fixo e leitura de chunks por ID
+    """
+
+    def __init__(self, documents, vector_ranking):
+        self.documents = {doc.id: doc for doc in documents}
+        self.vectorstore = FakeVectorstore([self.documents[chunk_id] for chunk_id in vector_ranking])
+        self.index_version = 1
+
+    def get_vectorstore(self):
+        return self.vectorstore
+
+    def get_documents(self, ids):
+        return [self.documents[chunk_id] for chunk_id in ids if chunk_id in self.documents]
+
+    def get_index_version(self):
+        return self.index_version
+
+
+def documento(chunk_id, texto, **metadata):
+    return Document(id=chunk_id, page_content=texto, metadata=metadata)
+
+
+def test_rrf_soma_as_posicoes():
+    fused = dict(reciprocal_rank_fusion([["a", "b", "c"], ["c", "a"]], rrf_k=60))
+
+    assert fused["a"] == 1 / 61 + 1 / 62
+    assert fused["c"] == 1 / 63 + 1 / 61
+    assert fused["b"] == 1 / 62
+
+
+def test_rrf_ordena_pelo_score_fundido():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["d", "b", "e"]], rrf_k=60)
+
+    # "b" aparece em segundo nos dois rankings e passa à frente dos que aparecem em um só
+    assert [item for item, _ in fused][:1] == ["b"]
+    assert {item for item, _ in fused} == {"a", "b", "c", "d", "e"}
+    assert [score for _, score in fused] == sorted((score for _, score in fused), reverse=True)
+
+
+def test_tokenize_normaliza_acentos_e_ordinais():
+    assert tokenize("Art. 5º da Constituição") == ["art", "5o", "constituicao"]
+    assert tokenize("artigo 5o da CONSTITUICAO") == ["artigo", "5o", "constituicao"]
+    # Stopwords e letras isoladas são descartadas; números isolados são mantidos
+    assert tokenize("a lei 8 e o § x") == ["lei", "8"]
+
+
+def test_indice_lexico_encontra_variantes(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.upsert(
+        ["c1", "c2", "c3"],
+        [
+            documento("c1", "Violação ao art. 5º, inciso LV, da Constituição Federal"),
+            documento("c2", "Recurso especial sobre prazo prescricional"),
+            documento("c3", "Agravo interno no recurso extraordinário", doc_type="agravo")
+        ]
+    )
+
+    assert [chunk_id for chunk_id, _ in index.search("artigo 5o da constituicao")] == ["c1"]
+    assert [chunk_id for chunk_id, _ in index.search("Constituição, art. 5º")] == ["c1"]
+    assert [chunk_id for chunk_id, _ in index.search("recurso", filters={"doc_type": "agravo"})] == ["c3"]
+    assert index.search("de que o") == []
+
+
+def test_indice_lexico_upsert_e_delete(tmp_path):
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.upsert(["c1"], [documento("c1", "prazo prescricional")])
+    index.upsert(["c1"], [documento("c1", "prazo decadencial")])
+
+    assert index.count() == 1
+    assert index.search("prescricional") == []
+    assert [chunk_id for chunk_id, _ in index.search("decadencial")] == ["c1"]
+
+    index.delete(["c1"])
+    assert index.count() == 0
+
+
+def test_busca_hibrida_funde_e_le_chunks_so_lexicos(tmp_path):
+    docs = [
+        documento("v1", "Tema geral sobre responsabilidade civil"),
+        documento("v2", "Outro tema sobre responsabilidade"),
+        documento("lx", "Processo RE1463299 sobre responsabilidade civil do Estado")
+    ]
+    chroma = FakeChromaRepository(docs, vector_ranking=["v1", "v2"])
+    index = LexicalIndex(str(tmp_path / "lexical.db"))
+    index.upsert([doc.id for doc in docs], docs)
+
+    service = VectorSearchService(chroma, embedding_service=None, lexical_index=index, candidates_multiplier=2)
+    resultado = [doc.id for doc in service.similarity_search("RE1463299 responsabilidade civil", k=3)]
+
+    # "lx" só é encontrado pela busca léxica (número do processo) e entra no resultado
+    assert set(resultado) == {"v1", "v2", "lx"}
+    assert service.get_metrics()["lexical_only_docs"] == 1
+
+
+def test_busca_usa_o_cache_ate_a_reindexacao():
+    docs = [documento("v1", "texto"), documento("v2", "outro texto")]
+    chroma = FakeChromaRepository(docs, vector_ranking=["v1", "v2"])
+    service = VectorSearchService(chroma, embedding_service=None, retrieval_cache=RetrievalCache())
+
+    primeira = [doc.id for doc in service.similarity_search("texto", k=2)]
+    assert [doc.id for doc in service.similarity_search("texto", k=2)] == primeira
+    assert chroma.vectorstore.buscas == 1
+
+    chroma.index_version = 2
+    service.similarity_search("texto", k=2)
+    assert chroma.vectorstore.buscas == 2
@@ -0,0 +1,79 @@
+import os
+import sys
+import json
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from langchain_core.documents import Document
+
+from services.indexing.index_manifest import IndexManifest, make_chunk_id, content_hash
+
+OBJETO = {"key": "acordaos/123.pdf", "etag": "abc", "size": 1000}
+
+
+def test_chunk_id_deterministico():
+    assert make_chunk_id("acordaos/123.pdf", 0) == make_chunk_id("acordaos/123.pdf", 0)
+    assert make_chunk_id("acordaos/123.pdf", 0) != make_chunk_id("acordaos/123.pdf", 1)
+    assert make_chunk_id("acordaos/123.pdf", 0) != make_chunk_id("acordaos/124.pdf", 0)
+
+
+def test_hash_considera_texto_e_metadados():
+    base = content_hash(Document(page_content="texto", metadata={"page": 1}))
+
+    assert base == content_hash(Document(page_content="texto", metadata={"page": 1}))
+    assert base != content_hash(Document(page_content="texto alterado", metadata={"page": 1}))
+    assert base != content_hash(Document(page_content="texto", metadata={"page": 2}))
+
+
+def test_salva_e_carrega(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IndexManifest(path, "acordaos")
+    manifest.set(OBJETO, {"id1": "hash1"})
+    manifest.save()
+
+    carregado = IndexManifest(path, "acordaos").load()
+    assert carregado.exists
+    assert carregado.is_unchanged(OBJETO)
+    assert not carregado.is_unchanged({**OBJETO, "etag": "def"})
+    assert not carregado.is_unchanged({**OBJETO, "size": 1001})
+    assert carregado.get_chunks(OBJETO["key"]) == {"id1": "hash1"}
+
+
+def test_remove_retorna_os_chunks(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.json"), "acordaos")
+    manifest.set(OBJETO, {"id1": "hash1"})
+
+    assert manifest.remove(OBJETO["key"]) == {"id1": "hash1"}
+    assert manifest.keys() == set()
+    assert manifest.remove(OBJETO["key"]) == {}
+
+
+def test_manifesto_de_outra_colecao_e_ignorado(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    manifest = IndexManifest(path, "acordaos")
+    manifest.set(OBJETO, {"id1": "hash1"})
+    manifest.save()
+
+    outro = IndexManifest(path, "outra_colecao").load()
+    assert not outro.exists
+    assert outro.keys() == set()
+
+
+def test_manifesto_ilegivel_e_reconstruido(tmp_path):
+    path = tmp_path / "manifest.json"
+    path.write_text("{ corrompido", encoding="utf-8")
+
+    manifest = IndexManifest(str(path), "acordaos").load()
+    assert not manifest.exists
+    assert manifest.keys() == set()
+
+
+def test_gravacao_atomica_nao_deixa_temporarios(tmp_path):
+    path = tmp_path / "manifest.json"
+    manifest = IndexManifest(str(path), "acordaos")
+    manifest.set(OBJETO, {})
+    manifest.save()
+
+    assert os.listdir(tmp_path) == ["manifest.json"]
+    assert json.loads(path.read_text(encoding="utf-8"))["collection"] == "acordaos"
@@ -0,0 +1,131 @@
+import time
+import uuid
+import asyncio
+import logging
+import argparse
+import statistics
+
+import httpx
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("load_test")
+
+CONSULTAS = [
+    "O que é um recurso extraordinário?",
+    "Quais os requisitos de admissibilidade de um agravo?",
+    "O que diz a decisão sobre prescrição?",
+    "Oi, tudo bem?",
+]
+
+def percentil(valores, p):
+    """
+    Calcula o percentil p (0 a 100) de uma lista de valores
+    """
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    indice = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[indice]
+
+async def executar_requisicao(client, url, indice, chats):
+    """
+    Envia uma consulta ao endpoint /query
+    
+    Returns:
+        tuple: (sucesso, latência em segundos)
+    """
+    payload = {
+        "query": CONSULTAS[indice % len(CONSULTAS)],
+        "chat_id": chats[indice % len(chats)]
+    }
+    inicio = time.perf_counter()
+    try:
+        response = await client.post(f"{url}/query", json=payload)
+        sucesso = response.status_code == 200
+        if not sucesso:
+            logger.warning(f"Requisição {indice} retornou {response.status_code}: {response.text[:100]}")
+    except httpx.HTTPError as e:
+        logger.warning(f"Requisição {indice} falhou: {str(e)}")
+        sucesso = False
+    return sucesso, time.perf_counter() - inicio
+
+async def executar_carga(url, total, concorrencia, num_chats, uds=None, timeout=120.0):
+    """
+    Dispara `total` requisições mantendo no máximo `concorrencia` em andamento
+    
+    Returns:
+        dict: Vazão (req/s), latências e contagem de falhas
+    """
+    chats = [f"load-{uuid.uuid4().hex[:8]}" for _ in range(num_chats)]
+    semaforo = asyncio.Semaphore(concorrencia)
+    transport = httpx.AsyncHTTPTransport(uds=uds) if uds else None
+    limits = httpx.Limits(max_connections=concorrencia, max_keepalive_connections=concorrencia)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits, transport=transport) as client:
+        async def limitada(indice):
+            async with semaforo:
+                return await executar_requisicao(client, url, indice, chats)
+
+        inicio = time.perf_counter()
+        resultados = await asyncio.gather(*(limitada(i) for i in range(total)))
+        duracao = time.perf_counter() - inicio
+
+    latencias = [latencia for sucesso, latencia in resultados if sucesso]
+    falhas = sum(1 for sucesso, _ in resultados if not sucesso)
+    return {
+        "url": url,
+        "requests": total,
+        "concurrency": concorrencia,
+        "failures": falhas,
+        "duration": round(duracao, 4),
+        "requests_per_second": round(len(latencias) / duracao, 2) if duracao > 0 else 0.0,
+        "latency_mean": round(statistics.mean(latencias), 4) if latencias else 0.0,
+        "latency_p50": round(percentil(latencias, 50), 4),
+        "latency_p95": round(percentil(latencias, 95), 4),
+    }
+
+def imprimir_resultado(nome, resultado):
+    print(f"\n[{nome}] {resultado['url']}")
+    print(f"  Requisições: {resultado['requests']} (concorrência {resultado['concurrency']}, falhas {resultado['failures']})")
+    print(f"  Duração: {resultado['duration']}s")
+    print(f"  Vazão: {resultado['requests_per_second']} req/s")
+    print(f"  Latência média/p50/p95: {resultado['latency_mean']}s / {resultado['latency_p50']}s / {resultado['latency_p95']}s")
+
+# Teste de carga: compara a vazão do app Flask (gunicorn) com a do app ASGI (uvicorn)
+# Exemplo (dois servidores locais):
+#   gunicorn --workers=2 --chdir=src main:app -b 127.0.0.1:5000
+#   (cd src && uvicorn asgi:app --port 8000 --workers 2)
+#   python test/load_test.py --flask-url http://127.0.0.1:5000 --asgi-url http://127.0.0.1:8000
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Teste de carga do endpoint /query")
+    parser.add_argument("--flask-url", help="URL base do app Flask (gunicorn)")
+    parser.add_argument("--asgi-url", help="URL base do app ASGI (uvicorn)")
+    parser.add_argument("--uds", help="Socket unix (ex.: /shared/chatbotsocket.sock) para testar um único servidor")
+    parser.add_argument("--requests", "-n", type=int, default=100, help="Total de requisições por servidor")
+    parser.add_argument("--concurrency", "-c", type=int, default=20, help="Requisições simultâneas")
+    parser.add_argument("--chats", type=int, default=10, help="Número de chat_ids distintos")
+    args = parser.parse_args()
+
+    alvos = []
+    if args.flask_url:
+        alvos.append(("flask", args.flask_url))
+    if args.asgi_url:
+        alvos.append(("asgi", args.asgi_url))
+    if args.uds:
+        alvos.append(("uds", "http://localhost"))
+    if not alvos:
+        parser.error("informe --flask-url, --asgi-url e/ou --uds")
+
+    print("Iniciando teste de carga...")
+    resultados = {}
+    for nome, url in alvos:
+        resultados[nome] = asyncio.run(
+            executar_carga(url, args.requests, args.concurrency, args.chats, uds=args.uds if nome == "uds" else None)
+        )
+        imprimir_resultado(nome, resultados[nome])
+
+    if "flask" in resultados and "asgi" in resultados and resultados["flask"]["requests_per_second"] > 0:
+        ganho = resultados["asgi"]["requests_per_second"] / resultados["flask"]["requests_per_second"]
+        print(f"\nASGI/Flask: {ganho:.2f}x requisições por segundo")
+
+    print("\nTeste de carga concluído.")
@@ -0,0 +1,140 @@
+import os
+import sys
+import time
+import logging
+import argparse
+import tempfile
+import threading
+
+# Importa o módulo direto de src/services: o pacote services carrega a configuração e os clientes AWS,
+# desnecessários aqui (o pipeline de logs só usa a biblioteca padrão)
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src", "services"))
+
+from log_shipper import LogShipper, CloudWatchSink, FileSink
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger("log_pipeline_test")
+
+class ResourceAlreadyExists(Exception):
+    response = {"Error": {"Code": "ResourceAlreadyExistsException"}}
+
+class LocalLogsClient:
+    """
+    Substituto local do cliente boto3 "logs": guarda os eventos em memória,
+    com latência e falhas simuladas
+    """
+
+    def __init__(self, latency=0.0, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.groups = set()
+        self.streams = {}
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def create_log_group(self, logGroupName):
+        with self.lock:
+            if logGroupName in self.groups:
+                raise ResourceAlreadyExists()
+            self.groups.add(logGroupName)
+
+    def create_log_stream(self, logGroupName, logStreamName):
+        with self.lock:
+            if (logGroupName, logStreamName) in self.streams:
+                raise ResourceAlreadyExists()
+            self.streams[(logGroupName, logStreamName)] = []
+
+    def put_log_events(self, logGroupName, logStreamName, logEvents):
+        time.sleep(self.latency)
+        if self.fail:
+            raise ConnectionError("CloudWatch indisponível (simulado)")
+        timestamps = [event["timestamp"] for event in logEvents]
+        assert timestamps == sorted(timestamps), "eventos fora de ordem"
+        with self.lock:
+            self.calls += 1
+            self.streams[(logGroupName, logStreamName)].extend(logEvents)
+        return {}
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Mede o custo de logar com o pipeline de logs, usando um substituto local do CloudWatch")
+    parser.add_argument("--threads", type=int, default=8, help="Threads logando ao mesmo tempo (requisições simultâneas)")
+    parser.add_argument("--records", type=int, default=5000, help="Registros por thread")
+    parser.add_argument("--queue-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=2.0)
+    parser.add_argument("--latency", type=float, default=0.05, help="Latência simulada de cada PutLogEvents (s)")
+    parser.add_argument("--fail", action="store_true", help="Simula o CloudWatch fora do ar (lotes vão para o arquivo de fallback)")
+    parser.add_argument("--pause", type=float, default=0.0001,
+                        help="Pausa entre registros de cada thread (s); as requisições esperam I/O entre um log e outro. "
+                             "Com 0, as threads disputam o GIL sem parar e o máximo passa a medir o escalonamento")
+    parser.add_argument("--max-p99-us", type=float, default=1000.0, help="Limite do p99 do custo por chamada (µs)")
+    parser.add_argument("--max-us", type=float, default=50000.0, help="Limite do custo máximo de uma chamada (µs)")
+    args = parser.parse_args()
+
+    client = LocalLogsClient(latency=args.latency, fail=args.fail)
+    fallback_path = os.path.join(tempfile.mkdtemp(), "fallback.log")
+    shipper = LogShipper(
+        [CloudWatchSink(client, "grupo-teste", "stream-teste")],
+        fallback_sink=FileSink(fallback_path),
+        queue_size=args.queue_size,
+        batch_size=args.batch_size,
+        flush_interval=args.flush_interval
+    )
+    shipper.start()
+
+    carga = logging.getLogger("log_pipeline_test.carga")
+    carga.propagate = False
+    carga.setLevel(logging.INFO)
+    carga.addHandler(shipper.handler)
+
+    latencias = [[] for _ in range(args.threads)]
+
+    def logar(indice):
+        for i in range(args.records):
+            inicio = time.perf_counter()
+            carga.info(f"[req-{indice}] Busca concluída em {i * 0.001:.4f}s (cache: miss)")
+            latencias[indice].append(time.perf_counter() - inicio)
+            if args.pause:
+                time.sleep(args.pause)
+
+    inicio = time.time()
+    threads = [threading.Thread(target=logar, args=(indice,)) for indice in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    tempo_logando = time.time() - inicio
+
+    shipper.flush(timeout=60)
+    shipper.close()
+
+    todas = [latencia for lista in latencias for latencia in lista]
+    metrics = shipper.get_metrics()
+    recebidos = sum(len(events) for events in client.streams.values())
+    no_fallback = sum(1 for _ in open(fallback_path, encoding="utf-8")) if os.path.exists(fallback_path) else 0
+
+    logger.info(f"Registros emitidos: {len(todas)} em {tempo_logando:.2f}s ({args.threads} threads)")
+    p99 = percentil(todas, 99) * 1e6
+    maximo = max(todas) * 1e6
+    logger.info(f"Custo por chamada: p50={percentil(todas, 50) * 1e6:.1f}µs, p99={p99:.1f}µs, máx={maximo:.1f}µs")
+    logger.info(f"Pipeline: {metrics}")
+    logger.info(f"Substituto do CloudWatch: {recebidos} eventos em {client.calls} chamadas; fallback: {no_fallback} linhas ({fallback_path})")
+
+    ok = metrics["enqueued"] + metrics["dropped"] == len(todas) and metrics["shipped"] == metrics["enqueued"]
+    # Além dos registros, os destinos recebem os avisos de descarte e de falha
+    if args.fail:
+        ok = ok and recebidos == 0 and metrics["fallback_records"] >= metrics["shipped"] and no_fallback >= metrics["shipped"]
+    else:
+        ok = ok and recebidos >= metrics["shipped"]
+    logger.info(f"{'✅' if ok else '❌'} Todos os registros foram entregues (ao CloudWatch ou ao fallback) ou contados como descartados")
+
+    rapido = p99 <= args.max_p99_us and maximo <= args.max_us
+    logger.info(f"{'✅' if rapido else '❌'} Custo por chamada dentro dos limites (p99 ≤ {args.max_p99_us:.0f}µs, máx ≤ {args.max_us:.0f}µs)")
+    return ok and rapido
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,53 @@
+import os
+import sys
+import time
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from langchain_core.documents import Document
+
+from services.retrieval_and_generation.reranker_service import RerankerService
+
+DOCS = [
+    Document(page_content="Decisão sobre honorários advocatícios"),
+    Document(page_content="Prazo prescricional da ação de cobrança"),
+    Document(page_content="Custas processuais e honorários"),
+]
+
+
+def test_reordena_pelo_bm25():
+    reranker = RerankerService(lexical_weight=1.0, time_budget=10.0)
+
+    assert reranker.rerank("prazo prescricional", DOCS, 2)[0] is DOCS[1]
+    assert reranker.get_metrics()["top_changed"] == 1
+
+
+def test_sem_termos_uteis_mantem_a_ordem():
+    reranker = RerankerService(time_budget=10.0)
+
+    assert reranker.rerank("de que o", DOCS, 3) == DOCS
+
+
+def test_orcamento_excedido_na_tokenizacao():
+    reranker = RerankerService(lexical_weight=1.0, time_budget=0.0)
+
+    assert reranker.rerank("prazo prescricional", DOCS, 2) == DOCS[:2]
+    assert reranker.get_metrics()["budget_exceeded"] == 1
+
+
+def test_orcamento_excedido_no_bm25(monkeypatch):
+    reranker = RerankerService(lexical_weight=1.0, time_budget=0.05)
+    bm25_scores = reranker._bm25_scores
+
+    def bm25_lento(query_terms, docs_terms):
+        time.sleep(0.1)
+        return bm25_scores(query_terms, docs_terms)
+
+    monkeypatch.setattr(reranker, "_bm25_scores", bm25_lento)
+
+    # O BM25 estourou o orçamento: vale a ordem da busca
+    assert reranker.rerank("prazo prescricional", DOCS, 2) == DOCS[:2]
+    metrics = reranker.get_metrics()
+    assert metrics["budget_exceeded"] == 1
+    assert metrics["reranks"] == 0
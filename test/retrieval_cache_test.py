@@ -0,0 +1,60 @@
+import os
+import sys
+import time
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from services.retrieval_and_generation.retrieval_cache import RetrievalCache
+
+RESULTADOS = [("id1", 0.9), ("id2", 0.8)]
+
+
+def test_acerto_com_query_normalizada():
+    cache = RetrievalCache()
+    cache.put("Qual o  prazo?", 5, None, 1, RESULTADOS)
+
+    assert cache.get("qual o prazo?", 5, None, 1) == RESULTADOS
+    assert cache.get_metrics()["hits"] == 1
+
+
+def test_chave_inclui_k_filtros_e_versao():
+    cache = RetrievalCache()
+    cache.put("prazo", 5, {"doc_type": "agravo"}, 1, RESULTADOS)
+
+    assert cache.get("prazo", 10, {"doc_type": "agravo"}, 1) is None
+    assert cache.get("prazo", 5, None, 1) is None
+    assert cache.get("prazo", 5, {"doc_type": "apelacao"}, 1) is None
+    # Uma reindexação muda a versão do índice: o resultado anterior não é reaproveitado
+    assert cache.get("prazo", 5, {"doc_type": "agravo"}, 2) is None
+    assert cache.get("prazo", 5, {"doc_type": "agravo"}, 1) == RESULTADOS
+
+
+def test_lru():
+    cache = RetrievalCache(max_entries=2)
+    cache.put("a", 5, None, 1, RESULTADOS)
+    cache.put("b", 5, None, 1, RESULTADOS)
+    cache.get("a", 5, None, 1)
+    cache.put("c", 5, None, 1, RESULTADOS)
+
+    assert cache.get("b", 5, None, 1) is None
+    assert cache.get("a", 5, None, 1) == RESULTADOS
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_ttl(monkeypatch):
+    cache = RetrievalCache(ttl=10)
+    cache.put("a", 5, None, 1, RESULTADOS)
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 11)
+    assert cache.get("a", 5, None, 1) is None
+    assert cache.get_metrics()["expirations"] == 1
+
+
+def test_resultado_devolvido_e_uma_copia():
+    cache = RetrievalCache()
+    cache.put("a", 5, None, 1, RESULTADOS)
+    cache.get("a", 5, None, 1).append(("id3", 0.1))
+
+    assert cache.get("a", 5, None, 1) == RESULTADOS
@@ -0,0 +1,89 @@
+import os
+import sys
+import time
+
+# Adiciona o diretório src ao PYTHONPATH (os módulos importam "services..." e "repository...")
+sys.path.insert(0, os.path.join(os.path.abspath(os.path.dirname(os.path.dirname(__file__))), "src"))
+
+from services.retrieval_and_generation.semantic_answer_cache import SemanticAnswerCache
+
+CHUNKS = ["id1", "id2"]
+
+
+def test_query_proxima_com_os_mesmos_chunks():
+    cache = SemanticAnswerCache(max_distance=0.05)
+    cache.put("qual o prazo?", [1.0, 0.0], CHUNKS, "15 dias", 1)
+
+    # Distância de cosseno ~0.0001, chunks na outra ordem
+    entrada = cache.get([1.0, 0.01], list(reversed(CHUNKS)), 1)
+    assert entrada["answer"] == "15 dias"
+    assert entrada["query"] == "qual o prazo?"
+
+
+def test_query_distante_nao_acerta():
+    cache = SemanticAnswerCache(max_distance=0.05)
+    cache.put("qual o prazo?", [1.0, 0.0], CHUNKS, "15 dias", 1)
+
+    assert cache.get([0.0, 1.0], CHUNKS, 1) is None
+
+
+def test_chunks_diferentes_nao_acertam():
+    cache = SemanticAnswerCache()
+    cache.put("qual o prazo?", [1.0, 0.0], CHUNKS, "15 dias", 1)
+
+    assert cache.get([1.0, 0.0], ["id1", "id3"], 1) is None
+    assert cache.get_metrics()["chunk_mismatches"] == 1
+
+
+def test_nova_versao_do_indice_invalida():
+    cache = SemanticAnswerCache()
+    cache.put("qual o prazo?", [1.0, 0.0], CHUNKS, "15 dias", 1)
+
+    assert cache.get([1.0, 0.0], CHUNKS, 2) is None
+    assert cache.get_metrics()["invalidations"] == 1
+    # As respostas anteriores não voltam com a versão antiga
+    assert cache.get([1.0, 0.0], CHUNKS, 1) is None
+
+
+def test_resposta_de_versao_antiga_nao_e_armazenada():
+    cache = SemanticAnswerCache()
+    cache.get([1.0, 0.0], CHUNKS, 2)
+    # Busca feita antes da reindexação, resposta gerada depois
+    cache.put("qual o prazo?", [1.0, 0.0], CHUNKS, "resposta antiga", 1)
+
+    assert cache.get([1.0, 0.0], CHUNKS, 2) is None
+    metrics = cache.get_metrics()
+    assert metrics["stale_puts"] == 1
+    assert metrics["entries"] == 0
+
+
+def test_lru():
+    cache = SemanticAnswerCache(max_entries=2)
+    cache.put("a", [1.0, 0.0, 0.0], CHUNKS, "A", 1)
+    cache.put("b", [0.0, 1.0, 0.0], CHUNKS, "B", 1)
+    cache.get([1.0, 0.0, 0.0], CHUNKS, 1)
+    cache.put("c", [0.0, 0.0, 1.0], CHUNKS, "C", 1)
+
+    assert cache.get([0.0, 1.0, 0.0], CHUNKS, 1) is None
+    assert cache.get([1.0, 0.0, 0.0], CHUNKS, 1)["answer"] == "A"
+    assert cache.get([0.0, 0.0, 1.0], CHUNKS, 1)["answer"] == "C"
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_mesma_query_substitui_a_entrada():
+    cache = SemanticAnswerCache()
+    cache.put("a", [1.0, 0.0], CHUNKS, "antiga", 1)
+    cache.put("a", [1.0, 0.0], CHUNKS, "nova", 1)
+
+    assert cache.get([1.0, 0.0], CHUNKS, 1)["answer"] == "nova"
+    assert cache.get_metrics()["entries"] == 1
+
+
+def test_ttl(monkeypatch):
+    cache = SemanticAnswerCache(ttl=10)
+    cache.put("a", [1.0, 0.0], CHUNKS, "A", 1)
+
+    agora = time.time()
+    monkeypatch.setattr(time, "time", lambda: agora + 11)
+    assert cache.get([1.0, 0.0], CHUNKS, 1) is None
+    assert cache.get_metrics()["expirations"] == 1
@@ -0,0 +1,152 @@
+import os
+import sys
+import asyncio
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+# O bot roda sem src no caminho: src/telegram (da API) esconderia o python-telegram-bot
+sys.path[:] = [path for path in sys.path if os.path.abspath(path or ".") != os.path.join(ROOT_DIR, "src")]
+# Adiciona o diretório do bot ao PYTHONPATH (os módulos do bot são importados sem pacote)
+sys.path.insert(0, os.path.join(ROOT_DIR, "telegrambot"))
+
+# Dependência do bot (telegrambot/requirements.txt), ausente no ambiente da API
+pytest.importorskip("telegram")
+
+from telegram.error import RetryAfter
+
+from streaming_reply import StreamingReply, split_text
+
+class FakeMessage:
+    """
+    Mensagem do Telegram falsa: guarda o texto de cada edição
+    """
+
+    def __init__(self, text=""):
+        self.text = text
+        self.edits = []
+        self.deleted = False
+        self.retry_after = None
+
+    async def edit_text(self, text):
+        if self.retry_after is not None:
+            retry_after, self.retry_after = self.retry_after, None
+            raise RetryAfter(retry_after)
+        self.text = text
+        self.edits.append(text)
+
+    async def delete(self):
+        self.deleted = True
+
+
+def nova_resposta(edit_interval=0.0, max_length=20):
+    enviadas = []
+
+    async def send(text):
+        message = FakeMessage(text)
+        enviadas.append(message)
+        return message
+
+    return StreamingReply(FakeMessage("Pensando..."), send, edit_interval=edit_interval, max_length=max_length), enviadas
+
+
+def test_split_text_cabe_em_uma_mensagem():
+    assert split_text("curto", max_length=10) == ("curto", "")
+
+
+def test_split_text_corta_na_quebra_de_linha():
+    parte, resto = split_text("primeira linha\nsegunda linha", max_length=20)
+
+    assert parte == "primeira linha"
+    assert resto == "segunda linha"
+
+
+def test_split_text_corta_no_espaco():
+    parte, resto = split_text("palavra outra palavra", max_length=15)
+
+    assert parte == "palavra outra"
+    assert resto == "palavra"
+
+
+def test_split_text_sem_separador_corta_no_limite():
+    parte, resto = split_text("a" * 25, max_length=10)
+
+    assert parte == "a" * 10
+    assert resto == "a" * 15
+
+
+def test_split_text_reconstroi_o_texto():
+    texto = " ".join(f"palavra{i}" for i in range(200))
+    partes = []
+    while texto:
+        parte, texto = split_text(texto, max_length=50)
+        assert len(parte) <= 50
+        partes.append(parte)
+
+    assert " ".join(partes) == " ".join(f"palavra{i}" for i in range(200))
+
+
+def test_resposta_edita_o_aviso():
+    async def cenario():
+        reply, enviadas = nova_resposta()
+        await reply.append("Olá")
+        await reply.append(", mundo")
+        await reply.finish()
+        return reply, enviadas
+
+    reply, enviadas = asyncio.run(cenario())
+    assert reply.messages[0].text == "Olá, mundo"
+    assert enviadas == []
+
+
+def test_resposta_longa_continua_em_nova_mensagem():
+    async def cenario():
+        reply, enviadas = nova_resposta(max_length=20)
+        for palavra in "uma resposta bem mais longa que o limite".split():
+            await reply.append(palavra + " ")
+        await reply.finish()
+        return reply
+
+    reply = asyncio.run(cenario())
+    textos = [message.text.strip() for message in reply.messages]
+    assert len(textos) > 1
+    assert all(len(texto) <= 20 for texto in textos)
+    assert " ".join(textos) == "uma resposta bem mais longa que o limite"
+
+
+def test_edicoes_respeitam_o_intervalo():
+    async def cenario():
+        reply, _ = nova_resposta(edit_interval=60.0, max_length=4096)
+        for i in range(10):
+            await reply.append(f"{i} ")
+        await reply.finish()
+        return reply
+
+    placeholder = asyncio.run(cenario()).messages[0]
+    # Uma edição no primeiro trecho e a final
+    assert len(placeholder.edits) == 2
+    assert placeholder.text == "0 1 2 3 4 5 6 7 8 9 "
+
+
+def test_texto_final_espera_o_limite_do_telegram():
+    async def cenario():
+        reply, _ = nova_resposta()
+        reply.messages[0].retry_after = 0.01
+        await reply.append("parcial")
+        # A edição intermediária foi pulada; a final espera e é repetida
+        reply.messages[0].retry_after = 0.01
+        await reply.finish()
+        return reply
+
+    assert asyncio.run(cenario()).messages[0].text == "parcial"
+
+
+def test_delete_remove_todas_as_mensagens():
+    async def cenario():
+        reply, _ = nova_resposta(max_length=10)
+        await reply.append("uma resposta longa demais")
+        await reply.finish()
+        await reply.delete()
+        return reply
+
+    assert all(message.deleted for message in asyncio.run(cenario()).messages)